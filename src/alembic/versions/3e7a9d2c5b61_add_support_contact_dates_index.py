@@ -0,0 +1,31 @@
+"""add support contact dates index
+
+Revision ID: 3e7a9d2c5b61
+Revises: 9b3f6c1d8e24
+Create Date: 2026-10-18 16:41:09.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e7a9d2c5b61'
+down_revision: Union[str, None] = '9b3f6c1d8e24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # the new index is created first, MySQL needs an index on support_contact_id for the foreign key
+    op.create_index('ix_event_table_support_contact_id_dates', 'event_table',
+                    ['support_contact_id', 'event_start_date', 'id', 'event_end_date'], unique=False)
+    op.drop_index('ix_event_table_support_contact_id_event_start_date', table_name='event_table')
+
+
+def downgrade() -> None:
+    op.create_index('ix_event_table_support_contact_id_event_start_date', 'event_table',
+                    ['support_contact_id', 'event_start_date'], unique=False)
+    op.drop_index('ix_event_table_support_contact_id_dates', table_name='event_table')
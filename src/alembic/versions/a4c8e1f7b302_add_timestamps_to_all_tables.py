@@ -0,0 +1,39 @@
+"""add timestamps to all tables
+
+Revision ID: a4c8e1f7b302
+Revises: 3e7a9d2c5b61
+Create Date: 2026-10-18 18:12:44.903157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e1f7b302'
+down_revision: Union[str, None] = '3e7a9d2c5b61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# customer_table already has the columns
+NEW_TIMESTAMP_TABLES = ('team_table', 'user_table', 'contract_table', 'event_table')
+
+
+def upgrade() -> None:
+    for table in NEW_TIMESTAMP_TABLES:
+        # the existing rows are stamped with the migration date, then the application sets the dates
+        for column in ('date_created', 'date_modified'):
+            op.add_column(table, sa.Column(column, sa.DateTime(), server_default=sa.func.now(), nullable=False))
+            op.alter_column(table, column, server_default=None, existing_type=sa.DateTime(), existing_nullable=False)
+    for table in NEW_TIMESTAMP_TABLES + ('customer_table',):
+        op.create_index(op.f(f'ix_{table}_date_modified'), table, ['date_modified'], unique=False)
+
+
+def downgrade() -> None:
+    for table in NEW_TIMESTAMP_TABLES + ('customer_table',):
+        op.drop_index(op.f(f'ix_{table}_date_modified'), table_name=table)
+    for table in NEW_TIMESTAMP_TABLES:
+        op.drop_column(table, 'date_modified')
+        op.drop_column(table, 'date_created')
@@ -0,0 +1,32 @@
+"""add composite indexes to contract lists
+
+Revision ID: c5f2a8d9e716
+Revises: a4c8e1f7b302
+Create Date: 2026-10-18 21:04:17.512384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f2a8d9e716'
+down_revision: Union[str, None] = 'a4c8e1f7b302'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_contract_table_status_id', 'contract_table', ['status', 'id'], unique=False)
+    op.create_index('ix_contract_table_remaining_balance_id', 'contract_table', ['remaining_balance', 'id'],
+                    unique=False)
+    op.drop_index('ix_contract_table_status', table_name='contract_table')
+    op.drop_index('ix_contract_table_remaining_balance', table_name='contract_table')
+
+
+def downgrade() -> None:
+    op.create_index('ix_contract_table_remaining_balance', 'contract_table', ['remaining_balance'], unique=False)
+    op.create_index('ix_contract_table_status', 'contract_table', ['status'], unique=False)
+    op.drop_index('ix_contract_table_remaining_balance_id', table_name='contract_table')
+    op.drop_index('ix_contract_table_status_id', table_name='contract_table')
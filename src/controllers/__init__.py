@@ -1,2 +1,7 @@
 
-from .user import create_user
\ No newline at end of file
+def __getattr__(name):
+    # controllers are imported on demand by main.py, see LAZY_COMMANDS
+    if name == 'create_user':
+        from .user import create_user
+        return create_user
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
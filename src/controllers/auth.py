@@ -1,7 +1,6 @@
 import click
-from passlib.hash import argon2
 
-from database import get_session
+import database
 # from decorators import manage_session
 from models import User
 from utils import create_token
@@ -19,11 +18,13 @@ def user_login():
     Args:
         session(Session): SQLAlchemy session
     """
-    session = get_session()
     username, password = login_view()
-    user = User.get_user(session, username)
-    if user and argon2.verify(password, user.password):
-        token = create_token(payload_data={"username": user.username})
-        display_token(token)
-        return
+    with database.get_session() as session:
+        user = User.get_user(session, username)
+        if user and user.check_password(session, password):
+            # the hash may have been upgraded by check_password
+            session.commit()
+            token = create_token(user)
+            display_token(token)
+            return
     show_error('Wrong username or password')
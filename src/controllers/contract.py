@@ -1,30 +1,45 @@
 from datetime import datetime
+from functools import partial
 
 import click
-from passlib.hash import argon2
 
-from models import Contract, Customer
-from sqlalchemy.orm import Session
+from models import Contract
+from sqlalchemy.orm import Session, joinedload
 
-from decorators import login_required, manage_session, permission_required
+from utils import iter_pages, read_records, apply_records, select_fields, STREAM_PAGE_SIZE
+from repository import get_repository
+from decorators import login_required, manage_session, permission_required, pagination_options, user_entity_required, \
+    input_option
 from models.contract import ContractStatus
-from views import show_error, ask_for, show_success
+from views import show_error, ask_for, show_success, show_next_cursor, display_batch_report, machine_output
 from views.contract import display_contracts, prompt_for_contract
 
 contract_cli = click.Group()
 
+# relationships read by display_contracts
+CONTRACTS_LOAD_PLAN = (joinedload(Contract.customer),)
+
+# fields accepted in the records of --input and in the API requests, as prompted by prompt_for_contract
+CONTRACT_FIELDS = ('total_balance', 'remaining_balance', 'status', 'customer_email')
+
 @contract_cli.command()
 @click.argument('token')
+@input_option
 @manage_session
 @login_required
 @permission_required('create_contract')
-def create_contract(user, session):
+@user_entity_required
+def create_contract(user, session, input_file):
     """
     Create contract.
     Args:
         user(User): connected user from token
         session(Session): Sqlalchemy session
+        input_file(str): JSON file with the contracts to create, prompted if not set
     """
+    if input_file:
+        results = apply_records(session, read_records(input_file), partial(create_contract_record, session))
+        return display_batch_report(results, 'created')
     contract_data = ask_for_contract_data(session)
 
     if contract_data:
@@ -53,10 +68,11 @@ def get_contract(user, session):
 @click.argument('token')
 @click.option('--not-signed', default=False, is_flag=True)
 @click.option('--unpaid', default=False, is_flag=True)
+@pagination_options(Contract)
 @manage_session
 @login_required
 @permission_required('list_contracts')
-def get_contracts(user, session, not_signed, unpaid):
+def get_contracts(user, session, not_signed, unpaid, order_by, after, limit, page_size):
     """
     Display list of contract.
     Args:
@@ -64,15 +80,26 @@ def get_contracts(user, session, not_signed, unpaid):
         session(Session): Sqlalchemy session
         not_signed(bool): display contract not signed
         unpaid(bool): Display not fully paid contract
+        order_by(str): column to sort on
+        after(int): ID of the last contract of the previous page
+        limit(int): maximum number of contracts displayed
+        page_size(int): display the contracts one page at a time
     """
-    contracts = Contract.get_contracts(session, not_signed, unpaid)
+    if page_size or machine_output():
+        fetch_page = partial(Contract.get_contracts, session, not_signed, unpaid, options=CONTRACTS_LOAD_PLAN,
+                             order_by=order_by)
+        return display_contracts(iter_pages(fetch_page, page_size or STREAM_PAGE_SIZE, after, limit), page_size)
+    contracts = Contract.get_contracts(session, not_signed, unpaid, options=CONTRACTS_LOAD_PLAN, order_by=order_by,
+                                       after=after, limit=limit)
     display_contracts(contracts)
+    show_next_cursor(contracts, limit)
 
 @contract_cli.command()
 @click.argument('token')
 @manage_session
 @login_required
 @permission_required('delete_contract')
+@user_entity_required
 def delete_contract(user, session):
     """
     Delete contract.
@@ -88,24 +115,30 @@ def delete_contract(user, session):
 
 @contract_cli.command()
 @click.argument('token')
+@input_option
 @manage_session
 @login_required
 @permission_required('update_contract')
-def update_contract(user, session):
+@user_entity_required
+def update_contract(user, session, input_file):
     """
     Update contract.
     Args:
         user(User): connected user from token
         session(Session): Sqlalchemy session
+        input_file(str): JSON file with the contracts to update, identified by their "target" ID, prompted if not set
     """
+    if input_file:
+        results = apply_records(session, read_records(input_file), partial(update_contract_record, session, user))
+        return display_batch_report(results, 'updated')
 
     target_contract = ask_for_contract(session)
     if not target_contract:
         return
 
-    if user.has_perm('update_only_my_contracts') and target_contract.customer.sales_contact != user:
-        show_error("You don't have permission to edit this contract")
-        return
+    error = check_contract_owner(user, target_contract)
+    if error:
+        return show_error(error)
 
     contract_data = ask_for_contract_data(session, target_contract)
     if contract_data:
@@ -126,7 +159,7 @@ def ask_for_contract(session):
 
         target_id = ask_for('Enter the ID of the contract', output_type=int)
         if target_id:
-            target_contract = Contract.get_contract(session, id=target_id)
+            target_contract = get_repository(session).get_contract(target_id)
             if target_contract:
                 break
             else:
@@ -140,17 +173,77 @@ def ask_for_contract_data(session, contract=None):
     while try_again:
         status_choices = [status.value for status in ContractStatus]
         contract_data = prompt_for_contract(contract, status_choices)
-
-        errors = Contract.validate_data(contract_data)
-
-        if contract_data['customer_email'] and not Customer.get_customer(session, email=contract_data['customer_email']):
-            errors.append('Wrong customer email.')
-        elif contract_data['customer_email']:
-            contract_data['customer'] = Customer.get_customer(session, email=contract_data['customer_email'])
-
+        errors = check_contract_data(session, contract_data, contract)
         if not errors:
             break
         for error in errors:
             show_error(error)
         try_again = ask_for('Try again ?', output_type=bool)
-    return contract_data
\ No newline at end of file
+    return contract_data
+def check_contract_data(session, contract_data, contract=None):
+    """
+    Validate contract data and resolve the customer from its email.
+    Args:
+        session(Session): SQLAlchemy session
+        contract_data(dict): contract data, completed with the customer
+        contract(Contract, optional): existing contract instance, the customer is required for a new contract
+    Returns(list): validation error messages, empty if the data is valid
+    """
+    errors = Contract.validate_data(contract_data)
+    if contract_data.get('customer_email'):
+        customer = get_repository(session).get_customer(contract_data['customer_email'])
+        if customer:
+            contract_data['customer'] = customer
+        else:
+            errors.append('Wrong customer email.')
+    elif not contract:
+        errors.append('You must enter a customer email.')
+    return errors
+
+def check_contract_owner(user, contract):
+    """
+    Check that the user is allowed to edit this contract.
+    Args:
+        user(User): connected user
+        contract(Contract): contract to edit
+    Returns(str or None): error message if the user can only edit his own contracts and this one is not
+    """
+    if user.has_perm('update_only_my_contracts') and contract.customer.sales_contact != user:
+        return "You don't have permission to edit this contract"
+
+def create_contract_record(session, record):
+    """
+    Create a contract from a record of the --input file.
+    Args:
+        session(Session): Sqlalchemy session
+        record(dict): contract fields
+    Returns(Contract or list): the new contract, or the validation errors
+    """
+    contract_data = select_fields(record, CONTRACT_FIELDS)
+    errors = check_contract_data(session, contract_data)
+    if errors:
+        return errors
+    return Contract.create(session, contract_data)
+
+
+def update_contract_record(session, user, record):
+    """
+    Update the contract whose ID is the "target" of a record of the --input file.
+    Args:
+        session(Session): Sqlalchemy session
+        user(User): connected user
+        record(dict): "target" ID and the contract fields to change
+    Returns(Contract or list): the updated contract, or the errors
+    """
+    contract = get_repository(session).get_contract(record.get('target'))
+    if not contract:
+        return ['Wrong ID.']
+    error = check_contract_owner(user, contract)
+    if error:
+        return [error]
+    contract_data = select_fields(record, CONTRACT_FIELDS)
+    errors = check_contract_data(session, contract_data, contract)
+    if errors:
+        return errors
+    contract.update(session, contract_data)
+    return contract
@@ -1,25 +1,43 @@
+from functools import partial
+
 import click
+from sqlalchemy.orm import joinedload
 
-from models import Customer, User
+from models import Customer
 
-from decorators import login_required, permission_required, manage_session
-from views import show_error, ask_for, show_success
+from utils import iter_pages, read_records, apply_records, select_fields, STREAM_PAGE_SIZE
+from repository import get_repository
+from decorators import login_required, permission_required, manage_session, pagination_options, user_entity_required, \
+    input_option
+from views import show_error, ask_for, show_success, show_next_cursor, display_batch_report, machine_output
 from views.customer import prompt_for_customer, display_customers
 
 customer_cli = click.Group()
 
+# relationships read by display_customers
+CUSTOMERS_LOAD_PLAN = (joinedload(Customer.sales_contact),)
+
+# fields accepted in the records of --input and in the API requests, as prompted by prompt_for_customer
+CUSTOMER_FIELDS = ('name', 'email', 'phone', 'company_name', 'sales_contact_username')
+
 @customer_cli.command()
 @click.argument('token')
+@input_option
 @manage_session
 @login_required
 @permission_required('create_customer')
-def create_customer(user, session):
+@user_entity_required
+def create_customer(user, session, input_file):
     """
     Create a new customer.
     Args:
         user(User): connected user from token
         session(Session): SQLAlchemy session
+        input_file(str): JSON file with the customers to create, prompted if not set
     """
+    if input_file:
+        results = apply_records(session, read_records(input_file), partial(create_customer_record, session, user))
+        return display_batch_report(results, 'created')
     customer_data = ask_for_customer_data(session)
     customer_data['sales_contact'] = user
 
@@ -46,24 +64,35 @@ def get_customer(user, session):
 
 @customer_cli.command()
 @click.argument('token')
+@pagination_options(Customer)
 @manage_session
 @login_required
 @permission_required('list_customers')
-def get_customers(user, session):
+def get_customers(user, session, order_by, after, limit, page_size):
     """
     Retrieve and display a list of customers.
     Args:
         user(User): connected user from token
         session(Session): SQLAlchemy session
+        order_by(str): column to sort on
+        after(int): ID of the last customer of the previous page
+        limit(int): maximum number of customers displayed
+        page_size(int): display the customers one page at a time
     """
-    customers = Customer.get_customers(session)
+    if page_size or machine_output():
+        fetch_page = partial(Customer.get_customers, session, options=CUSTOMERS_LOAD_PLAN, order_by=order_by)
+        return display_customers(iter_pages(fetch_page, page_size or STREAM_PAGE_SIZE, after, limit), page_size)
+    customers = Customer.get_customers(session, options=CUSTOMERS_LOAD_PLAN, order_by=order_by, after=after,
+                                       limit=limit)
     display_customers(customers)
+    show_next_cursor(customers, limit)
 
 @customer_cli.command()
 @click.argument('token')
 @manage_session
 @login_required
 @permission_required('delete_customers')
+@user_entity_required
 def delete_customer(user, session):
     """
     Delete a customer by email.
@@ -78,19 +107,28 @@ def delete_customer(user, session):
 
 @customer_cli.command()
 @click.argument('token')
+@input_option
 @manage_session
 @login_required
 @permission_required('update_customer')
-def update_customer(user, session):
+@user_entity_required
+def update_customer(user, session, input_file):
     """
     Update an existing customer's information.
     Args:
         user(User): connected user from token
         session(Session): SQLAlchemy session
+        input_file(str): JSON file with the customers to update, identified by the "target" email, prompted if not set
     """
+    if input_file:
+        results = apply_records(session, read_records(input_file), partial(update_customer_record, session, user))
+        return display_batch_report(results, 'updated')
     target_customer = ask_for_customer(session)
-    if user.has_perm('update_only_my_customers') and target_customer.sales_contact != user:
-        return show_error("You don't have permission to edit this customer")
+    if not target_customer:
+        return
+    error = check_customer_owner(user, target_customer)
+    if error:
+        return show_error(error)
     customer_data = ask_for_customer_data(session, target_customer)
     if customer_data:
         target_customer.update(session, customer_data)
@@ -109,7 +147,7 @@ def ask_for_customer(session):
     while try_again:
         target_email = ask_for('Enter the email of the customer')
         if target_email:
-            target_customer = Customer.get_customer(session, email=target_email)
+            target_customer = get_repository(session).get_customer(target_email)
             if target_customer:
                 break
             else:
@@ -129,16 +167,77 @@ def ask_for_customer_data(session, customer=None):
     customer_data = dict()
     while try_again:
         customer_data = prompt_for_customer(customer)
-        errors = Customer.validate_data(customer_data)
-
-        if customer_data.get('sales_contact_username') and not User.get_user(session, customer_data['sales_contact_username']):
-            errors.append('Wrong username for sales contact.')
-        elif customer_data.get('sales_contact_username'):
-            customer_data['sales_contact'] = User.get_user(session, customer_data['sales_contact_username'])
-
+        errors = check_customer_data(session, customer_data)
         if not errors:
             break
         for error in errors:
             show_error(error)
         try_again = ask_for('Try again ?', output_type=bool)
     return customer_data
+
+def check_customer_data(session, customer_data):
+    """
+    Validate customer data and resolve the sales contact from its username.
+    Args:
+        session(Session): SQLAlchemy session
+        customer_data(dict): customer data, completed with the sales contact
+    Returns(list): validation error messages, empty if the data is valid
+    """
+    errors = Customer.validate_data(customer_data)
+    if customer_data.get('sales_contact_username'):
+        sales_contact = get_repository(session).get_user(customer_data['sales_contact_username'])
+        if sales_contact:
+            customer_data['sales_contact'] = sales_contact
+        else:
+            errors.append('Wrong username for sales contact.')
+    return errors
+
+def check_customer_owner(user, customer):
+    """
+    Check that the user is allowed to edit this customer.
+    Args:
+        user(User): connected user
+        customer(Customer): customer to edit
+    Returns(str or None): error message if the user can only edit his own customers and this one is not
+    """
+    if user.has_perm('update_only_my_customers') and customer.sales_contact != user:
+        return "You don't have permission to edit this customer"
+
+def create_customer_record(session, user, record):
+    """
+    Create a customer from a record of the --input file.
+    Args:
+        session(Session): SQLAlchemy session
+        user(User): connected user, sales contact of the customer
+        record(dict): customer fields
+    Returns(Customer or list): the new customer, or the validation errors
+    """
+    customer_data = select_fields(record, CUSTOMER_FIELDS)
+    errors = check_customer_data(session, customer_data)
+    if errors:
+        return errors
+    customer_data['sales_contact'] = user
+    return Customer.create(session, customer_data)
+
+
+def update_customer_record(session, user, record):
+    """
+    Update the customer whose email is the "target" of a record of the --input file.
+    Args:
+        session(Session): SQLAlchemy session
+        user(User): connected user
+        record(dict): "target" email and the customer fields to change
+    Returns(Customer or list): the updated customer, or the errors
+    """
+    customer = get_repository(session).get_customer(record.get('target'))
+    if not customer:
+        return ['Wrong email.']
+    error = check_customer_owner(user, customer)
+    if error:
+        return [error]
+    customer_data = select_fields(record, CUSTOMER_FIELDS)
+    errors = check_customer_data(session, customer_data)
+    if errors:
+        return errors
+    customer.update(session, customer_data)
+    return customer
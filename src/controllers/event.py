@@ -1,39 +1,60 @@
+from functools import partial
+from itertools import chain
+
 import click
 
-from models import Event, Contract, User
-from sqlalchemy.orm import Session
+from models import Event, Contract
+from sqlalchemy.orm import Session, joinedload
 
-from decorators import login_required, manage_session, permission_required
+from utils import iter_pages, read_records, apply_records, select_fields, STREAM_PAGE_SIZE
+from repository import get_repository
+from decorators import login_required, manage_session, permission_required, pagination_options, user_entity_required, \
+    input_option
 from models.contract import ContractStatus
-from views import show_error, ask_for, show_success
-from views.event import prompt_for_event, display_events
+from views import show_error, ask_for, show_success, show_next_cursor, display_batch_report, machine_output
+from views.event import prompt_for_event, display_events, display_conflicts
 
 event_cli = click.Group()
 
+# relationships read by display_events
+EVENTS_LOAD_PLAN = (
+    joinedload(Event.contract).joinedload(Contract.customer),
+    joinedload(Event.support_contact),
+)
+
+# fields accepted in the records of --input and in the API requests, as prompted by prompt_for_event
+EVENT_FIELDS = ('event_start_date', 'event_end_date', 'location', 'attendees', 'notes', 'contract_id')
+# only prompted on update, to the users allowed to assign the support contact
+SUPPORT_CONTACT_FIELD = 'support_contact_username'
+
 @event_cli.command()
 @click.argument('token')
+@input_option
 @manage_session
 @login_required
 @permission_required('create_event')
-def create_event(user, session):
+@user_entity_required
+def create_event(user, session, input_file):
     """
     Create a new event.
     Args:
         user(User): connected user from token
         session(Session): SQLAlchemy session
+        input_file(str): JSON file with the events to create, prompted if not set
     """
+    if input_file:
+        results = apply_records(session, read_records(input_file), partial(create_event_record, session, user))
+        return display_batch_report(results, 'created')
     event_data = ask_for_event_data(session, user)
-    contract = event_data.get('contract')
+    if not event_data:
+        return
+    error = check_event_contract(user, event_data.get('contract'))
+    if error:
+        return show_error(error)
 
-    if contract and contract.customer.sales_contact != user:
-        return show_error(f"You don't have permission to add events to this contract (client {contract.customer})")
-    elif contract and contract.status != ContractStatus.SIGNED:
-        return show_error("Contract must be signed.")
-
-    if event_data:
-        created = Event.create(session, event_data)
-        display_events([created])
-        show_success("Event created successfully.")
+    created = Event.create(session, event_data)
+    display_events([created])
+    show_success("Event created successfully.")
 
 @event_cli.command()
 @click.argument('token')
@@ -55,10 +76,11 @@ def get_event(user, session):
 @click.argument('token')
 @click.option('--filter-empty-support', default=False, is_flag=True)
 @click.option('--my-events', default=False, is_flag=True)
+@pagination_options(Event)
 @manage_session
 @login_required
 @permission_required('list_events')
-def get_events(user, session, filter_empty_support, my_events):
+def get_events(user, session, filter_empty_support, my_events, order_by, after, limit, page_size):
     """
     Retrieve and display a list of events.
     Args:
@@ -66,15 +88,26 @@ def get_events(user, session, filter_empty_support, my_events):
         session(Session): SQLAlchemy session
         filter_empty_support(bool): filter events without support contact
         my_events(bool): filter only events related to the current user
+        order_by(str): column to sort on
+        after(int): ID of the last event of the previous page
+        limit(int): maximum number of events displayed
+        page_size(int): display the events one page at a time
     """
-    events = Event.get_events(session, user, filter_empty_support, my_events)
+    if page_size or machine_output():
+        fetch_page = partial(Event.get_events, session, user, filter_empty_support, my_events, options=EVENTS_LOAD_PLAN,
+                             order_by=order_by)
+        return display_events(iter_pages(fetch_page, page_size or STREAM_PAGE_SIZE, after, limit), page_size)
+    events = Event.get_events(session, user, filter_empty_support, my_events, options=EVENTS_LOAD_PLAN,
+                              order_by=order_by, after=after, limit=limit)
     display_events(events)
+    show_next_cursor(events, limit)
 
 @event_cli.command()
 @click.argument('token')
 @manage_session
 @login_required
 @permission_required('delete_event')
+@user_entity_required
 def delete_event(user, session):
     """
     Delete an event by ID.
@@ -89,25 +122,55 @@ def delete_event(user, session):
 
 @event_cli.command()
 @click.argument('token')
+@input_option
 @manage_session
 @login_required
 @permission_required('update_event')
-def update_event(user, session):
+@user_entity_required
+def update_event(user, session, input_file):
     """
     Update an existing event.
     Args:
         user(User): connected user from token
         session(Session): SQLAlchemy session
+        input_file(str): JSON file with the events to update, identified by their "target" ID, prompted if not set
     """
+    if input_file:
+        results = apply_records(session, read_records(input_file), partial(update_event_record, session, user))
+        return display_batch_report(results, 'updated')
     target_event = ask_for_event(session)
-    if user.has_perm('update_only_my_events') and target_event.support_contact != user:
-        return show_error("You don't have permission to edit this event")
+    if not target_event:
+        return
+    error = check_event_owner(user, target_event)
+    if error:
+        return show_error(error)
     event_data = ask_for_event_data(session, user, target_event)
     if event_data:
         target_event.update(session, event_data)
         display_events([target_event])
         show_success("Event updated successfully.")
 
+@event_cli.command()
+@click.argument('token')
+@click.option('--page-size', type=click.IntRange(min=1), default=None,
+              help='Display rows one page at a time, fetching the next page on demand.')
+@manage_session
+@login_required
+@permission_required('list_events')
+def find_conflicts(user, session, page_size):
+    """
+    Display the events overlapping another event of the same support contact, over the whole calendar.
+    Args:
+        user(User): connected user from token
+        session(Session): SQLAlchemy session
+        page_size(int): display the conflicts one page at a time
+    """
+    conflicts = Event.iter_conflicts(session)
+    first = next(conflicts, None)
+    if first is None:
+        return show_success("No scheduling conflict.")
+    display_conflicts(chain([first], conflicts), page_size)
+
 def ask_for_event(session):
     """
     Prompt user for an event ID and retrieve the event.
@@ -120,7 +183,7 @@ def ask_for_event(session):
     while try_again:
         target_id = ask_for('Enter the ID of the event', output_type=int)
         if target_id:
-            target_event = Event.get_event(session, id=target_id)
+            target_event = get_repository(session).get_event(target_id)
             if target_event:
                 break
             else:
@@ -135,28 +198,109 @@ def ask_for_event_data(session, user, event=None):
         session(Session): SQLAlchemy session
         user(User): connected user
         event(Event, optional): existing event instance
-    Returns(dict): validated event data
+    Returns(dict): validated event data, None if the user gave up
     """
     try_again = True
     while try_again:
         event_data = prompt_for_event(user, event)
-        errors = Event.validate_data(event_data)
-
-        if event_data['contract_id'] and not Contract.get_contract(session, id=event_data['contract_id']):
-            errors.append('Wrong contract ID.')
-        elif event_data['contract_id']:
-            event_data['contract'] = Contract.get_contract(session, id=event_data['contract_id'])
-        elif not event and not event_data['contract_id']:
-            errors.append('You must enter a contract ID.')
-
-        if event_data.get('support_contact_username') and not User.get_user(session, event_data['support_contact_username']):
-            errors.append('Wrong username for support contact.')
-        elif event_data.get('support_contact_username'):
-            event_data['support_contact'] = User.get_user(session, event_data['support_contact_username'])
-
+        errors = check_event_data(session, event_data, event)
         if not errors:
             break
         for error in errors:
             show_error(error)
         try_again = ask_for('Try again ?', output_type=bool)
-    return event_data
+    return event_data if try_again else None
+
+def check_event_data(session, event_data, event=None):
+    """
+    Validate event data and resolve the contract and the support contact.
+    Args:
+        session(Session): SQLAlchemy session
+        event_data(dict): event data, completed with the contract and the support contact
+        event(Event, optional): existing event instance, the contract is required for a new event
+    Returns(list): validation error messages, empty if the data is valid
+    """
+    errors = []
+    if event_data.get('contract_id'):
+        contract = get_repository(session).get_contract(event_data['contract_id'])
+        if contract:
+            event_data['contract'] = contract
+        else:
+            errors.append('Wrong contract ID.')
+    elif not event:
+        errors.append('You must enter a contract ID.')
+
+    if event_data.get('support_contact_username'):
+        support_contact = get_repository(session).get_user(event_data['support_contact_username'])
+        if support_contact:
+            event_data['support_contact'] = support_contact
+        else:
+            errors.append('Wrong username for support contact.')
+    # the support contact is resolved first, its other events must not overlap this one
+    return Event.validate_data(event_data, session, event) + errors
+
+def check_event_contract(user, contract):
+    """
+    Check that the user is allowed to add events to this contract.
+    Args:
+        user(User): connected user
+        contract(Contract or None): contract of the new event
+    Returns(str or None): error message if the contract is not signed or belongs to another sales contact
+    """
+    if contract and contract.customer.sales_contact != user:
+        return f"You don't have permission to add events to this contract (client {contract.customer})"
+    elif contract and contract.status != ContractStatus.SIGNED:
+        return "Contract must be signed."
+
+def check_event_owner(user, event):
+    """
+    Check that the user is allowed to edit this event.
+    Args:
+        user(User): connected user
+        event(Event): event to edit
+    Returns(str or None): error message if the user can only edit his own events and this one is not
+    """
+    if user.has_perm('update_only_my_events') and event.support_contact != user:
+        return "You don't have permission to edit this event"
+
+def create_event_record(session, user, record):
+    """
+    Create an event from a record of the --input file.
+    Args:
+        session(Session): SQLAlchemy session
+        user(User): connected user
+        record(dict): event fields
+    Returns(Event or list): the new event, or the errors
+    """
+    event_data = select_fields(record, EVENT_FIELDS)
+    errors = check_event_data(session, event_data)
+    if errors:
+        return errors
+    error = check_event_contract(user, event_data['contract'])
+    if error:
+        return [error]
+    return Event.create(session, event_data)
+
+
+def update_event_record(session, user, record):
+    """
+    Update the event whose ID is the "target" of a record of the --input file.
+    Args:
+        session(Session): SQLAlchemy session
+        user(User): connected user
+        record(dict): "target" ID and the event fields to change
+    Returns(Event or list): the updated event, or the errors
+    """
+    event = get_repository(session).get_event(record.get('target'))
+    if not event:
+        return ['Wrong ID.']
+    error = check_event_owner(user, event)
+    if error:
+        return [error]
+    fields = EVENT_FIELDS + (SUPPORT_CONTACT_FIELD,) if user.has_perm('update_event_support') else EVENT_FIELDS
+    event_data = select_fields(record, fields)
+    errors = check_event_data(session, event_data, event)
+    if errors:
+        return errors
+    event.update(session, event_data)
+    return event
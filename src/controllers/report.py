@@ -0,0 +1,86 @@
+from functools import partial
+
+import click
+
+import database
+from controllers.contract import CONTRACTS_LOAD_PLAN
+from controllers.event import EVENTS_LOAD_PLAN
+from decorators import login_required, manage_session, permission_required
+from models import Contract, Event
+from views.contract import display_contracts
+from views.event import display_events
+from views.report import display_contracts_report, display_events_report
+
+report_cli = click.Group()
+
+
+@report_cli.command()
+@click.argument('token')
+@click.option('--by', 'group_by', type=click.Choice(Contract.REPORT_GROUPS), default='customer', show_default=True)
+@click.option('--page-size', type=click.IntRange(min=1), default=None,
+              help='Display rows one page at a time, fetching the next page on demand.')
+@manage_session
+@login_required
+@permission_required('list_contracts')
+def report_contracts(user, session, group_by, page_size):
+    """
+    Display the signed and created contracts and the outstanding balances per customer or sales contact.
+    Args:
+        user(User): connected user from token
+        session(Session): SQLAlchemy session
+        group_by(str): grouping of the report
+        page_size(int): display the rows one page at a time
+    """
+    display_contracts_report(Contract.get_report(session, group_by), group_by, page_size)
+
+
+@report_cli.command()
+@click.argument('token')
+@click.option('--by', 'group_by', type=click.Choice(Event.REPORT_GROUPS), default='customer', show_default=True)
+@click.option('--page-size', type=click.IntRange(min=1), default=None,
+              help='Display rows one page at a time, fetching the next page on demand.')
+@manage_session
+@login_required
+@permission_required('list_events')
+def report_events(user, session, group_by, page_size):
+    """
+    Display the number of events and attendees per customer, sales contact, support contact or month.
+    Args:
+        user(User): connected user from token
+        session(Session): SQLAlchemy session
+        group_by(str): grouping of the report
+        page_size(int): display the rows one page at a time
+    """
+    display_events_report(Event.get_report(session, group_by), group_by, page_size)
+
+
+@report_cli.command()
+@click.argument('token')
+@click.option('--limit', type=click.IntRange(min=1), default=10, show_default=True,
+              help='Maximum number of rows displayed per table.')
+@login_required
+@permission_required('list_contracts')
+@permission_required('list_events')
+def dashboard(user, limit):
+    """
+    Display the contracts to sign, the unpaid contracts, the events without support and the events of the user.
+    The four lists are independent, they are fetched concurrently with the asyncio engine.
+    Args:
+        user(TokenUser): connected user from token
+        limit(int): maximum number of rows per table
+    """
+    # relationships can't be loaded lazily with asyncio, the queries use the load plans of the list commands
+    to_sign, unpaid, without_support, my_events = database.run_concurrently(
+        partial(Contract.get_contracts_async, not_signed=True, unpaid_contracts=False, options=CONTRACTS_LOAD_PLAN,
+                limit=limit),
+        partial(Contract.get_contracts_async, not_signed=False, unpaid_contracts=True, options=CONTRACTS_LOAD_PLAN,
+                limit=limit),
+        partial(Event.get_events_async, filter_empty=True, options=EVENTS_LOAD_PLAN, order_by='event_start_date',
+                limit=limit),
+        partial(Event.get_events_async, user=user, user_only=True, options=EVENTS_LOAD_PLAN,
+                order_by='event_start_date', limit=limit),
+    )
+    display_contracts(to_sign, title="Contracts to sign")
+    display_contracts(unpaid, title="Unpaid contracts")
+    display_events(without_support, title="Events without support")
+    display_events(my_events, title="My events")
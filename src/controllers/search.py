@@ -0,0 +1,40 @@
+import click
+
+from decorators import login_required, manage_session
+from models.search import SEARCH_INDEXES, full_text_search
+from views import show_error
+from views.search import display_search_hits, show_next_offset
+
+search_cli = click.Group()
+
+
+@search_cli.command()
+@click.argument('token')
+@click.argument('text')
+@click.option('--type', 'kinds', type=click.Choice(tuple(SEARCH_INDEXES)), multiple=True,
+              help='Kind of rows searched, can be repeated. Every kind the user can list by default.')
+@click.option('--limit', type=click.IntRange(min=1), default=20, show_default=True,
+              help='Maximum number of hits displayed.')
+@click.option('--offset', type=click.IntRange(min=0), default=0, show_default=True,
+              help='Number of better hits skipped, to display the next pages.')
+@manage_session
+@login_required
+def search(user, session, text, kinds, limit, offset):
+    """
+    Search customers, events and users by words of their names, company, location or notes, best hits first.
+    Args:
+        user(TokenUser): connected user from token
+        session(Session): SQLAlchemy session
+        text(str): searched words
+        kinds(tuple): kinds of rows searched, all by default
+        limit(int): maximum number of hits displayed
+        offset(int): number of better hits skipped
+    """
+    allowed = [kind for kind in SEARCH_INDEXES if user.has_perm(SEARCH_INDEXES[kind].permission)]
+    for kind in kinds:
+        if kind not in allowed:
+            show_error(f"You do not have permission to search {kind}s")
+    kinds = [kind for kind in kinds or allowed if kind in allowed]
+    hits = full_text_search(session, text, kinds, limit, offset)
+    display_search_hits(hits, offset)
+    show_next_offset(hits, limit, offset)
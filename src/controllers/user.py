@@ -1,27 +1,48 @@
+import time
+from functools import partial
+
 import click
 
 
-from views import prompt_for_user, display_users, ask_for, show_error, show_success
+from views import prompt_for_user, display_users, ask_for, show_error, show_success, show_next_cursor, \
+    display_batch_report, machine_output
 from models import User, Team
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
-from decorators import login_required, permission_required, manage_session
+from utils import iter_pages, read_records, apply_records, select_fields, STREAM_PAGE_SIZE
+from repository import get_repository
+from decorators import login_required, permission_required, manage_session, pagination_options, user_entity_required, \
+    input_option
 
 user_cli = click.Group()
 
+# relationships read by display_users
+USERS_LOAD_PLAN = (joinedload(User.team),)
+
+IMPORT_REQUIRED_FIELDS = ('username', 'personal_number', 'email', 'password')
+IMPORT_OPTIONAL_FIELDS = ('first_name', 'last_name', 'phone')
+# fields accepted in the records of --input and in the API requests, as prompted by prompt_for_user
+USER_FIELDS = IMPORT_REQUIRED_FIELDS + IMPORT_OPTIONAL_FIELDS + ('team_name',)
+
 @user_cli.command()
 @click.argument('token')
+@input_option
 @manage_session
 @login_required
 @permission_required('create_user')
-def create_user(user, session):
+@user_entity_required
+def create_user(user, session, input_file):
     """
     Create a new user.
     Args:
         user(User): Connected user from token.
         session(Session): SQLAlchemy session.
+        input_file(str): JSON file with the users to create, prompted if not set.
     """
-    teams_name = [team.name for team in Team.get_teams(session)]
+    if input_file:
+        results = apply_records(session, read_records(input_file), partial(create_user_record, session))
+        return display_batch_report(results, 'created')
+    teams_name = [team.name for team in get_repository(session).get_teams()]
     user_data = ask_for_user_data(session=session, teams_name=teams_name)
 
     if user_data:
@@ -50,18 +71,27 @@ def get_user(user, session):
 
 @user_cli.command()
 @click.argument('token')
+@pagination_options(User)
 @manage_session
 @login_required
 @permission_required('list_users')
-def get_users(user, session):
+def get_users(user, session, order_by, after, limit, page_size):
     """
     Retrieve a list of all users.
     Args:
         user(User): Connected user from the token.
         session(Session): SQLAlchemy session.
+        order_by(str): column to sort on
+        after(int): ID of the last user of the previous page
+        limit(int): maximum number of users displayed
+        page_size(int): display the users one page at a time
     """
-    users = User.get_users(session)
+    if page_size or machine_output():
+        fetch_page = partial(User.get_users, session, options=USERS_LOAD_PLAN, order_by=order_by)
+        return display_users(iter_pages(fetch_page, page_size or STREAM_PAGE_SIZE, after, limit), page_size)
+    users = User.get_users(session, options=USERS_LOAD_PLAN, order_by=order_by, after=after, limit=limit)
     display_users(users)
+    show_next_cursor(users, limit)
 
 
 @user_cli.command()
@@ -69,6 +99,7 @@ def get_users(user, session):
 @manage_session
 @login_required
 @permission_required('delete_user')
+@user_entity_required
 def delete_user(user, session):
     """
     Delete a user based on their username.
@@ -82,7 +113,7 @@ def delete_user(user, session):
         target_username, stop = ask_for('Enter the username of the user')
         if stop:
             break
-        target_user = User.get_user(session, username=target_username)
+        target_user = get_repository(session).get_user(target_username)
         if target_user:
             is_valid = True
         else:
@@ -95,21 +126,27 @@ def delete_user(user, session):
 
 @user_cli.command()
 @click.argument('token')
+@input_option
 @manage_session
 @login_required
 @permission_required('update_user')
-def update_user(user, session):
+@user_entity_required
+def update_user(user, session, input_file):
     """
     Update a user based on their ID and provided data.
     Args:
         user(User): Connected user from the token.
         session(Session): SQLAlchemy session.
+        input_file(str): JSON file with the users to update, identified by their "target" username, prompted if not set.
     """
+    if input_file:
+        results = apply_records(session, read_records(input_file), partial(update_user_record, session))
+        return display_batch_report(results, 'updated')
     target_user = ask_for_user(session)
     if not target_user:
         return
 
-    teams_name = [team.name for team in Team.get_teams(session)]
+    teams_name = [team.name for team in get_repository(session).get_teams()]
     user_data = ask_for_user_data(session, target_user, teams_name)
 
     if user_data:
@@ -126,7 +163,7 @@ def create_admin(session):
     Args:
         session(Session): SQLAlchemy session.
     """
-    if User.get_users(session):
+    if User.get_users(session, limit=1):
         show_error("Initialization failed: Users already exist in the database. This feature is only available for an empty database.")
         return
 
@@ -148,6 +185,79 @@ def create_admin(session):
         show_success("Admin user created successfully.")
 
 
+@user_cli.command()
+@click.argument('token')
+@click.argument('filename', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', type=click.IntRange(min=1), default=500, help='Number of users inserted per statement.')
+@manage_session
+@login_required
+@permission_required('create_user')
+@user_entity_required
+def import_users(user, session, filename, batch_size):
+    """
+    Create users from a CSV or JSON file, with User.bulk_create hashing the passwords on every core.
+    The invalid rows are reported and skipped.
+    Args:
+        user(User): Connected user from the token.
+        session(Session): SQLAlchemy session.
+        filename(str): CSV file with a header line, or JSON list of users.
+        batch_size(int): number of users inserted per statement.
+    """
+    start = time.perf_counter()
+    teams = {team.name: team.id for team in Team.get_teams(session)}
+    rows = []
+    for row_number, record in enumerate(read_records(filename), start=1):
+        user_data, errors = validate_imported_user(record, teams)
+        for error in errors:
+            show_error(f"Row {row_number}: {error}")
+        if not errors:
+            rows.append((row_number, user_data))
+
+    # usernames, emails and personal numbers must be unique, in the file and in the database
+    seen = set()
+    for batch_start in range(0, len(rows), batch_size):
+        batch = [user_data for _, user_data in rows[batch_start:batch_start + batch_size]]
+        seen |= User.get_taken_identifiers(session, batch)
+    users_data = []
+    for row_number, user_data in rows:
+        duplicates = [user_data[key] for key in ('username', 'email', 'personal_number') if user_data[key] in seen]
+        if duplicates:
+            show_error(f"Row {row_number}: {', '.join(duplicates)} already used.")
+            continue
+        seen.update(user_data[key] for key in ('username', 'email', 'personal_number'))
+        users_data.append(user_data)
+
+    User.bulk_create(session, users_data, batch_size=batch_size)
+
+    elapsed = time.perf_counter() - start
+    show_success(f"{len(users_data)} users imported in {elapsed:.1f}s ({len(users_data) / elapsed:.0f} users/s).")
+
+
+def validate_imported_user(record, teams):
+    """
+    Validate a user record read from an import file.
+    Args:
+        record(dict): raw user data.
+        teams(dict): team ids by team name.
+    Returns:
+        tuple: the user data to insert and the list of validation errors.
+    """
+    # the values are validated as they were read: a JSON number is refused like in the other writes
+    user_data = {field: None if record.get(field) in (None, '') else record[field]
+                 for field in IMPORT_REQUIRED_FIELDS + IMPORT_OPTIONAL_FIELDS}
+    errors = [f"{field} is required." for field in IMPORT_REQUIRED_FIELDS if user_data[field] is None]
+    if errors:
+        return user_data, errors
+    errors = User.validate_data(user_data)
+
+    team_id = teams.get(record.get('team_name')) or record.get('team_id')
+    if str(team_id) not in {str(existing_id) for existing_id in teams.values()}:
+        errors.append('Wrong team name')
+    else:
+        user_data['team_id'] = int(team_id)
+    return user_data, errors
+
+
 def ask_for_user(session):
     """
     Prompt to select a user by their username.
@@ -161,7 +271,7 @@ def ask_for_user(session):
     while try_again:
         target_username = ask_for('Enter the username of the user')
         if target_username:
-            target_user = User.get_user(session, username=target_username)
+            target_user = get_repository(session).get_user(target_username)
             if target_user:
                 break
             else:
@@ -186,11 +296,7 @@ def ask_for_user_data(session, user=None, teams_name=None):
         user_data = prompt_for_user(actual_user=user, team_choice=teams_name)
         if user and not user_data['password']:  # Remove password field if empty during update
             user_data.pop('password')
-        errors = User.validate_data(user_data)
-        if user_data['team_name'] and not Team.get_team(session, user_data['team_name']):
-            errors.append('Wrong team name')
-        elif user_data['team_name']:
-            user_data['team'] = Team.get_team(session, user_data['team_name'])
+        errors = check_user_data(session, user_data, user)
         if not errors:
             break
         for error in errors:
@@ -198,3 +304,63 @@ def ask_for_user_data(session, user=None, teams_name=None):
         try_again = ask_for('Try again ?', output_type=bool)
 
     return user_data if try_again else None
+
+
+def check_user_data(session, user_data, user=None):
+    """
+    Validate user data and resolve the team from its name.
+    Args:
+        session(Session): SQLAlchemy session.
+        user_data(dict): User data, completed with the team.
+        user(User, optional): Existing user, the password is required for a new user.
+    Returns:
+        list: Validation error messages, empty if the data is valid.
+    """
+    errors = User.validate_data(user_data)
+    if not user and not user_data.get('password'):
+        errors.append('Password is required.')
+    if user_data.get('team_name'):
+        team = get_repository(session).get_team(user_data['team_name'])
+        if team:
+            user_data['team'] = team
+        else:
+            errors.append('Wrong team name')
+    return errors
+
+
+def create_user_record(session, record):
+    """
+    Create a user from a record of the --input file.
+    Args:
+        session(Session): SQLAlchemy session.
+        record(dict): User fields.
+    Returns:
+        User or list: The new user, or the validation errors.
+    """
+    user_data = select_fields(record, USER_FIELDS)
+    errors = check_user_data(session, user_data)
+    if errors:
+        return errors
+    return User.create(session, user_data)
+
+
+def update_user_record(session, record):
+    """
+    Update the user whose username is the "target" of a record of the --input file.
+    Args:
+        session(Session): SQLAlchemy session.
+        record(dict): "target" username and the user fields to change, the password is kept if empty.
+    Returns:
+        User or list: The updated user, or the errors.
+    """
+    target_user = get_repository(session).get_user(record.get('target'))
+    if not target_user:
+        return ['Wrong username.']
+    user_data = select_fields(record, USER_FIELDS)
+    if not user_data.get('password'):
+        user_data.pop('password', None)
+    errors = check_user_data(session, user_data, target_user)
+    if errors:
+        return errors
+    target_user.update(session, user_data)
+    return target_user
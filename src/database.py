@@ -1,71 +1,306 @@
+import asyncio
 import json
+import os
+import statistics
+import time
 from datetime import datetime
+from itertools import groupby, islice
+from operator import itemgetter
 
 import click
-from sqlalchemy import create_engine, text, insert
+from sqlalchemy import DateTime, bindparam, create_engine, text, insert
 from sqlalchemy.orm import Session, sessionmaker
 
 from models import Base, User, Contract, Customer, Event
 from models.contract import ContractStatus
-from settings import DATABASE_NAME, DATABASE_USER, DATABASE_PASSWORD, DATABASE_HOST
+from utils import iter_json_table_rows
+from settings import (DATABASE_NAME, DATABASE_USER, DATABASE_PASSWORD, DATABASE_HOST, DATABASE_POOL_SIZE,
+                      DATABASE_MAX_OVERFLOW, DATABASE_POOL_RECYCLE, DATABASE_POOL_PRE_PING, ENV_FILE)
+
+SAMPLE_PASSWORD = 'P@ssw0rd01'
 
 DATABASE_URL = f'mysql+mysqldb://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}/{DATABASE_NAME}'
+ASYNC_DATABASE_URL = f'mysql+aiomysql://{DATABASE_USER}:{DATABASE_PASSWORD}@{DATABASE_HOST}/{DATABASE_NAME}'
+
+_engine = None
+_async_engine = None
+# sessions are committed by manage_session when the command ends, the entities need not be reloaded after
+session_factory = sessionmaker(expire_on_commit=False)
 
 
 def get_engine():
-    return create_engine(DATABASE_URL)
+    """
+    Return the engine of the process, created on first call.
+    The engine owns the connection pool, so it must be shared by every session.
+    Returns(Engine): SQLAlchemy engine
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_engine(
+            DATABASE_URL,
+            pool_size=DATABASE_POOL_SIZE,
+            max_overflow=DATABASE_MAX_OVERFLOW,
+            pool_recycle=DATABASE_POOL_RECYCLE,
+            pool_pre_ping=DATABASE_POOL_PRE_PING,
+        )
+    return _engine
 
 
 def get_session():
-    engine = get_engine()
-    session_factory = sessionmaker(bind=engine)
-    return session_factory()
+    """
+    Return a new session bound to the shared engine.
+    Use it as a context manager (`with get_session() as session:`) so the connection goes back to the pool.
+    Returns(Session): SQLAlchemy session
+    """
+    return session_factory(bind=get_engine())
+
+
+def get_async_engine():
+    """
+    Return the asyncio engine of the process, created on first call with the pool settings of the engine.
+    sqlalchemy.ext.asyncio needs greenlet, it is only imported by the commands running concurrent queries.
+    Returns(AsyncEngine): SQLAlchemy asyncio engine
+    """
+    global _async_engine
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        _async_engine = create_async_engine(
+            ASYNC_DATABASE_URL,
+            pool_size=DATABASE_POOL_SIZE,
+            max_overflow=DATABASE_MAX_OVERFLOW,
+            pool_recycle=DATABASE_POOL_RECYCLE,
+            pool_pre_ping=DATABASE_POOL_PRE_PING,
+        )
+    return _async_engine
+
+
+def get_async_session():
+    """
+    Return a new asyncio session bound to the shared asyncio engine.
+    Use it as an async context manager (`async with get_async_session() as session:`).
+    Relationships are not loaded lazily in asyncio: the queries must load them with their options.
+    Returns(AsyncSession): SQLAlchemy asyncio session
+    """
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    return AsyncSession(get_async_engine(), expire_on_commit=False)
+
+
+async def gather_queries(*queries):
+    """
+    Run independent read queries concurrently, each one with its own session and so its own connection.
+    The queries take as long as the slowest one, instead of the sum of their durations.
+    Args:
+        queries(callable): async functions taking an AsyncSession, such as partials of the get_*_async methods
+    Returns(list): results of the queries, in order
+    """
+    async def run(query):
+        async with get_async_session() as session:
+            return await query(session)
+
+    return await asyncio.gather(*(run(query) for query in queries))
+
+
+def run_concurrently(*queries):
+    """
+    Run gather_queries from a synchronous command.
+    The pooled connections belong to the event loop of the call, they are closed before it ends.
+    Args:
+        queries(callable): async functions taking an AsyncSession
+    Returns(list): results of the queries, in order
+    """
+    async def main():
+        try:
+            return await gather_queries(*queries)
+        finally:
+            await get_async_engine().dispose()
+
+    return asyncio.run(main())
 
 
 config_group = click.Group('config')
 
 
+def read_high_water_mark(state_file):
+    """
+    Read the start date of the last dump recorded by dump-data.
+    Args:
+        state_file(str): file written by write_high_water_mark
+    Returns(datetime or None): None if no dump was recorded
+    """
+    try:
+        with open(state_file) as f:
+            return datetime.fromisoformat(json.load(f)['high_water_mark'])
+    except FileNotFoundError:
+        return None
+
+
+def write_high_water_mark(state_file, high_water_mark):
+    """
+    Record the start date of a dump, the file being replaced at once so that it is never half written.
+    Args:
+        state_file(str): file read by read_high_water_mark
+        high_water_mark(datetime): rows modified from this date are exported by the next dump-data --since last
+    """
+    temporary_file = f'{state_file}.tmp'
+    with open(temporary_file, 'w') as f:
+        json.dump({'high_water_mark': high_water_mark.isoformat()}, f)
+    os.replace(temporary_file, state_file)
+
+
 @config_group.command()
 @click.option('--filename', type=click.Path(exists=False, dir_okay=False), default='fixtures/database_dump.json')
-def dump_data(filename):
-    tables = Base.metadata.tables.keys()
-    data = {}
+@click.option('--batch-size', type=int, default=1000, help='Number of rows fetched from the server at a time.')
+@click.option('--since', metavar='TIMESTAMP|last', default=None,
+              help='Only export the rows created or modified since this ISO date, or since the last dump.')
+@click.option('--state-file', type=click.Path(dir_okay=False), default=None,
+              help='File recording the start date of the last dump, for --since last. '
+                   'Defaults to dump_state.json in the directory of the dump.')
+def dump_data(filename, batch_size, since, state_file):
+    """Export all tables to a json file, writing rows as they are fetched."""
+    state_file = state_file or os.path.join(os.path.dirname(filename), 'dump_state.json')
+    if since == 'last':
+        since = read_high_water_mark(state_file)
+        if since is None:
+            click.echo("No previous dump recorded, every row is exported.", err=True)
+    elif since:
+        try:
+            since = datetime.fromisoformat(since)
+        except ValueError:
+            raise click.BadParameter(f"{since!r} is neither an ISO date nor 'last'", param_hint="'--since'")
+    # taken before reading, rows changed during the dump are exported again by the next one. DATETIME columns don't
+    # keep the microseconds, the mark is rounded down to the second to never skip a row stored with a rounded date
+    high_water_mark = datetime.now().replace(microsecond=0)
+    # dependency order, so that load-data can insert the rows as they are read
+    tables = [table.name for table in Base.metadata.sorted_tables]
     engine = get_engine()
-    with engine.connect() as conn:
-        for table in tables:
-            result = conn.execute(text(f"SELECT * FROM {table}"))
-            data[table] = [row._asdict() for row in result]
-
-    with open(filename, 'w') as f:
-        json.dump(data, f)
+    with engine.connect() as conn, open(filename, 'w') as f:
+        # server-side cursor: rows are fetched by batches instead of being loaded all at once
+        conn = conn.execution_options(yield_per=batch_size)
+        f.write('{')
+        for table_index, table in enumerate(tables):
+            if table_index:
+                f.write(', ')
+            f.write(f'{json.dumps(table)}: [')
+            if since:
+                # range scan of the date_modified index
+                query = text(f"SELECT * FROM {table} WHERE date_modified >= :since")
+                result = conn.execute(query.bindparams(bindparam('since', since, type_=DateTime())))
+            else:
+                result = conn.execute(text(f"SELECT * FROM {table}"))
+            first_row = True
+            for rows in result.partitions():
+                for row in rows:
+                    if not first_row:
+                        f.write(', ')
+                    json.dump(row._asdict(), f, default=str)
+                    first_row = False
+            f.write(']')
+        f.write('}')
+    write_high_water_mark(state_file, high_water_mark)
 
 
 @config_group.command()
 @click.option('--filename', type=click.Path(exists=True, dir_okay=False), default='fixtures/init_data.json')
-def load_data(filename):
-    """Permet d'intégrer des données depuis un fichier json"""
-    with open(filename, 'r') as file:
-        json_data = json.load(file)
-
+@click.option('--chunk-size', type=int, default=1000, help='Number of rows sent per insert.')
+@click.option('--checkpoint', type=int, default=0, help='Commit every N rows (default: one commit for the whole load).')
+def load_data(filename, chunk_size, checkpoint):
+    """Permet d'intégrer des données depuis un fichier json, lu et inséré par paquets de lignes"""
     engine = get_engine()
-    with engine.connect() as conn:
-        for table_name in ['team_table', 'user_table', 'customer_table', 'contract_table', 'event_table']:
-            table = Base.metadata.tables[table_name]
-            if table_name not in json_data or not json_data[table_name]:
+    start = time.perf_counter()
+    loaded_rows = 0
+    uncommitted_rows = 0
+
+    def report(table_name):
+        rate = loaded_rows / max(time.perf_counter() - start, 1e-6)
+        click.echo(f"{table_name}: {loaded_rows} rows loaded ({rate:.0f} rows/s)")
+
+    with open(filename, 'r') as file, engine.connect() as conn:
+        for table_name, table_rows in groupby(iter_json_table_rows(file), key=itemgetter(0)):
+            table = Base.metadata.tables.get(table_name)
+            if table is None:
                 continue
-            sql_query = insert(table).values(json_data[table_name])
-            conn.execute(sql_query)
-            conn.commit()
+            datetime_columns = [column.name for column in table.columns if isinstance(column.type, DateTime)]
+            table_rows = (row for _, row in table_rows)
+            while chunk := list(islice(table_rows, chunk_size)):
+                for row in chunk:
+                    for column in datetime_columns:
+                        if isinstance(row.get(column), str):
+                            row[column] = datetime.fromisoformat(row[column])
+                conn.execute(insert(table), chunk)  # executemany
+                loaded_rows += len(chunk)
+                uncommitted_rows += len(chunk)
+                if checkpoint and uncommitted_rows >= checkpoint:
+                    conn.commit()
+                    uncommitted_rows = 0
+                    report(table_name)
+            report(table_name)
+        conn.commit()
 
 
 @config_group.command()
-def create_sample_data():
+@click.option('--target-ms', type=click.IntRange(min=1), default=250, show_default=True,
+              help='Time budget of one password hash, i.e. of a login.')
+@click.option('--memory-cost', type=click.IntRange(min=8), default=65536, show_default=True,
+              help='Maximum memory used by one hash, in KiB.')
+@click.option('--parallelism', type=click.IntRange(min=1), default=min(os.cpu_count() or 1, 4), show_default=True)
+@click.option('--save/--no-save', default=True, help='Write the chosen parameters to the .env file.')
+def calibrate_hashing(target_ms, memory_cost, parallelism, save):
+    """Benchmark argon2 on this host and choose the costs fitting the login time budget."""
+    from dotenv import set_key
+    from passlib.hash import argon2
+
+    def measure(time_cost, memory_cost):
+        hasher = argon2.using(rounds=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        durations = []
+        for _ in range(3):
+            start = time.perf_counter()
+            hasher.hash('calibration password')
+            durations.append((time.perf_counter() - start) * 1000)
+        duration = statistics.median(durations)
+        click.echo(f"time_cost={time_cost} memory_cost={memory_cost}KiB parallelism={parallelism}: {duration:.0f}ms")
+        return duration
+
+    # reduce the memory until the cheapest time cost fits the budget
+    while measure(1, memory_cost) > target_ms and memory_cost // 2 >= 8 * parallelism:
+        memory_cost //= 2
+    # then use as many passes as the budget allows
+    time_cost = 1
+    while time_cost < 20 and measure(time_cost + 1, memory_cost) <= target_ms:
+        time_cost += 1
+
+    click.echo(f"Chosen parameters: time_cost={time_cost} memory_cost={memory_cost}KiB parallelism={parallelism}")
+    if save:
+        set_key(ENV_FILE, 'ARGON2_TIME_COST', str(time_cost), quote_mode='never')
+        set_key(ENV_FILE, 'ARGON2_MEMORY_COST', str(memory_cost), quote_mode='never')
+        set_key(ENV_FILE, 'ARGON2_PARALLELISM', str(parallelism), quote_mode='never')
+        click.echo(f"Saved to {ENV_FILE}. Existing hashes are updated at the next login of each user.")
+
+
+@config_group.command()
+@click.option('--scale', type=click.IntRange(min=1), default=None,
+              help='Generate N random events, with N/2 contracts, N/4 customers and N/1000 users, '
+                   'instead of the example rows.')
+@click.option('--seed', 'random_seed', type=int, default=42, show_default=True, help='Seed of the --scale data.')
+@click.option('--chunk-size', type=click.IntRange(min=1), default=10000, show_default=True,
+              help='Number of rows sent per insert with --scale.')
+@click.option('--checkpoint', type=click.IntRange(min=1), default=500000, show_default=True,
+              help='Commit every N rows with --scale.')
+def create_sample_data(scale, random_seed, chunk_size, checkpoint):
     """Create example data for the project"""
 
     engine = get_engine()
+    if scale:
+        from models.user import hash_password
+        from sample_data import generate_sample_data
+
+        # every generated user can login with the password of the example users
+        return generate_sample_data(engine, scale, hash_password(SAMPLE_PASSWORD), random_seed, chunk_size,
+                                    checkpoint)
     with Session(engine) as session:
 
-        if not User.get_users(session):
+        if not User.get_users(session, limit=1):
             user_to_create = [
                 {
                     'username': 'tmanagement',
@@ -73,7 +308,7 @@ def create_sample_data():
                     'first_name': 'Thomas',
                     'last_name': 'Management',
                     'email': 'tmanagement@epicevent.com',
-                    'password': 'P@ssw0rd01',
+                    'password': SAMPLE_PASSWORD,
                     'phone': '',
                     'team_id': '1',  # management team
                 },
@@ -83,7 +318,7 @@ def create_sample_data():
                     'first_name': 'John',
                     'last_name': 'Sales',
                     'email': 'jsales@epicevent.com',
-                    'password': 'P@ssw0rd01',
+                    'password': SAMPLE_PASSWORD,
                     'phone': '',
                     'team_id': '2',  # sales team
                 },
@@ -93,7 +328,7 @@ def create_sample_data():
                     'first_name': 'Manu',
                     'last_name': 'Supports',
                     'email': 'msupports@epicevent.com',
-                    'password': 'P@ssw0rd01',
+                    'password': SAMPLE_PASSWORD,
                     'phone': '',
                     'team_id': '3',  # support team
                 },
@@ -103,7 +338,7 @@ def create_sample_data():
                     'first_name': 'Poire',
                     'last_name': 'Orth',
                     'email': 'porth@epicevent.com',
-                    'password': 'P@ssw0rd01',
+                    'password': SAMPLE_PASSWORD,
                     'phone': '',
                     'team_id': '1',
                 },
@@ -113,7 +348,7 @@ def create_sample_data():
                     'first_name': 'Alonzo',
                     'last_name': 'Vendre',
                     'email': 'avendre@epicevent.com',
-                    'password': 'P@ssw0rd01',
+                    'password': SAMPLE_PASSWORD,
                     'phone': '',
                     'team_id': '2',
                 },
@@ -123,15 +358,14 @@ def create_sample_data():
                     'first_name': 'Didier',
                     'last_name': 'Coudre',
                     'email': 'dcoudre@epicevent.com',
-                    'password': 'P@ssw0rd01',
+                    'password': SAMPLE_PASSWORD,
                     'phone': '',
                     'team_id': '3',
                 },
             ]
-            for user_data in user_to_create:
-                User.create(session, user_data)
+            User.bulk_create(session, user_to_create)
 
-        if not Customer.get_customers(session):
+        if not Customer.get_customers(session, limit=1):
             customer_to_create = [
                 {
                     'name': 'Alfred Trop',
@@ -162,40 +396,38 @@ def create_sample_data():
                     'sales_contact_id': 2,
                 }
             ]
-            for customer_data in customer_to_create:
-                Customer.create(session, customer_data)
+            Customer.bulk_create(session, customer_to_create)
 
-        if not Contract.get_contracts(session, not_signed=False, unpaid_contracts=False):
+        if not Contract.get_contracts(session, not_signed=False, unpaid_contracts=False, limit=1):
             contract_to_create = [
                 {
                     'total_balance': '2500',
                     'remaining_balance': '2500',
-                    'status': ContractStatus.CREATED,
+                    'status': ContractStatus.CREATED.value,
                     'customer_id': 1,
                 },
                 {
                     'total_balance': '4950',
                     'remaining_balance': '2000',
-                    'status': ContractStatus.SIGNED,
+                    'status': ContractStatus.SIGNED.value,
                     'customer_id': 2,
                 },
                 {
                     'total_balance': '1700',
                     'remaining_balance': '0',
-                    'status': ContractStatus.FINISHED,
+                    'status': ContractStatus.FINISHED.value,
                     'customer_id': 3,
                 },
                 {
                     'total_balance': '1234',
                     'remaining_balance': '1000',
-                    'status': ContractStatus.CREATED,
+                    'status': ContractStatus.CREATED.value,
                     'customer_id': 4,
                 }
             ]
-            for contract_data in contract_to_create:
-                Contract.create(session, contract_data)
+            Contract.bulk_create(session, contract_to_create)
 
-        if not Event.get_events(session):
+        if not Event.get_events(session, limit=1):
             events_to_create = [
                 {
                     'event_start_date': datetime(2024, 11, 5, 9, 0),
@@ -244,5 +476,6 @@ def create_sample_data():
                 },
             ]
 
-            for event_data in events_to_create:
-                Event.create(session, event_data)
+            Event.bulk_create(session, events_to_create)
+
+        session.commit()
@@ -1,38 +1,102 @@
 from functools import wraps
 
-from sentry_sdk import set_user
+import click
 
-from database import get_session
-from utils import get_user_from_token
+import database
+from utils import TokenUser, get_claims_from_token
 from views import show_error
 
 
+def show_refusal(message):
+    """
+    Display the refusal of a decorator when a command runs.
+    The API answers with an HTTP status instead: its handlers run in worker threads, outside of any click context.
+    """
+    if click.get_current_context(silent=True) is not None:
+        show_error(message)
+
+
 def manage_session(func):
-    """Intègre une session s'il n'y en pas déjà."""
+    """
+    Intègre une session s'il n'y en pas déjà, et la ferme à la fin de la commande.
+    The command is a unit of work: the models only flush their changes, which are committed once when the command
+    returns, or rolled back if it raises.
+    A session given by the caller is left to the caller.
+    """
     @wraps(func)
     def wrapper(*args, **kwargs):
         if kwargs.get("session"):
             return func(*args, **kwargs)
-        kwargs['session'] = get_session()
-        return func(*args, **kwargs)
+        with database.get_session() as session:
+            kwargs['session'] = session
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                session.rollback()
+                raise
+            session.commit()
+            return result
     return wrapper
 
 
 def login_required(func):
-    """decorator to ckeck if user is logged in"""
+    """
+    decorator to ckeck if user is logged in.
+    The user is built from the token claims, without loading it from the database.
+    """
     @wraps(func)
     def wrapper(*args, **kwargs):
         token = kwargs.pop("token")
-        session = kwargs['session']
-        user = get_user_from_token(token, session)
-        if user:
-            kwargs["user"] = user
-            set_user({"username": user.username})
+        claims = get_claims_from_token(token)
+        if claims:
+            from sentry_sdk import set_user
+
+            kwargs["user"] = TokenUser(claims)
+            set_user({"username": claims["username"]})
             return func(*args, **kwargs)
         else:
             return "You need to login to access this feature"
     return wrapper
 
+
+def user_entity_required(func):
+    """
+    decorator replacing the user from the token claims by the User entity.
+    It also refuses tokens revoked since they were issued.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        user = kwargs["user"].get_entity(kwargs["session"])
+        if not user:
+            message = "Your session has been revoked, please login again"
+            show_refusal(message)
+            return message
+        kwargs["user"] = user
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def pagination_options(model):
+    """decorator adding --order-by, --after, --limit and --page-size options to a list command"""
+    def decorator(func):
+        func = click.option('--page-size', type=click.IntRange(min=1), default=None,
+                            help='Display rows one page at a time, fetching the next page on demand.')(func)
+        func = click.option('--limit', type=click.IntRange(min=1), default=None,
+                            help='Maximum number of rows displayed.')(func)
+        func = click.option('--after', type=int, default=None,
+                            help='Continuation cursor: ID of the last row of the previous page.')(func)
+        func = click.option('--order-by', type=click.Choice(model.ORDERING_FIELDS), default='id',
+                            show_default=True)(func)
+        return func
+    return decorator
+
+
+def input_option(func):
+    """decorator adding the --input option, feeding a create or update command with a JSON list of records"""
+    return click.option('--input', 'input_file', type=click.Path(dir_okay=False, allow_dash=True), default=None,
+                        help='JSON file, or - for stdin, with a list of records applied without prompting.')(func)
+
+
 def permission_required(permission):
     """decorator to check if user has permission"""
     def decorator(func):
@@ -41,7 +105,7 @@ def permission_required(permission):
             user = kwargs.get("user")
             if user:
                 if not user.has_perm(permission):
-                    show_error("You do not have permission to access this feature")
+                    show_refusal("You do not have permission to access this feature")
                 else:
                     return func(*args, **kwargs)
         return wrapper
@@ -0,0 +1,66 @@
+"""
+Static interval tree, to find the overlaps of many intervals without comparing every pair.
+
+Intervals are half-open: [start, end) and [end, later) don't overlap, an event may begin when the previous one ends.
+"""
+
+
+class IntervalTree:
+    """
+    Augmented balanced search tree over a fixed set of intervals.
+    The intervals are sorted by start, the middle one of every slice being the root of its subtree, and every node keeps
+    the greatest end of its subtree: a query skips the subtrees ending before the searched interval and the ones
+    starting after it. Built in O(n log n), a query costs O(log n + number of overlaps).
+    """
+
+    def __init__(self, intervals):
+        """
+        Args:
+            intervals(Iterable[tuple]): (start, end, item) triples, any comparable bounds.
+        """
+        self._intervals = sorted(intervals, key=lambda interval: (interval[0], interval[1]))
+        self._max_end = [None] * len(self._intervals)
+        if self._intervals:
+            self._build(0, len(self._intervals) - 1)
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def _build(self, low, high):
+        """Compute the greatest end of the subtree rooted in the middle of [low, high], returned"""
+        middle = (low + high) // 2
+        max_end = self._intervals[middle][1]
+        if low < middle:
+            max_end = max(max_end, self._build(low, middle - 1))
+        if middle < high:
+            max_end = max(max_end, self._build(middle + 1, high))
+        self._max_end[middle] = max_end
+        return max_end
+
+    def overlapping(self, start, end):
+        """
+        Find the intervals overlapping [start, end).
+        Args:
+            start: start of the searched interval.
+            end: end of the searched interval.
+        Returns:
+            List[tuple]: the (start, end, item) triples, sorted by start.
+        """
+        found = []
+        slices = [(0, len(self._intervals) - 1)]
+        while slices:
+            low, high = slices.pop()
+            if low > high:
+                continue
+            middle = (low + high) // 2
+            if self._max_end[middle] <= start:
+                # every interval of the subtree ends before the searched one
+                continue
+            interval = self._intervals[middle]
+            if interval[0] < end:
+                if interval[1] > start:
+                    found.append(interval)
+                # the right subtree starts after this interval, it may still overlap
+                slices.append((middle + 1, high))
+            slices.append((low, middle - 1))
+        return sorted(found, key=lambda interval: (interval[0], interval[1]))
@@ -1,18 +1,91 @@
+import sys
+from importlib import import_module
+
 import click
-import sentry_sdk
 
-from controllers.auth import auth_cli
-from controllers.contract import contract_cli
-from controllers.customer import customer_cli
-from controllers.event import event_cli
-from controllers.user import user_cli
-from database import config_group
+__version__ = '1.1.0'
 
+# choices of --format, kept in sync with views.OUTPUT_FORMATS without importing rich for --help
+OUTPUT_FORMATS = ('table', 'csv', 'ndjson', 'json')
 
-global_cli = click.CommandCollection(name='test', sources=[auth_cli, user_cli, customer_cli, event_cli, contract_cli, config_group])
+# command name -> module defining it, imported only when the command is called
+LAZY_COMMANDS = {
+    'user-login': 'controllers.auth',
+    'create-user': 'controllers.user',
+    'get-user': 'controllers.user',
+    'get-users': 'controllers.user',
+    'delete-user': 'controllers.user',
+    'update-user': 'controllers.user',
+    'create-admin': 'controllers.user',
+    'import-users': 'controllers.user',
+    'create-customer': 'controllers.customer',
+    'get-customer': 'controllers.customer',
+    'get-customers': 'controllers.customer',
+    'delete-customer': 'controllers.customer',
+    'update-customer': 'controllers.customer',
+    'create-event': 'controllers.event',
+    'get-event': 'controllers.event',
+    'get-events': 'controllers.event',
+    'delete-event': 'controllers.event',
+    'update-event': 'controllers.event',
+    'find-conflicts': 'controllers.event',
+    'create-contract': 'controllers.contract',
+    'get-contract': 'controllers.contract',
+    'get-contracts': 'controllers.contract',
+    'delete-contract': 'controllers.contract',
+    'update-contract': 'controllers.contract',
+    'report-contracts': 'controllers.report',
+    'report-events': 'controllers.report',
+    'dashboard': 'controllers.report',
+    'search': 'controllers.search',
+    'dump-data': 'database',
+    'load-data': 'database',
+    'create-sample-data': 'database',
+    'calibrate-hashing': 'database',
+    'send-events': 'monitoring',
+    'serve': 'server',
+}
 
-if __name__ == '__main__':
-    global_cli()
-    sentry_sdk.flush()
 
+class LazyGroup(click.Group):
+    """Group importing the module of a command only when this command is invoked."""
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.lazy_commands:
+            return super().get_command(ctx, cmd_name)
+        module = import_module(self.lazy_commands[cmd_name])
+        return getattr(module, cmd_name.replace('-', '_'))
 
+    def format_commands(self, ctx, formatter):
+        """List the command names without importing their modules."""
+        with formatter.section('Commands'):
+            formatter.write_dl([(cmd_name, '') for cmd_name in self.list_commands(ctx)])
+
+
+@click.group(cls=LazyGroup, lazy_commands=LAZY_COMMANDS)
+@click.version_option(__version__)
+@click.option('--format', 'output_format', type=click.Choice(OUTPUT_FORMATS), default='table', show_default=True,
+              help='Output of the lists: rich table, or rows streamed to stdout as CSV, JSON lines or a JSON array.')
+def global_cli(output_format):
+    """Epic Events CRM"""
+    import settings
+    from views import set_output_format
+    settings.configure()
+    set_output_format(output_format)
+
+
+if __name__ == '__main__':
+    try:
+        global_cli()
+    finally:
+        if 'sentry_sdk' in sys.modules:  # only imported if a command ran
+            import monitoring
+            if not monitoring.is_sender:
+                monitoring.start_sender()
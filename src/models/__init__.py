@@ -1,10 +1,163 @@
-from sqlalchemy.orm import DeclarativeBase
+import enum
+from datetime import date, datetime
+
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
 # app/models/__init__.py
 
 class Base(DeclarativeBase):
-    pass
+    # columns usable to sort list queries, they must not be nullable
+    ORDERING_FIELDS = ('id',)
+    # columns never serialized by to_dict
+    PRIVATE_FIELDS = ()
+
+    @classmethod
+    def paginate(cls, query, order_by='id', after=None, limit=None):
+        """
+        Apply ordering and keyset pagination to a list query.
+        Args:
+            query(Select): query selecting the model.
+            order_by(str): name of the column to sort on, one of ORDERING_FIELDS.
+            after(int, optional): ID of the last row of the previous page (continuation cursor).
+            limit(int, optional): maximum number of rows returned.
+        Returns:
+            Select: the query sorted by (order_by, id) and starting after the cursor.
+        """
+        if order_by not in cls.ORDERING_FIELDS:
+            raise ValueError(f"Can't order by {order_by}")
+        column = getattr(cls, order_by)
+        if after is not None:
+            if order_by == 'id':
+                query = query.where(cls.id > after)
+            else:
+                # value of the sorting column on the cursor row, evaluated by the database
+                cursor_value = select(column).where(cls.id == after).scalar_subquery()
+                query = query.where(or_(column > cursor_value, and_(column == cursor_value, cls.id > after)))
+        query = query.order_by(column, cls.id) if order_by != 'id' else query.order_by(cls.id)
+        if limit:
+            query = query.limit(limit)
+        return query
+
+    @classmethod
+    def validate_data(cls, data):
+        """
+        Validate the fields of a row, models define validate_<field> class methods.
+        Args:
+            data(dict): field values, converted in place by the validators returning a value.
+        Returns:
+            List[str]: validation error messages, empty if the data is valid.
+        """
+        return []
+
+    @classmethod
+    def _prepare_bulk_rows(cls, session, rows, updating=False):
+        """
+        Turn validated rows into column values before they are written by bulk_create or bulk_update.
+        Args:
+            session(Session): SQLAlchemy session.
+            rows(List[dict]): validated rows, modified in place.
+            updating(bool): the rows update existing entities.
+        """
+
+    @classmethod
+    def _check_bulk_rows(cls, session, rows):
+        """
+        Check the valid rows of bulk_create or bulk_update together, against each other and the database.
+        Args:
+            session(Session): SQLAlchemy session.
+            rows(List[dict]): validated rows.
+        Returns:
+            List[str]: "Row <number>: <error>" messages, empty if the rows can be written.
+        """
+        return []
+
+    @classmethod
+    def _validate_bulk_rows(cls, session, rows, required=()):
+        """
+        Validate every row, raising one error for all the invalid rows.
+        Args:
+            session(Session): SQLAlchemy session.
+            rows(Iterable[dict]): rows to write, they are copied.
+            required(tuple): fields every row must have.
+        Returns:
+            List[dict]: the validated copies of the rows.
+        """
+        rows = [dict(row) for row in rows]
+        errors = []
+        for number, row in enumerate(rows, start=1):
+            row_errors = [f"{field} is required." for field in required if row.get(field) is None]
+            row_errors += cls.validate_data(row)
+            errors += [f"Row {number}: {error}" for error in row_errors]
+        if not errors:
+            errors = cls._check_bulk_rows(session, rows)
+        if errors:
+            raise ValueError('\n'.join(errors))
+        return rows
+
+    @classmethod
+    def bulk_create(cls, session, rows, batch_size=1000):
+        """
+        Validate rows and insert them with one executemany INSERT per batch, without loading them in the session.
+        Nothing is written if a row is invalid. Like the other writes, the insert is committed by the caller.
+        Args:
+            session(Session): SQLAlchemy session.
+            rows(Iterable[dict]): field values of the new rows.
+            batch_size(int): number of rows sent per statement.
+        Returns:
+            int: number of rows inserted.
+        """
+        rows = cls._validate_bulk_rows(session, rows)
+        cls._prepare_bulk_rows(session, rows)
+        for start in range(0, len(rows), batch_size):
+            session.execute(insert(cls), rows[start:start + batch_size])
+        return len(rows)
+
+    @classmethod
+    def bulk_update(cls, session, rows, batch_size=1000):
+        """
+        Validate rows and update them by primary key, with one executemany UPDATE per batch.
+        Nothing is written if a row is invalid. Like the other writes, the update is committed by the caller.
+        Args:
+            session(Session): SQLAlchemy session.
+            rows(Iterable[dict]): id and changed field values of each row.
+            batch_size(int): number of rows sent per statement.
+        Returns:
+            int: number of rows updated.
+        """
+        rows = cls._validate_bulk_rows(session, rows, required=('id',))
+        cls._prepare_bulk_rows(session, rows, updating=True)
+        for start in range(0, len(rows), batch_size):
+            session.execute(update(cls), rows[start:start + batch_size])
+        return len(rows)
+
+    def to_dict(self):
+        """
+        Serialize the columns of the instance, for the JSON API.
+        Returns:
+            dict: column values, enums replaced by their value and dates by their ISO format.
+        """
+        data = {}
+        for column in self.__table__.columns:
+            if column.key in self.PRIVATE_FIELDS:
+                continue
+            value = getattr(self, column.key)
+            if isinstance(value, enum.Enum):
+                value = value.value
+            elif isinstance(value, date):
+                value = value.isoformat()
+            data[column.key] = value
+        return data
+
+
+class TimestampMixin:
+    """
+    Creation and last modification dates, set by the application on every ORM or bulk write.
+    date_modified is indexed: dump-data --since only reads the rows changed since a date.
+    """
+    date_created: Mapped[datetime] = mapped_column(default=datetime.now)
+    date_modified: Mapped[datetime] = mapped_column(default=datetime.now, onupdate=datetime.now, index=True)
 
 
 from .user import User
@@ -12,3 +165,4 @@ from .team import Team
 from .customer import Customer
 from .contract import Contract, ContractStatus
 from .event import Event
+from .search import SEARCH_INDEXES
@@ -4,14 +4,14 @@ import enum
 from datetime import datetime
 from typing import List, Optional
 
-from sentry_sdk import capture_message
-from sqlalchemy import Enum, String, select
+from sqlalchemy import Enum, Index, String, case, func, select
 from sqlalchemy import ForeignKey
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import relationship
 
-from . import Base
+from . import Base, TimestampMixin
+from .customer import Customer
 from .user import User
 
 
@@ -22,17 +22,26 @@ class ContractStatus(enum.Enum):
     FINISHED = 'Finished'
 
 
-class Contract(Base):
+class Contract(TimestampMixin, Base):
     __tablename__ = "contract_table"
+    __table_args__ = (
+        # the lists filter on the status or the remaining balance, then page on (column, id)
+        Index('ix_contract_table_status_id', 'status', 'id'),
+        Index('ix_contract_table_remaining_balance_id', 'remaining_balance', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     total_balance: Mapped[float]
     remaining_balance: Mapped[float]
     status: Mapped[ContractStatus]
-    customer_id: Mapped[int] = mapped_column(ForeignKey("customer_table.id"))
+    customer_id: Mapped[int] = mapped_column(ForeignKey("customer_table.id"), index=True)
     customer: Mapped["Customer"] = relationship(back_populates="contracts")
     events: Mapped[List["Event"]] = relationship(back_populates="contract")
 
+    ORDERING_FIELDS = ('id', 'total_balance', 'remaining_balance')
+    # groupings of get_report
+    REPORT_GROUPS = ('customer', 'sales_contact')
+
     @classmethod
     def validate_status(cls, value):
         """
@@ -47,6 +56,24 @@ class Contract(Base):
                 return status
         raise ValueError('Status not in choice')
 
+    @classmethod
+    def validate_total_balance(cls, value):
+        """
+        Validate a balance amount.
+        Args:
+            value(str or float): The amount to validate.
+        Returns:
+            float: Validated amount.
+        """
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ValueError('The balance must be a number.')
+        try:
+            return float(value)
+        except ValueError:
+            raise ValueError('The balance must be a number.')
+
+    validate_remaining_balance = validate_total_balance
+
     @classmethod
     def validate_data(cls, contract_data):
         """
@@ -66,30 +93,93 @@ class Contract(Base):
                     contract_data[field_name] = getattr(cls, 'validate_' + field_name)(value)
                 except ValueError as e:
                     errors.append(str(e))
-        if 'total_balance' in contract_data and 'remaining_balance' in contract_data:
+        if not errors and 'total_balance' in contract_data and 'remaining_balance' in contract_data:
             if contract_data['remaining_balance'] > contract_data['total_balance']:
                 errors.append("Remaining balance can't be greater than total balance.")
 
         return errors
 
     @classmethod
-    def get_contracts(cls, session, not_signed, unpaid_contracts):
+    def contracts_query(cls, not_signed, unpaid_contracts, options=(), order_by='id', after=None, limit=None):
         """
-        Retrieve a list of contracts based on filters.
+        Build the query of get_contracts and get_contracts_async.
         Args:
-            session(Session): SQLAlchemy session.
             not_signed(bool): If True, filter only contracts with status 'Created'.
             unpaid_contracts(bool): If True, filter contracts with remaining balance greater than zero.
+            options(Iterable, optional): Load plan (loader options such as joinedload) for the relationships to display.
+            order_by(str, optional): Column to sort on, one of ORDERING_FIELDS.
+            after(int, optional): ID of the last contract of the previous page.
+            limit(int, optional): Maximum number of contracts returned.
         Returns:
-            List[Contract]: List of filtered contracts.
+            Select: The query selecting the filtered contracts.
         """
-        query = select(cls)
+        query = select(cls).options(*options)
         if not_signed:
             query = query.where(cls.status == ContractStatus.CREATED)
         elif unpaid_contracts:
             query = query.where(cls.remaining_balance > 0)
+        return cls.paginate(query, order_by, after, limit)
+
+    @classmethod
+    def get_contracts(cls, session, not_signed, unpaid_contracts, options=(), order_by='id', after=None, limit=None):
+        """
+        Retrieve a list of contracts based on filters.
+        Args:
+            session(Session): SQLAlchemy session.
+            not_signed, unpaid_contracts, options, order_by, after, limit: see contracts_query.
+        Returns:
+            List[Contract]: List of filtered contracts.
+        """
+        query = cls.contracts_query(not_signed, unpaid_contracts, options, order_by, after, limit)
         return session.scalars(query).all()
 
+    @classmethod
+    async def get_contracts_async(cls, session, not_signed, unpaid_contracts, options=(), order_by='id', after=None,
+                                  limit=None):
+        """
+        Retrieve a list of contracts based on filters, with an asyncio session.
+        Args:
+            session(AsyncSession): SQLAlchemy asyncio session.
+            not_signed, unpaid_contracts, options, order_by, after, limit: see contracts_query.
+        Returns:
+            List[Contract]: List of filtered contracts.
+        """
+        query = cls.contracts_query(not_signed, unpaid_contracts, options, order_by, after, limit)
+        return (await session.scalars(query)).all()
+
+    @classmethod
+    def get_report(cls, session, group_by='customer'):
+        """
+        Count the contracts and sum their balances per group, the aggregation being done by the database.
+        Args:
+            session(Session): SQLAlchemy session.
+            group_by(str, optional): one of REPORT_GROUPS. Defaults to 'customer'.
+        Returns:
+            Result: streamed rows of (group, contracts, signed, created, total_balance, remaining_balance),
+            the groups owing the most first.
+        """
+        if group_by not in cls.REPORT_GROUPS:
+            raise ValueError(f"Can't group by {group_by}")
+        key, label = (Customer.id, Customer.name) if group_by == 'customer' else (User.id, User.username)
+        remaining_balance = func.sum(cls.remaining_balance)
+        query = (
+            select(
+                label.label('group'),
+                func.count(cls.id).label('contracts'),
+                func.sum(case((cls.status == ContractStatus.SIGNED, 1), else_=0)).label('signed'),
+                func.sum(case((cls.status == ContractStatus.CREATED, 1), else_=0)).label('created'),
+                func.sum(cls.total_balance).label('total_balance'),
+                remaining_balance.label('remaining_balance'),
+            )
+            .select_from(cls)
+            .join(cls.customer)
+            .group_by(key, label)
+            .order_by(remaining_balance.desc(), key)
+        )
+        if group_by == 'sales_contact':
+            query = query.join(Customer.sales_contact)
+        return session.execute(query.execution_options(yield_per=1000))
+
     @classmethod
     def get_contract(cls, session, id):
         """
@@ -102,6 +192,18 @@ class Contract(Base):
         """
         return session.scalar(select(cls).where(cls.id == id))
 
+    @classmethod
+    async def get_contract_async(cls, session, id):
+        """
+        Retrieve a contract by its ID with an asyncio session.
+        Args:
+            session(AsyncSession): SQLAlchemy asyncio session.
+            id(int): ID of the contract.
+        Returns:
+            Optional[Contract]: The contract if found, otherwise None.
+        """
+        return await session.scalar(select(cls).where(cls.id == id))
+
     @classmethod
     def create(cls, session, contract_data):
         """
@@ -115,7 +217,7 @@ class Contract(Base):
         contract = cls()
         contract._update_data(contract_data)
         session.add(contract)
-        session.commit()
+        session.flush()
         return contract
 
     def update(self, session, contract_data):
@@ -126,7 +228,7 @@ class Contract(Base):
             contract_data(dict): Dictionary containing updated contract data.
         """
         self._update_data(contract_data)
-        session.commit()
+        session.flush()
 
     def _update_data(self, customer_data):
         """
@@ -136,6 +238,7 @@ class Contract(Base):
         """
         for key, value in customer_data.items():
             if key == 'status' and value == ContractStatus.SIGNED.value and self.status == ContractStatus.CREATED:
+                from sentry_sdk import capture_message
                 capture_message('New contract signed')
             if hasattr(self, key):
                 setattr(self, key, value)
@@ -147,4 +250,4 @@ class Contract(Base):
             session(Session): SQLAlchemy session.
         """
         session.delete(self)
-        session.commit()
+        session.flush()
@@ -2,33 +2,36 @@ from __future__ import annotations
 
 import enum
 import re
-from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import Enum, String, select
+from sqlalchemy import Enum, Index, String, select
 from sqlalchemy import ForeignKey
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import relationship
 
-from . import Base
+from . import Base, TimestampMixin
 from .user import User
 
 
-class Customer(Base):
+class Customer(TimestampMixin, Base):
     __tablename__ = "customer_table"
+    __table_args__ = (
+        # search command, SQLite uses an FTS5 table instead (see models.search)
+        Index('ix_customer_table_fulltext', 'name', 'company_name', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(50))
     email: Mapped[str] = mapped_column(String(100), unique=True)
     phone: Mapped[Optional[str]] = mapped_column(String(20))
     company_name: Mapped[str] = mapped_column(String(80))
-    date_created: Mapped[datetime] = mapped_column(default=datetime.now)
-    date_modified: Mapped[datetime] = mapped_column(default=datetime.now, onupdate=datetime.now)
-    sales_contact_id: Mapped[int] = mapped_column(ForeignKey("user_table.id"))
+    sales_contact_id: Mapped[int] = mapped_column(ForeignKey("user_table.id"), index=True)
     sales_contact: Mapped["User"] = relationship(back_populates="customers")
     contracts: Mapped[List["Contract"]] = relationship(back_populates="customer", cascade="all, delete-orphan")
 
+    ORDERING_FIELDS = ('id', 'name', 'company_name', 'date_created')
+
     def __str__(self):
         return self.name
 
@@ -41,7 +44,8 @@ class Customer(Base):
         Returns:
             str: The validated email.
         """
-        if email and not re.match(r"^((?!\.)[\w\-_.+]*[^.])(@\w+)(\.\w+(\.\w+)?[^.\W])$", email):
+        if email and (not isinstance(email, str)
+                      or not re.match(r"^((?!\.)[\w\-_.+]*[^.])(@\w+)(\.\w+(\.\w+)?[^.\W])$", email)):
             raise ValueError("""The email is not valid.""")
         return email
 
@@ -64,15 +68,42 @@ class Customer(Base):
         return errors
 
     @classmethod
-    def get_customers(cls, session):
+    def customers_query(cls, options=(), order_by='id', after=None, limit=None):
+        """
+        Build the query of get_customers and get_customers_async.
+        Args:
+            options (Iterable, optional): Load plan (loader options such as joinedload) for the relationships to display.
+            order_by (str, optional): Column to sort on, one of ORDERING_FIELDS. Defaults to 'id'.
+            after (int, optional): ID of the last customer of the previous page. Defaults to None.
+            limit (int, optional): Maximum number of customers returned. Defaults to None.
+        Returns:
+            Select: The query selecting the customers.
+        """
+        return cls.paginate(select(cls).options(*options), order_by, after, limit)
+
+    @classmethod
+    def get_customers(cls, session, options=(), order_by='id', after=None, limit=None):
         """
         Retrieve a list of all customers.
         Args:
             session (Session): SQLAlchemy session.
+            options, order_by, after, limit: see customers_query.
+        Returns:
+            List[Customer]: A list of all customers.
+        """
+        return session.scalars(cls.customers_query(options, order_by, after, limit)).all()
+
+    @classmethod
+    async def get_customers_async(cls, session, options=(), order_by='id', after=None, limit=None):
+        """
+        Retrieve a list of all customers with an asyncio session.
+        Args:
+            session (AsyncSession): SQLAlchemy asyncio session.
+            options, order_by, after, limit: see customers_query.
         Returns:
             List[Customer]: A list of all customers.
         """
-        return session.scalars(select(cls)).all()
+        return (await session.scalars(cls.customers_query(options, order_by, after, limit))).all()
 
     @classmethod
     def get_customer(cls, session, email):
@@ -86,6 +117,18 @@ class Customer(Base):
        """
         return session.scalar(select(cls).where(cls.email == email))
 
+    @classmethod
+    async def get_customer_async(cls, session, email):
+        """
+        Retrieve a customer by their email with an asyncio session.
+        Args:
+            session (AsyncSession): SQLAlchemy asyncio session.
+            email (str): The email of the customer.
+        Returns:
+            Optional[Customer]: The customer if found, otherwise None.
+        """
+        return await session.scalar(select(cls).where(cls.email == email))
+
     @classmethod
     def create(cls, session, customer_data):
         """
@@ -100,7 +143,7 @@ class Customer(Base):
         customer._update_data(customer_data)
 
         session.add(customer)
-        session.commit()
+        session.flush()
         return customer
 
     def update(self, session, customer_data):
@@ -111,7 +154,7 @@ class Customer(Base):
             customer_data (dict): Dictionary containing updated customer data.
         """
         self._update_data(customer_data)
-        session.commit()
+        session.flush()
 
 
     def _update_data(self, customer_data):
@@ -131,5 +174,5 @@ class Customer(Base):
             session(Session): SQLAlchemy session.
         """
         session.delete(self)
-        session.commit()
+        session.flush()
 
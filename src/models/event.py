@@ -1,45 +1,64 @@
 from __future__ import annotations
 
 import enum
+import heapq
+from collections import defaultdict
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import Enum, String, select
+from sqlalchemy import Enum, Index, String, extract, func, select
 from sqlalchemy import ForeignKey
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import relationship
 
-from . import Base
+from intervals import IntervalTree
+from . import Base, TimestampMixin
+from .contract import Contract
+from .customer import Customer
 from .user import User
 
 
-class Event(Base):
+class Event(TimestampMixin, Base):
     __tablename__ = "event_table"
+    __table_args__ = (
+        # events of a support contact (or without one) sorted by (date, id), and their overlaps read from the index
+        # only: the id comes before the end date to keep the keyset pagination order
+        Index('ix_event_table_support_contact_id_dates', 'support_contact_id', 'event_start_date', 'id',
+              'event_end_date'),
+        # search command, SQLite uses an FTS5 table instead (see models.search)
+        Index('ix_event_table_fulltext', 'location', 'notes', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    event_start_date: Mapped[datetime]
+    event_start_date: Mapped[datetime] = mapped_column(index=True)
     event_end_date: Mapped[datetime]
     location: Mapped[str] = mapped_column(String(250))
     attendees: Mapped[int]
     notes: Mapped[Optional[str]] = mapped_column(String(1000))
-    contract_id: Mapped[int] = mapped_column(ForeignKey("contract_table.id"))
+    contract_id: Mapped[int] = mapped_column(ForeignKey("contract_table.id"), index=True)
     contract: Mapped["Contract"] = relationship(back_populates="events")
     support_contact_id: Mapped[Optional[int]] = mapped_column(ForeignKey("user_table.id"))
     support_contact: Mapped[Optional["User"]] = relationship(back_populates="managed_events")
 
+    ORDERING_FIELDS = ('id', 'event_start_date', 'event_end_date', 'attendees')
+    # groupings of get_report
+    REPORT_GROUPS = ('customer', 'sales_contact', 'support_contact', 'month')
+
     @classmethod
     def validate_event_start_date(cls, value):
         """
         Validate the event start date format.
         Args:
-            value (str): The start date of the event in 'YYYY-MM-DD HH:MM' format.
+            value (str or datetime): The start date of the event in 'YYYY-MM-DD HH:MM' format.
         Returns:
             datetime: The validated start date as a datetime object.
         """
+        if isinstance(value, datetime):
+            return value
         try:
             return datetime.strptime(value, '%Y-%m-%d %H:%M')
-        except ValueError:
+        except (TypeError, ValueError):
             raise ValueError("""The date should respect YYYY-MM-DD HH:MM format.""")
 
     @classmethod
@@ -47,22 +66,45 @@ class Event(Base):
         """
         Validate the event end date format.
         Args:
-            value (str): The end date of the event in 'YYYY-MM-DD HH:MM' format.
+            value (str or datetime): The end date of the event in 'YYYY-MM-DD HH:MM' format.
         Returns:
             datetime: The validated end date as a datetime object.
         """
+        if isinstance(value, datetime):
+            return value
         try:
             return datetime.strptime(value, '%Y-%m-%d %H:%M')
-        except ValueError:
+        except (TypeError, ValueError):
             raise ValueError("""The date should respect YYYY-MM-DD HH:MM format.""")
 
     @classmethod
-    def validate_data(cls, event_data):
+    def validate_attendees(cls, value):
+        """
+        Validate the number of attendees.
+        Args:
+            value (str or int): The number of attendees.
+        Returns:
+            int: The validated number of attendees.
+        """
+        if isinstance(value, bool) or not isinstance(value, (str, int)):
+            raise ValueError("The number of attendees must be a positive integer.")
+        try:
+            attendees = int(value)
+        except ValueError:
+            raise ValueError("The number of attendees must be a positive integer.")
+        if attendees < 0:
+            raise ValueError("The number of attendees must be a positive integer.")
+        return attendees
+
+    @classmethod
+    def validate_data(cls, event_data, session=None, event=None):
         """
         Validate the event data.
 
         Args:
             event_data (dict): A dictionary containing the event data.
+            session (Session, optional): If set, the support contact must not have another event at the same time.
+            event (Event, optional): The updated event, giving the dates and support contact not in event_data.
 
         Returns:
             List[str]: A list of validation error messages, empty if no errors.
@@ -75,31 +117,222 @@ class Event(Base):
                     event_data[field_name] = getattr(cls, 'validate_' + field_name)(value)
                 except ValueError as e:
                     errors.append(str(e))
-        if event_data['event_start_date'] and event_data['event_end_date']:
+        # the dates are only comparable once both are valid
+        if not errors and event_data.get('event_start_date') and event_data.get('event_end_date'):
             if event_data['event_start_date'] > event_data['event_end_date']:
                 errors.append('Event end date must be after event start date.')
 
+        if session is not None and not errors:
+            conflicts = cls.get_conflicts(session, *cls._schedule(event_data, event))
+            if conflicts:
+                errors.append(f"The support contact already has an event at that time (event "
+                              f"{', '.join(str(conflict_id) for conflict_id in conflicts)}).")
         return errors
 
+    @staticmethod
+    def _schedule(event_data, event=None):
+        """
+        Merge the support contact and the dates of event data with the ones of the updated event.
+        Args:
+            event_data (dict): Validated event data, the support contact being an entity or an ID.
+            event (Event or Row, optional): The updated event.
+        Returns:
+            tuple: (support_contact_id, event_start_date, event_end_date, id of the updated event).
+        """
+        if event_data.get('support_contact') is not None:
+            support_contact_id = event_data['support_contact'].id
+        else:
+            support_contact_id = event_data.get('support_contact_id', getattr(event, 'support_contact_id', None))
+        return (
+            support_contact_id,
+            event_data.get('event_start_date', getattr(event, 'event_start_date', None)),
+            event_data.get('event_end_date', getattr(event, 'event_end_date', None)),
+            getattr(event, 'id', None),
+        )
+
     @classmethod
-    def get_events(cls, session, user=None, filter_empty=False, user_only=False):
+    def get_conflicts(cls, session, support_contact_id, start, end, exclude_id=None):
         """
-        Retrieve a list of events.
+        Find the events of a support contact overlapping a period, an event may start when another one ends.
+        The range scan of the (support_contact_id, event_start_date, id, event_end_date) index answers the query without
+        reading the table.
+        Args:
+            session (Session): SQLAlchemy session.
+            support_contact_id (int or None): The support contact, no event conflicts without one.
+            start (datetime): Start of the period.
+            end (datetime): End of the period.
+            exclude_id (int, optional): The updated event, which doesn't conflict with itself.
+        Returns:
+            List[int]: The IDs of the overlapping events, sorted by start date.
+        """
+        if support_contact_id is None or start is None or end is None:
+            return []
+        query = select(cls.id).where(cls.support_contact_id == support_contact_id, cls.event_start_date < end,
+                                     cls.event_end_date > start)
+        if exclude_id is not None:
+            query = query.where(cls.id != exclude_id)
+        return session.scalars(query.order_by(cls.event_start_date, cls.id)).all()
+
+    @classmethod
+    def _check_bulk_rows(cls, session, rows):
+        """
+        Check that the rows don't give a support contact overlapping events, between them or with the stored events.
+        The stored events of the support contacts in the period of the batch are read with one query, then every row
+        is looked up in an interval tree per support contact.
+        Args:
+            session (Session): SQLAlchemy session.
+            rows (List[dict]): validated rows, the updated rows only giving their changed fields.
+        Returns:
+            List[str]: "Row <number>: <error>" messages.
+        """
+        columns = (cls.id, cls.support_contact_id, cls.event_start_date, cls.event_end_date)
+        updated_ids = [row['id'] for row in rows if row.get('id') is not None]
+        stored = {}
+        if updated_ids:
+            stored = {event.id: event for event in session.execute(select(*columns).where(cls.id.in_(updated_ids)))}
+        schedules = {}
+        for number, row in enumerate(rows, start=1):
+            support_contact_id, start, end, _ = cls._schedule(row, stored.get(row.get('id')))
+            if support_contact_id is not None and start is not None and end is not None:
+                schedules[number] = (support_contact_id, start, end)
+        if not schedules:
+            return []
+
+        intervals = defaultdict(list)
+        for number, (support_contact_id, start, end) in schedules.items():
+            intervals[support_contact_id].append((start, end, ('row', number)))
+        query = select(*columns).where(
+            cls.support_contact_id.in_(intervals),
+            cls.event_start_date < max(end for _, _, end in schedules.values()),
+            cls.event_end_date > min(start for _, start, _ in schedules.values()),
+        )
+        for event in session.execute(query.execution_options(yield_per=1000)):
+            # the stored dates of the updated events are replaced by the ones of their row
+            if event.id not in stored:
+                intervals[event.support_contact_id].append((event.event_start_date, event.event_end_date,
+                                                            ('event', event.id)))
+        trees = {support_contact_id: IntervalTree(contact_intervals)
+                 for support_contact_id, contact_intervals in intervals.items()}
+
+        errors = []
+        for number, (support_contact_id, start, end) in schedules.items():
+            for _, _, (kind, other) in trees[support_contact_id].overlapping(start, end):
+                if kind == 'event':
+                    errors.append(f"Row {number}: The support contact already has an event at that time "
+                                  f"(event {other}).")
+                elif other < number:
+                    # every pair of rows is reported once, on the second row
+                    errors.append(f"Row {number}: The support contact already has an event at that time "
+                                  f"(row {other}).")
+        return errors
+
+    @classmethod
+    def iter_conflicts(cls, session):
+        """
+        Scan the whole calendar for the overlapping events of every support contact.
+        The events are read in the order of the (support_contact_id, event_start_date, ...) index and swept with a
+        heap of the events still running, so the scan costs O(n log n + conflicts) and only keeps the running events
+        in memory.
         Args:
             session (Session): SQLAlchemy session.
-            user (User, optional): The user to filter events by. Defaults to None.
+        Yields:
+            tuple: (support contact username, event ID, later event ID, overlap start, overlap end).
+        """
+        query = select(User.username, cls.id, cls.support_contact_id, cls.event_start_date, cls.event_end_date) \
+            .join(cls.support_contact) \
+            .order_by(cls.support_contact_id, cls.event_start_date, cls.id)
+        support_contact_id = None
+        running = []
+        for event in session.execute(query.execution_options(yield_per=1000)):
+            if event.support_contact_id != support_contact_id:
+                support_contact_id, running = event.support_contact_id, []
+            while running and running[0][0] <= event.event_start_date:
+                heapq.heappop(running)
+            for end, event_id in sorted(running, key=lambda item: item[1]):
+                yield event.username, event_id, event.id, event.event_start_date, min(end, event.event_end_date)
+            heapq.heappush(running, (event.event_end_date, event.id))
+
+    @classmethod
+    def events_query(cls, user=None, filter_empty=False, user_only=False, options=(), order_by='id', after=None,
+                     limit=None):
+        """
+        Build the query of get_events and get_events_async.
+        Args:
+            user (User or TokenUser, optional): The user to filter events by. Defaults to None.
             filter_empty (bool, optional): Flag to filter events without support contact. Defaults to False.
             user_only (bool, optional): Flag to filter events assigned to the user. Defaults to False.
+            options (Iterable, optional): Load plan (loader options such as joinedload) for the relationships to display.
+            order_by (str, optional): Column to sort on, one of ORDERING_FIELDS. Defaults to 'id'.
+            after (int, optional): ID of the last event of the previous page. Defaults to None.
+            limit (int, optional): Maximum number of events returned. Defaults to None.
         Returns:
-            List[Event]: A list of events that match the filtering criteria.
+            Select: The query selecting the events that match the filtering criteria.
         """
-        query = select(cls)
+        query = select(cls).options(*options)
         if user and user_only:
-            query = query.filter(cls.support_contact == user)
+            query = query.filter(cls.support_contact_id == user.id)
         elif filter_empty:
             query = query.filter(cls.support_contact_id == None)
+        return cls.paginate(query, order_by, after, limit)
+
+    @classmethod
+    def get_events(cls, session, user=None, filter_empty=False, user_only=False, options=(), order_by='id', after=None,
+                   limit=None):
+        """
+        Retrieve a list of events.
+        Args:
+            session (Session): SQLAlchemy session.
+            user, filter_empty, user_only, options, order_by, after, limit: see events_query.
+        Returns:
+            List[Event]: A list of events that match the filtering criteria.
+        """
+        query = cls.events_query(user, filter_empty, user_only, options, order_by, after, limit)
         return session.scalars(query).all()
 
+    @classmethod
+    async def get_events_async(cls, session, user=None, filter_empty=False, user_only=False, options=(), order_by='id',
+                               after=None, limit=None):
+        """
+        Retrieve a list of events with an asyncio session.
+        Args:
+            session (AsyncSession): SQLAlchemy asyncio session.
+            user, filter_empty, user_only, options, order_by, after, limit: see events_query.
+        Returns:
+            List[Event]: A list of events that match the filtering criteria.
+        """
+        query = cls.events_query(user, filter_empty, user_only, options, order_by, after, limit)
+        return (await session.scalars(query)).all()
+
+    @classmethod
+    def get_report(cls, session, group_by='customer'):
+        """
+        Count the events and sum their attendees per group, the aggregation being done by the database.
+        Args:
+            session (Session): SQLAlchemy session.
+            group_by (str, optional): One of REPORT_GROUPS. Defaults to 'customer'.
+        Returns:
+            Result: Streamed rows of (group, events, attendees), the group of the events without support contact
+            being None. Grouped by month, the rows are (year, month, events, attendees) in chronological order.
+        """
+        if group_by not in cls.REPORT_GROUPS:
+            raise ValueError(f"Can't group by {group_by}")
+        aggregates = (func.count(cls.id).label('events'), func.sum(cls.attendees).label('attendees'))
+        if group_by == 'month':
+            year, month = extract('year', cls.event_start_date), extract('month', cls.event_start_date)
+            query = select(year.label('year'), month.label('month'), *aggregates).group_by(year, month)
+            query = query.order_by(year, month)
+        else:
+            key, label = (Customer.id, Customer.name) if group_by == 'customer' else (User.id, User.username)
+            query = select(label.label('group'), *aggregates).select_from(cls)
+            if group_by == 'support_contact':
+                query = query.outerjoin(cls.support_contact)
+            else:
+                query = query.join(cls.contract).join(Contract.customer)
+            if group_by == 'sales_contact':
+                query = query.join(Customer.sales_contact)
+            query = query.group_by(key, label).order_by(func.sum(cls.attendees).desc(), key)
+        return session.execute(query.execution_options(yield_per=1000))
+
     @classmethod
     def get_event(cls, session, id):
         """
@@ -112,6 +345,18 @@ class Event(Base):
         """
         return session.scalar(select(cls).where(cls.id == id))
 
+    @classmethod
+    async def get_event_async(cls, session, id):
+        """
+        Retrieve an event by its ID with an asyncio session.
+        Args:
+            session (AsyncSession): SQLAlchemy asyncio session.
+            id (int): The ID of the event to retrieve.
+        Returns:
+            Event or None: The event with the given ID, or None if not found.
+        """
+        return await session.scalar(select(cls).where(cls.id == id))
+
     @classmethod
     def create(cls, session, event_data):
         """
@@ -126,7 +371,7 @@ class Event(Base):
         event._update_data(event_data)
 
         session.add(event)
-        session.commit()
+        session.flush()
         return event
 
     def update(self, session, event_data):
@@ -137,7 +382,7 @@ class Event(Base):
             event_data (dict): A dictionary containing the updated event data.
         """
         self._update_data(event_data)
-        session.commit()
+        session.flush()
 
     def _update_data(self, event_data):
         """
@@ -157,5 +402,5 @@ class Event(Base):
             session (Session): SQLAlchemy session.
         """
         session.delete(self)
-        session.commit()
+        session.flush()
 
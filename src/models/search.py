@@ -0,0 +1,153 @@
+"""
+Full-text search over customers, events and users.
+
+MySQL uses the FULLTEXT indexes declared on the models, queried with MATCH ... AGAINST in natural language mode.
+SQLite uses FTS5 external content tables: they are created with the tables, and triggers keep them up to date, so
+rows written by the ORM, by bulk inserts or by load-data are all indexed.
+Other databases fall back to LIKE conditions, without index.
+In every case a hit matches any of the words, the hits matching more of them being ranked first.
+"""
+import re
+from typing import NamedTuple, Tuple
+
+from sqlalchemy import DDL, case, column, event, func, literal, literal_column, or_, select, table, union_all
+from sqlalchemy.dialects.mysql import match
+
+from .customer import Customer
+from .event import Event
+from .user import User
+
+
+class SearchIndex(NamedTuple):
+    model: type
+    # indexed columns, in the order of the FULLTEXT index
+    columns: Tuple[str, ...]
+    # permission needed to see the hits
+    permission: str
+
+    @property
+    def fts_table(self):
+        """name of the FTS5 table of the SQLite databases"""
+        return self.model.__tablename__.replace('_table', '_search')
+
+
+SEARCH_INDEXES = {
+    'customer': SearchIndex(Customer, ('name', 'company_name'), 'list_customers'),
+    'event': SearchIndex(Event, ('location', 'notes'), 'list_events'),
+    'user': SearchIndex(User, ('username', 'first_name', 'last_name'), 'list_users'),
+}
+
+
+def fts_statements(index):
+    """
+    Return the SQLite statements creating the FTS5 table of an index and the triggers keeping it up to date.
+    Args:
+        index(SearchIndex): searched table
+    Returns(List[str]):
+    """
+    name, source = index.fts_table, index.model.__tablename__
+    columns = ', '.join(index.columns)
+    new_values = ', '.join(f'new.{column_name}' for column_name in index.columns)
+    old_values = ', '.join(f'old.{column_name}' for column_name in index.columns)
+    # external content tables are told the old values of a row to remove it
+    delete_old = f"INSERT INTO {name}({name}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {name}(rowid, {columns}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE {name} USING fts5({columns}, content='{source}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {name}_insert AFTER INSERT ON {source} BEGIN {insert_new} END",
+        f"CREATE TRIGGER {name}_delete AFTER DELETE ON {source} BEGIN {delete_old} END",
+        f"CREATE TRIGGER {name}_update AFTER UPDATE OF {columns} ON {source} BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+for search_index in SEARCH_INDEXES.values():
+    for statement in fts_statements(search_index):
+        event.listen(search_index.model.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+    event.listen(search_index.model.__table__, 'after_drop',
+                 DDL(f"DROP TABLE IF EXISTS {search_index.fts_table}").execute_if(dialect='sqlite'))
+
+
+def hit_columns(kind):
+    """Return the title and detail columns displayed for the hits of a kind"""
+    if kind == 'customer':
+        return Customer.name, Customer.company_name
+    if kind == 'event':
+        return Event.location, Event.notes
+    return User.username, func.coalesce(User.first_name, '') + ' ' + func.coalesce(User.last_name, '')
+
+
+def word_condition(index, word, dialect):
+    """
+    Return the condition of the rows of an index containing a word.
+    Args:
+        index(SearchIndex): searched table
+        word(str): searched word
+        dialect(str): name of the database dialect
+    Returns(ColumnElement):
+    """
+    columns = [getattr(index.model, column_name) for column_name in index.columns]
+    if dialect == 'mysql':
+        return match(*columns, against=word) > 0
+    if dialect == 'sqlite':
+        fts = table(index.fts_table, column('rowid'))
+        return index.model.id.in_(select(fts.c.rowid).where(literal_column(index.fts_table).op('MATCH')(f'"{word}"')))
+    pattern = '%' + re.sub(r'([\\%_])', r'\\\1', word) + '%'
+    return or_(*(column_.ilike(pattern, escape='\\') for column_ in columns))
+
+
+def full_text_search(session, text, kinds=tuple(SEARCH_INDEXES), limit=20, offset=0):
+    """
+    Search the words of a text in the full-text indexes, best hits first.
+    Every table only contributes its offset + limit best hits, the ranking never sorts all the matching rows.
+    The hits are merged by the number of searched words they contain. The relevances of MATCH and bm25 have
+    different scales, they are only compared inside their table: the rank of a hit in its table orders the hits
+    containing as many words.
+    Args:
+        session(Session): SQLAlchemy session.
+        text(str): searched words, other characters are ignored.
+        kinds(Iterable[str]): searched indexes, keys of SEARCH_INDEXES.
+        limit(int): maximum number of hits returned.
+        offset(int): number of better hits skipped, for the next pages.
+    Returns:
+        List[Row]: (kind, id, title, detail, score) rows.
+    """
+    words = re.findall(r'\w+', text)
+    if not words or not kinds:
+        return []
+    dialect = session.get_bind().dialect.name
+
+    hits = []
+    for kind in kinds:
+        index = SEARCH_INDEXES[kind]
+        model = index.model
+        title, detail = hit_columns(kind)
+        found_words = sum(case((word_condition(index, word, dialect), 1), else_=0) for word in words)
+        if dialect == 'mysql':
+            relevance = match(*(getattr(model, column_name) for column_name in index.columns), against=' '.join(words))
+            query = select(model.id.label('id')).where(relevance)
+        elif dialect == 'sqlite':
+            fts = table(index.fts_table, column('rowid'), column('rank'))
+            # quoted words are taken literally, FTS5 operators in the text are not interpreted
+            terms = ' OR '.join(f'"{word}"' for word in words)
+            # bm25 rank: the lower, the better
+            relevance = -fts.c.rank
+            query = select(model.id.label('id')) \
+                .join_from(model, fts, fts.c.rowid == model.id) \
+                .where(literal_column(index.fts_table).op('MATCH')(terms))
+        else:
+            relevance = found_words
+            query = select(model.id.label('id')).where(or_(*(word_condition(index, word, dialect) for word in words)))
+        query = query.add_columns(found_words.label('found_words'), relevance.label('relevance'),
+                                  literal(kind).label('kind'), title.label('title'), detail.label('detail'))
+        order = (literal_column('found_words').desc(), literal_column('relevance').desc(), literal_column('id'))
+        best = query.order_by(*order).limit(offset + limit).subquery()
+        # the rank is only computed on the offset + limit best hits, it doesn't depend on them
+        rank = func.row_number().over(order_by=(best.c.found_words.desc(), best.c.relevance.desc(), best.c.id))
+        # 1 / rank is in (0, 1]: it never outweighs one more word found
+        score = best.c.found_words + 1.0 / rank
+        hits.append(select(best.c.kind, best.c.id, best.c.title, best.c.detail, score.label('score')))
+
+    ranked = union_all(*hits).subquery()
+    query = select(ranked).order_by(ranked.c.score.desc(), ranked.c.kind, ranked.c.id).offset(offset).limit(limit)
+    return session.execute(query).all()
@@ -7,10 +7,60 @@ from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import relationship
 
-from . import Base
+from . import Base, TimestampMixin
 
+BASE_PERMISSIONS = (
+    'list_contracts',
+    'read_contract',
+    'list_events',
+    'read_event',
+    'list_customers',
+    'read_customer',
+)
 
-class Team(Base):
+# permissions granted to each team, in addition to BASE_PERMISSIONS
+TEAMS_PERMISSIONS_CONFIG = {
+    "Management team": (
+        'create_user',
+        'read_user',
+        'list_users',
+        'delete_user',
+        'update_user',
+        'create_contract',
+        'update_contract',
+        'update_event',
+        'update_event_support',
+    ),
+    "Sales team": (
+        'create_customer',
+        'update_customer',
+        'update_only_my_customers',
+        'update_contract',
+        'update_only_my_contracts',
+        'create_event',
+    ),
+    "Support team": (
+        'update_event',
+        'update_only_my_events',
+    ),
+}
+
+# ids of the teams, inserted with them by init_team (the first migration inserts them in this order)
+TEAM_IDS = {
+    "Management team": 1,
+    "Sales team": 2,
+    "Support team": 3,
+}
+
+# compiled once at startup, so that a permission check is a set lookup. Keyed by team id, a renamed team keeps its
+# permissions
+TEAM_PERMISSIONS = {
+    TEAM_IDS[team_name]: frozenset(BASE_PERMISSIONS + permissions)
+    for team_name, permissions in TEAMS_PERMISSIONS_CONFIG.items()
+}
+
+
+class Team(TimestampMixin, Base):
     __tablename__ = "team_table"
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -24,43 +74,9 @@ class Team(Base):
         """
         Returns the permissions associated with the team.
         Returns:
-            List[str]: A list of permissions granted to the team.
+            FrozenSet[str]: The permissions granted to the team.
         """
-        base_perms = [
-            'list_contracts',
-            'read_contract',
-            'list_events',
-            'read_event',
-            'list_customers',
-            'read_customer',
-        ]
-        if self.name == "Management team":
-            return base_perms + [
-                'create_user',
-                'read_user',
-                'list_users',
-                'delete_user',
-                'update_user',
-                'create_contract',
-                'update_contract',
-                'update_event',
-                'update_event_support',
-            ]
-        if self.name == "Sales team":
-            return base_perms + [
-                'create_customer',
-                'update_customer',
-                'update_only_my_customers',
-                'update_contract',
-                'update_only_my_contracts',
-                'create_event',
-            ]
-        if self.name == "Support team":
-            return base_perms + [
-                'update_event',
-                'update_only_my_events',
-            ]
-
+        return TEAM_PERMISSIONS.get(self.id, frozenset())
 
     @classmethod
     def get_teams(cls, session):
@@ -88,6 +104,4 @@ class Team(Base):
 @event.listens_for(Team.__table__, "after_create")
 def init_team(target, connection, **kwargs):
     """listen for the 'after_create' event --> only if we use metadata.create_all"""
-    connection.execute(insert(target).values(name="Management team"))
-    connection.execute(insert(target).values(name="Sales team"))
-    connection.execute(insert(target).values(name="Support team"))
+    connection.execute(insert(target), [{'id': team_id, 'name': team_name} for team_name, team_id in TEAM_IDS.items()])
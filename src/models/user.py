@@ -1,22 +1,69 @@
 from __future__ import annotations
 
 import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
 from typing import List, Optional
-from passlib.hash import argon2
-from sentry_sdk import capture_message
-from sqlalchemy import ForeignKey, String, select
+from sqlalchemy import ForeignKey, Index, String, or_, select
 from sqlalchemy import Integer
-from sqlalchemy.orm import Mapped, validates
+from sqlalchemy.orm import Mapped, joinedload, validates
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import relationship
 
-from . import Base
+from . import Base, TimestampMixin
 
 
+@cache
+def get_password_hasher():
+    """
+    Return the argon2 hasher configured with the cost parameters of the settings.
+    Returns:
+        argon2: passlib argon2 handler.
+    """
+    from passlib.hash import argon2
+    from settings import ARGON2_MEMORY_COST, ARGON2_PARALLELISM, ARGON2_TIME_COST
 
-class User(Base):
+    costs = {'rounds': ARGON2_TIME_COST, 'memory_cost': ARGON2_MEMORY_COST, 'parallelism': ARGON2_PARALLELISM}
+    return argon2.using(**{name: value for name, value in costs.items() if value})
+
+
+def hash_password(password):
+    """
+    Hash a password with argon2.
+    It is a module function so that it can be sent to worker processes.
+    Args:
+        password (str): The clear password.
+    Returns:
+        str: The argon2 hash.
+    """
+    return get_password_hasher().hash(password)
+
+
+def hash_passwords(passwords):
+    """
+    Hash passwords with argon2, in PASSWORD_HASH_WORKERS processes if there are several.
+    Args:
+        passwords (List[str]): The clear passwords.
+    Returns:
+        List[str]: The argon2 hashes, in the same order.
+    """
+    from settings import PASSWORD_HASH_WORKERS
+
+    if len(passwords) < 2 or PASSWORD_HASH_WORKERS < 2:
+        return [hash_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS) as executor:
+        return list(executor.map(hash_password, passwords,
+                                 chunksize=max(1, len(passwords) // (PASSWORD_HASH_WORKERS * 4))))
+
+
+class User(TimestampMixin, Base):
 
     __tablename__ = "user_table"
+    __table_args__ = (
+        # search command, SQLite uses an FTS5 table instead (see models.search)
+        Index('ix_user_table_fulltext', 'username', 'first_name', 'last_name',
+              mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     personal_number: Mapped[str] = mapped_column(String(10), unique=True)
@@ -27,10 +74,15 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(100), unique=True)
     phone: Mapped[Optional[str]] = mapped_column(String(20))
     team_id: Mapped[int] = mapped_column(ForeignKey("team_table.id"))
+    # incremented to revoke the tokens already issued to the user
+    token_version: Mapped[int] = mapped_column(default=0, server_default='0')
     team: Mapped["Team"] = relationship(back_populates="members")
     customers: Mapped[List["Customer"]] = relationship("Customer", back_populates="sales_contact")
     managed_events: Mapped[List["Event"]] = relationship("Event", back_populates="support_contact")
 
+    ORDERING_FIELDS = ('id', 'username', 'personal_number')
+    PRIVATE_FIELDS = ('password', 'token_version')
+
     def __str__(self):
         return f"{self.username} ({self.first_name} {self.last_name})"
 
@@ -43,7 +95,7 @@ class User(Base):
         Returns:
             str: The validated username.
         """
-        if len(username) < 5 or not re.match(r"^[a-zA-Z][a-zA-Z0-9]+$", username):
+        if not isinstance(username, str) or len(username) < 5 or not re.match(r"^[a-zA-Z][a-zA-Z0-9]+$", username):
             raise ValueError("""The username must contain at least 5 characters and consist only of letters and number, starting with a letter.""")
         return username
 
@@ -56,7 +108,8 @@ class User(Base):
         Returns:
             str: The validated email.
         """
-        if email and  not re.match(r"^((?!\.)[\w\-_.+]*[^.])(@\w+)(\.\w+(\.\w+)?[^.\W])$", email):
+        if email and (not isinstance(email, str)
+                      or not re.match(r"^((?!\.)[\w\-_.+]*[^.])(@\w+)(\.\w+(\.\w+)?[^.\W])$", email)):
             raise ValueError("""The email is not valid.""")
         return email
 
@@ -69,7 +122,7 @@ class User(Base):
         Returns:
             str: The validated personal number.
         """
-        if len(personal_number) != 10 or not re.match(r"^[0-9]+$", personal_number):
+        if not isinstance(personal_number, str) or len(personal_number) != 10 or not re.match(r"^[0-9]+$", personal_number):
             raise ValueError("""Employee ID must be 10 numbers""")
         return personal_number
 
@@ -82,7 +135,7 @@ class User(Base):
         Returns:
             str: The validated password.
         """
-        if not re.match(r"^(?=.*[a-z])(?=.*[A-Z])(?=.*\d).{8,}$", password):
+        if not isinstance(password, str) or not re.match(r"^(?=.*[a-z])(?=.*[A-Z])(?=.*\d).{8,}$", password):
             raise ValueError("""Password must contain at least 8 characters, including lowercase, uppercase, and a number.""")
         return password
 
@@ -105,15 +158,54 @@ class User(Base):
         return errors
 
     @classmethod
-    def get_users(cls, session):
+    def users_query(cls, options=(), order_by='id', after=None, limit=None):
+        """
+        Build the query of get_users and get_users_async.
+        Args:
+            options (Iterable, optional): Load plan (loader options such as joinedload) for the relationships to display.
+            order_by (str, optional): Column to sort on, one of ORDERING_FIELDS. Defaults to 'id'.
+            after (int, optional): ID of the last user of the previous page. Defaults to None.
+            limit (int, optional): Maximum number of users returned. Defaults to None.
+        Returns:
+            Select: The query selecting the users.
+        """
+        return cls.paginate(select(cls).options(*options), order_by, after, limit)
+
+    @classmethod
+    def get_users(cls, session, options=(), order_by='id', after=None, limit=None):
         """
         Retrieve a list of all users.
         Args:
             session (Session): SQLAlchemy session.
+            options, order_by, after, limit: see users_query.
         Returns:
             List[User]: A list of all users.
         """
-        return session.scalars(select(cls)).all()
+        return session.scalars(cls.users_query(options, order_by, after, limit)).all()
+
+    @classmethod
+    async def get_users_async(cls, session, options=(), order_by='id', after=None, limit=None):
+        """
+        Retrieve a list of all users with an asyncio session.
+        Args:
+            session (AsyncSession): SQLAlchemy asyncio session.
+            options, order_by, after, limit: see users_query.
+        Returns:
+            List[User]: A list of all users.
+        """
+        return (await session.scalars(cls.users_query(options, order_by, after, limit))).all()
+
+    @classmethod
+    def user_query(cls, username):
+        """
+        Build the query of get_user and get_user_async.
+        Args:
+            username (str): The username of the user to retrieve.
+        Returns:
+            Select: The query selecting the user.
+        """
+        # the team is always needed to check permissions, load it in the same query
+        return select(cls).options(joinedload(cls.team)).where(cls.username == username)
 
     @classmethod
     def get_user(cls, session, username):
@@ -125,7 +217,57 @@ class User(Base):
         Returns:
             Optional[User]: The user with the given username, or None if not found.
         """
-        return session.scalar(select(cls).where(cls.username == username))
+        return session.scalar(cls.user_query(username))
+
+    @classmethod
+    async def get_user_async(cls, session, username):
+        """
+        Retrieve a user by their username with an asyncio session.
+        Args:
+            session (AsyncSession): SQLAlchemy asyncio session.
+            username (str): The username of the user to retrieve.
+        Returns:
+            Optional[User]: The user with the given username, or None if not found.
+        """
+        return await session.scalar(cls.user_query(username))
+
+    @classmethod
+    def get_taken_identifiers(cls, session, users_data):
+        """
+        Retrieve the usernames, emails and personal numbers of the given data already used by a user.
+        Args:
+            session (Session): SQLAlchemy session.
+            users_data (list): A list of dictionaries containing user data.
+        Returns:
+            Set[str]: The identifiers already in the database.
+        """
+        usernames = [user_data['username'] for user_data in users_data]
+        emails = [user_data['email'] for user_data in users_data]
+        personal_numbers = [user_data['personal_number'] for user_data in users_data]
+        query = select(cls.username, cls.email, cls.personal_number).where(or_(
+            cls.username.in_(usernames), cls.email.in_(emails), cls.personal_number.in_(personal_numbers)
+        ))
+        return {identifier for row in session.execute(query) for identifier in row}
+
+    @classmethod
+    def _prepare_bulk_rows(cls, session, rows, updating=False):
+        """
+        Hash the passwords of the rows, and revoke the tokens of the updated users whose password or team changes.
+        Args:
+            session (Session): SQLAlchemy session.
+            rows (List[dict]): validated user data, modified in place.
+            updating (bool): the rows update existing users.
+        """
+        hashed_rows = [row for row in rows if row.get('password')]
+        for row, hashed_password in zip(hashed_rows, hash_passwords([row['password'] for row in hashed_rows])):
+            row['password'] = hashed_password
+        if updating:
+            revoked_ids = [row['id'] for row in rows if row.get('password') or 'team_id' in row]
+            # token versions are read in one query, the updates being sent without loading the users
+            versions = dict(session.execute(select(cls.id, cls.token_version).where(cls.id.in_(revoked_ids))).all())
+            for row in rows:
+                if row['id'] in versions and (row.get('password') or 'team_id' in row):
+                    row['token_version'] = versions[row['id']] + 1
 
     @classmethod
     def create(cls, session, user_data):
@@ -137,12 +279,14 @@ class User(Base):
         Returns:
             User: The newly created user.
         """
-        user_data['password'] = argon2.hash(user_data['password'])
+        from sentry_sdk import capture_message
+
+        user_data['password'] = hash_password(user_data['password'])
         user = cls()
         user._update_data(user_data)
 
         session.add(user)
-        session.commit()
+        session.flush()
         capture_message(f"User created : {user.username}")
         return user
 
@@ -153,11 +297,16 @@ class User(Base):
             session (Session): SQLAlchemy session.
             user_data (dict): A dictionary containing updated user data.
         """
+        from sentry_sdk import capture_message
+
+        if user_data.get('password') or user_data.get('team') not in (None, self.team):
+            # password or permissions changed: tokens issued before are revoked
+            self.token_version += 1
         if user_data.get('password'):
-            user_data['password'] = argon2.hash(user_data['password'])
+            user_data['password'] = hash_password(user_data['password'])
         self._update_data(user_data)
         capture_message(f"User updated : {self.username}")
-        session.commit()
+        session.flush()
 
 
     def _update_data(self, user_data):
@@ -178,7 +327,24 @@ class User(Base):
             session (Session): SQLAlchemy session.
         """
         session.delete(self)
-        session.commit()
+        session.flush()
+
+    def check_password(self, session, password):
+        """
+        Verify the password, and rehash it if the hash was made with other cost parameters.
+        Args:
+            session (Session): SQLAlchemy session.
+            password (str): The clear password to check.
+        Returns:
+            bool: True if the password is correct.
+        """
+        hasher = get_password_hasher()
+        if not hasher.verify(password, self.password):
+            return False
+        if hasher.needs_update(self.password):
+            self.password = hasher.hash(password)
+            session.flush()
+        return True
 
     def has_perm(self, permission: str) -> bool:
         """
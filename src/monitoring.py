@@ -0,0 +1,197 @@
+import os
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import click
+import sentry_sdk
+from sentry_sdk.envelope import Envelope
+from sentry_sdk.transport import HttpTransport, Transport
+
+from settings import (SENTRY_DSN, SENTRY_FLUSH_TIMEOUT, SENTRY_RETRY_DELAY, SENTRY_SAMPLE_RATE, SENTRY_SPOOL_DIR,
+                      SENTRY_TRACES_SAMPLE_RATE)
+
+ENVELOPE_SUFFIX = '.envelope'
+# created by the running sender, refreshed after each envelope
+SENDER_LOCK = 'sender.lock'
+# a lock older than this was left by a sender that crashed
+SENDER_LOCK_EXPIRY = SENTRY_FLUSH_TIMEOUT * 3
+# touched when a delivery fails, the sender isn't started again before SENTRY_RETRY_DELAY
+FAILED_DELIVERY_MARKER = 'failed_delivery'
+
+# set in the process of the send-events command, which mustn't start another sender when it exits
+is_sender = False
+
+
+class SpoolTransport(Transport):
+    """
+    Sentry transport writing each envelope to a file of the spool directory.
+    A command never waits on the network: the files are sent later by the `send-events` command.
+    """
+
+    def capture_envelope(self, envelope):
+        os.makedirs(SENTRY_SPOOL_DIR, exist_ok=True)
+        name = f"{time.time_ns()}-{uuid.uuid4().hex}"
+        temporary_path = SENTRY_SPOOL_DIR / f"{name}.tmp"
+        with open(temporary_path, 'wb') as f:
+            f.write(envelope.serialize())
+        # the sender only picks complete files
+        os.replace(temporary_path, SENTRY_SPOOL_DIR / f"{name}{ENVELOPE_SUFFIX}")
+
+    def flush(self, timeout, callback=None):
+        pass
+
+    def kill(self):
+        pass
+
+
+class DeliveryCheckTransport(HttpTransport):
+    """
+    HTTP transport of the sender, remembering whether an envelope was lost: network error, error status, rate limit
+    or full queue.
+    """
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.lost = False
+
+    def on_dropped_event(self, reason):
+        self.lost = True
+
+    def record_lost_event(self, reason, data_category=None, item=None, *, quantity=1):
+        self.lost = True
+        super().record_lost_event(reason, data_category, item, quantity=quantity)
+
+
+def init_sentry():
+    """Initialize Sentry with events spooled to local files."""
+    sentry_sdk.init(
+        dsn=SENTRY_DSN,
+        sample_rate=SENTRY_SAMPLE_RATE,
+        traces_sample_rate=SENTRY_TRACES_SAMPLE_RATE,
+        transport=SpoolTransport,
+    )
+
+
+def get_spooled_files():
+    """
+    Return the spooled envelope files, oldest first.
+    Returns(List[Path]):
+    """
+    if not SENTRY_SPOOL_DIR.exists():
+        return []
+    return sorted(SENTRY_SPOOL_DIR.glob(f"*{ENVELOPE_SUFFIX}"))
+
+
+def get_age(path):
+    """
+    Return the seconds since a file was modified.
+    Returns(float): None if the file doesn't exist
+    """
+    try:
+        return time.time() - path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+def acquire_sender_lock():
+    """
+    Create the lock file of the sender, replacing the one of a crashed sender.
+    Returns(bool): False if another sender is running
+    """
+    os.makedirs(SENTRY_SPOOL_DIR, exist_ok=True)
+    lock_path = SENTRY_SPOOL_DIR / SENDER_LOCK
+    age = get_age(lock_path)
+    if age is not None and age > SENDER_LOCK_EXPIRY:
+        lock_path.unlink(missing_ok=True)
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        return False
+    return True
+
+
+def start_sender():
+    """
+    Start the `send-events` command in a detached process if events are waiting in the spool, unless a sender is
+    running or the last delivery failed less than SENTRY_RETRY_DELAY ago.
+    """
+    if not get_spooled_files():
+        return
+    lock_age = get_age(SENTRY_SPOOL_DIR / SENDER_LOCK)
+    if lock_age is not None and lock_age <= SENDER_LOCK_EXPIRY:
+        return
+    failure_age = get_age(SENTRY_SPOOL_DIR / FAILED_DELIVERY_MARKER)
+    if failure_age is not None and failure_age < SENTRY_RETRY_DELAY:
+        return
+    subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve().parent / 'main.py'), 'send-events'],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def send_envelope(client, envelope):
+    """
+    Send an envelope and wait until the transport has sent it.
+    Args:
+        client(Client): Sentry client using a DeliveryCheckTransport
+        envelope(Envelope): spooled envelope
+    Returns(bool): True if Sentry accepted the envelope
+    """
+    client.transport.lost = False
+    pending = []
+    client.transport.capture_envelope(envelope)
+    # the callback is only called if the queue isn't empty when the timeout expires
+    client.flush(timeout=SENTRY_FLUSH_TIMEOUT, callback=lambda count, timeout: pending.append(count))
+    return not pending and not client.transport.lost
+
+
+def send_spooled_events():
+    """
+    Send the spooled envelopes to Sentry, removing each file once Sentry has accepted it.
+    The first envelope that isn't delivered goes back to the spool with the following ones, and the failure is
+    recorded to delay the next sender.
+    Returns(int): number of envelopes sent, None if another sender is running
+    """
+    if not acquire_sender_lock():
+        return None
+    lock_path = SENTRY_SPOOL_DIR / SENDER_LOCK
+    failure_path = SENTRY_SPOOL_DIR / FAILED_DELIVERY_MARKER
+    try:
+        client = sentry_sdk.Client(dsn=SENTRY_DSN, transport=DeliveryCheckTransport)
+        sent = 0
+        for path in get_spooled_files():
+            sending_path = path.with_suffix('.sending')
+            os.rename(path, sending_path)
+            with open(sending_path, 'rb') as f:
+                envelope = Envelope.deserialize(f.read())
+            if not send_envelope(client, envelope):
+                # Sentry is slow or unreachable, the next files would fail too
+                os.rename(sending_path, path)
+                failure_path.touch()
+                break
+            os.remove(sending_path)
+            failure_path.unlink(missing_ok=True)
+            os.utime(lock_path)
+            sent += 1
+        client.close(timeout=SENTRY_FLUSH_TIMEOUT)
+        return sent
+    finally:
+        lock_path.unlink(missing_ok=True)
+
+
+@click.command()
+def send_events():
+    """Send the Sentry events spooled by previous commands."""
+    global is_sender
+    is_sender = True
+    sent = send_spooled_events()
+    if sent is None:
+        click.echo("Events are already being sent by another process")
+    else:
+        click.echo(f"{sent} events sent")
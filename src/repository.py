@@ -0,0 +1,81 @@
+from sqlalchemy import inspect
+
+from models import Contract, Customer, Event, Team, User
+
+
+class Repository:
+    """
+    Lookups of the controllers, memoized for the life of the session, that is for one command.
+    Entities found by natural key are kept, the session identity map only holding weak references: the next
+    lookups of the same key cost no query as long as the entity is not expired.
+    Misses are not remembered, an entity created later in the command can still be found.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        # (model, natural key field, value) -> entity
+        self._entities = {}
+
+    def _remember(self, entity, field):
+        self._entities[(type(entity), field, getattr(entity, field))] = entity
+
+    def _lookup(self, model, field, value, fetch):
+        """
+        Return the entity whose field has this value.
+        Args:
+            model(Base): model of the entity
+            field(str): natural key, unique column
+            value: looked up value
+            fetch(callable): query run when the entity is not known yet
+        Returns(Base or None):
+        """
+        entity = self._entities.pop((model, field, value), None)
+        # the entity may have been deleted or its key changed since
+        if entity is not None and inspect(entity).persistent and getattr(entity, field) == value:
+            self._entities[(model, field, value)] = entity
+            return entity
+        entity = fetch()
+        if entity is not None:
+            self._remember(entity, field)
+        return entity
+
+    def get_user(self, username):
+        return self._lookup(User, 'username', username, lambda: User.get_user(self.session, username))
+
+    def get_customer(self, email):
+        return self._lookup(Customer, 'email', email, lambda: Customer.get_customer(self.session, email=email))
+
+    def get_team(self, name):
+        return self._lookup(Team, 'name', name, lambda: Team.get_team(self.session, name))
+
+    def get_teams(self):
+        """Return all the teams, each one being then found by name without query"""
+        teams = Team.get_teams(self.session)
+        for team in teams:
+            self._remember(team, 'name')
+        return teams
+
+    def _get(self, model, id):
+        """Return the entity with this primary key, from the identity map if it is loaded"""
+        try:
+            return self.session.get(model, int(id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_contract(self, id):
+        return self._get(Contract, id)
+
+    def get_event(self, id):
+        return self._get(Event, id)
+
+
+def get_repository(session):
+    """
+    Return the repository of a session, created on first use and kept in session.info.
+    Args:
+        session(Session): SQLAlchemy session of the command
+    Returns(Repository):
+    """
+    if 'repository' not in session.info:
+        session.info['repository'] = Repository(session)
+    return session.info['repository']
@@ -0,0 +1,170 @@
+"""
+Random but referentially consistent data, used by `create-sample-data --scale` to reproduce production volumes.
+
+For N events, N / 2 contracts, N / 4 customers and N / 1000 users (30 at least) are generated from a seeded random
+generator, so a scale and a seed always give the same rows. Users are spread over the teams in turn: in an empty
+database, user 1 is in the Management team, user 2 in the Sales team and user 3 in the Support team.
+Rows are sent as executemany inserts of Core tables, which the MySQL drivers turn into multi-row INSERT statements,
+and committed every `checkpoint` rows. Every user shares one password hash, argon2 being far too slow for millions
+of rows.
+"""
+import time
+from array import array
+from datetime import datetime, timedelta
+from itertools import islice
+from random import Random
+
+import click
+from sqlalchemy import func, insert, inspect, select
+
+from models import Contract, ContractStatus, Customer, Event, Team, User
+
+TEAMS_ORDER = ('Management team', 'Sales team', 'Support team')
+FIRST_NAMES = ('Alice', 'Bruno', 'Camille', 'David', 'Emma', 'Farid', 'Gabrielle', 'Hugo', 'Inès', 'Jules', 'Karim',
+               'Léa', 'Manon', 'Nathan', 'Océane', 'Paul', 'Quentin', 'Rose', 'Samir', 'Théo', 'Victor', 'Zoé')
+LAST_NAMES = ('Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand', 'Leroy', 'Moreau',
+              'Simon', 'Laurent', 'Lefebvre', 'Michel', 'Garcia', 'David', 'Bertrand', 'Roux', 'Vincent', 'Fournier')
+COMPANY_WORDS = ('Atlas', 'Boreal', 'Cobalt', 'Delta', 'Eole', 'Horizon', 'Lumen', 'Nova', 'Opale', 'Quartz', 'Zenith')
+COMPANY_TYPES = ('SARL', 'SAS', 'SA', 'Group', 'Consulting', 'Industries', 'Events')
+CITIES = ('Paris', 'Lyon', 'Marseille', 'Toulouse', 'Nice', 'Nantes', 'Strasbourg', 'Montpellier', 'Bordeaux',
+          'Lille', 'Rennes', 'Tours', 'Annecy', 'Biarritz')
+NOTES = ('Séminaire annuel', 'Lancement produit', 'Soirée de gala', 'Conférence', 'Mariage', 'Salon professionnel',
+         'Team building', None, None)
+# dates are drawn from a fixed period so that the data only depends on the seed
+PERIOD_START = datetime(2023, 1, 1)
+PERIOD_HOURS = 3 * 365 * 24
+
+
+def phone_number(rng):
+    return f"0{rng.choice('123456789')}{rng.randrange(10 ** 8):08d}"
+
+
+def generate_users(rng, first_id, count, team_ids, password_hash):
+    for i in range(count):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        username = f"{first_name[0]}{last_name}{first_id + i}".lower()
+        yield {'id': first_id + i, 'username': username, 'personal_number': f"{first_id + i:010d}",
+               'first_name': first_name, 'last_name': last_name, 'email': f"{username}@epicevent.com",
+               'password': password_hash, 'phone': phone_number(rng), 'token_version': 0,
+               'team_id': team_ids[i % len(team_ids)]}
+
+
+def generate_customers(rng, first_id, count, sales_ids):
+    for i in range(count):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        company = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_TYPES)}"
+        created = PERIOD_START + timedelta(hours=rng.randrange(PERIOD_HOURS))
+        yield {'id': first_id + i, 'name': f"{first_name} {last_name}",
+               'email': f"{first_name[0]}.{last_name}{first_id + i}@{company.split()[0]}.com".lower(),
+               'phone': phone_number(rng), 'company_name': company, 'date_created': created,
+               'date_modified': created, 'sales_contact_id': rng.choice(sales_ids)}
+
+
+def generate_contracts(rng, first_id, count, first_customer_id, nb_customers, signed_ids):
+    """Generate the contracts, the ids of the signed ones being appended to signed_ids"""
+    statuses = list(ContractStatus)
+    for i in range(count):
+        status = rng.choices(statuses, weights=(2, 6, 2))[0]
+        total = rng.randrange(500, 100000, 100)
+        if status == ContractStatus.CREATED:
+            remaining = total
+        elif status == ContractStatus.FINISHED or rng.random() < 0.7:
+            remaining = 0
+        else:
+            remaining = rng.randrange(0, total, 100)
+        if status == ContractStatus.SIGNED:
+            signed_ids.append(first_id + i)
+        # every customer gets at least one contract
+        yield {'id': first_id + i, 'customer_id': first_customer_id + i % nb_customers, 'total_balance': total,
+               'remaining_balance': remaining, 'status': status}
+
+
+def generate_events(rng, first_id, count, contract_ids, support_ids):
+    for i in range(count):
+        start = PERIOD_START + timedelta(hours=rng.randrange(PERIOD_HOURS))
+        yield {'id': first_id + i, 'event_start_date': start,
+               'event_end_date': start + timedelta(hours=rng.randrange(2, 72)),
+               'location': rng.choice(CITIES), 'attendees': rng.randrange(10, 2000, 10), 'notes': rng.choice(NOTES),
+               # events are only organized for signed contracts, some are still waiting for a support contact
+               'contract_id': rng.choice(contract_ids),
+               'support_contact_id': None if rng.random() < 0.05 else rng.choice(support_ids)}
+
+
+def insert_rows(conn, model, rows, chunk_size, checkpoint):
+    """
+    Insert generated rows by chunks, committing every checkpoint rows.
+    Args:
+        conn(Connection): database connection
+        model(Base): model of the rows
+        rows(Iterable[dict]): generated rows
+        chunk_size(int): number of rows sent per insert
+        checkpoint(int): number of rows per transaction
+    """
+    start = time.perf_counter()
+    inserted = 0
+    uncommitted = 0
+    while chunk := list(islice(rows, chunk_size)):
+        conn.execute(insert(model.__table__), chunk)
+        inserted += len(chunk)
+        uncommitted += len(chunk)
+        if uncommitted >= checkpoint:
+            conn.commit()
+            uncommitted = 0
+    conn.commit()
+    rate = inserted / max(time.perf_counter() - start, 1e-6)
+    click.echo(f"{model.__tablename__}: {inserted} rows inserted ({rate:.0f} rows/s)")
+
+
+def next_id(conn, model):
+    return (conn.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def check_benchmark_database(engine, reset):
+    """
+    Refuse a database that already has tables, unless they may be dropped: the benchmarks recreate every table, a
+    real database given by mistake would be wiped.
+    Args:
+        engine(Engine): database of the benchmark
+        reset(bool): the existing tables may be dropped
+    """
+    tables = inspect(engine).get_table_names()
+    if tables and not reset:
+        raise click.UsageError(f"The database is not empty ({len(tables)} tables), use --reset to drop them.")
+
+
+def generate_sample_data(engine, nb_events, password_hash, random_seed=42, chunk_size=10000, checkpoint=500000):
+    """
+    Insert a random dataset proportional to the number of events, after the existing rows.
+    Args:
+        engine(Engine): database with the teams created
+        nb_events(int): number of events
+        password_hash(str): password hash shared by every generated user
+        random_seed(int): seed of the random generator
+        chunk_size(int): number of rows sent per insert
+        checkpoint(int): number of rows per transaction
+    """
+    rng = Random(random_seed)
+    nb_contracts = max(nb_events // 2, 1)
+    nb_customers = max(nb_events // 4, 1)
+    nb_users = max(nb_events // 1000, 30)
+
+    with engine.connect() as conn:
+        teams = dict(conn.execute(select(Team.name, Team.id)).all())
+        team_ids = [teams[name] for name in TEAMS_ORDER]
+        first_user_id, first_customer_id = next_id(conn, User), next_id(conn, Customer)
+        first_contract_id, first_event_id = next_id(conn, Contract), next_id(conn, Event)
+        # ids are set by the generator, so the relations are drawn before the rows are inserted
+        user_ids = range(first_user_id, first_user_id + nb_users)
+        sales_ids = [user_id for i, user_id in enumerate(user_ids) if TEAMS_ORDER[i % 3] == 'Sales team']
+        support_ids = [user_id for i, user_id in enumerate(user_ids) if TEAMS_ORDER[i % 3] == 'Support team']
+        signed_ids = array('q')
+
+        insert_rows(conn, User, generate_users(rng, first_user_id, nb_users, team_ids, password_hash),
+                    chunk_size, checkpoint)
+        insert_rows(conn, Customer, generate_customers(rng, first_customer_id, nb_customers, sales_ids),
+                    chunk_size, checkpoint)
+        insert_rows(conn, Contract, generate_contracts(rng, first_contract_id, nb_contracts, first_customer_id,
+                                                       nb_customers, signed_ids), chunk_size, checkpoint)
+        contract_ids = signed_ids or range(first_contract_id, first_contract_id + nb_contracts)
+        insert_rows(conn, Event, generate_events(rng, first_event_id, nb_events, contract_ids, support_ids),
+                    chunk_size, checkpoint)
@@ -0,0 +1,450 @@
+"""
+Local HTTP/JSON API exposing the user, customer, contract and event operations.
+Customers, contracts and events can't be deleted through the API: no team has the permission to delete them.
+
+A single asyncio loop accepts the connections and parses the requests, the handlers run in a thread pool because
+the ORM is synchronous. The process keeps one engine, so every request reuses the pooled connections, and the
+handlers reuse the model methods and the decorators of the commands. The token is sent in the Authorization
+header: "Authorization: Bearer <token>".
+"""
+import asyncio
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+import click
+from sqlalchemy.exc import IntegrityError, StatementError
+
+import database
+from controllers.contract import CONTRACTS_LOAD_PLAN, CONTRACT_FIELDS, check_contract_data, check_contract_owner
+from controllers.customer import CUSTOMERS_LOAD_PLAN, CUSTOMER_FIELDS, check_customer_data, check_customer_owner
+from controllers.event import EVENTS_LOAD_PLAN, EVENT_FIELDS, SUPPORT_CONTACT_FIELD, check_event_contract, \
+    check_event_data, check_event_owner
+from controllers.user import USERS_LOAD_PLAN, USER_FIELDS, check_user_data
+from decorators import login_required, manage_session, permission_required, user_entity_required
+from models import Contract, Customer, Event, User
+from settings import SERVER_HOST, SERVER_PORT, SERVER_WORKERS
+from utils import select_fields
+
+logger = logging.getLogger(__name__)
+
+server_cli = click.Group()
+
+MAX_BODY_SIZE = 1024 * 1024
+MAX_PAGE_SIZE = 1000
+
+# (method, path pattern, handler), filled by the route decorator
+ROUTES = []
+
+
+def route(method, path):
+    """decorator registering a handler for the requests matching the method and the path pattern"""
+    def decorator(func):
+        ROUTES.append((method, re.compile(path), func))
+        return func
+    return decorator
+
+
+def list_params(model, params):
+    """
+    Read the pagination parameters of a list request.
+    Args:
+        model(Base): listed model
+        params(dict): query string parameters
+    Returns(dict): order_by, after and limit arguments of the model list method
+    """
+    order_by = params.get('order_by', 'id')
+    if order_by not in model.ORDERING_FIELDS:
+        raise ValueError(f"order_by must be one of {', '.join(model.ORDERING_FIELDS)}")
+    after = int(params['after']) if params.get('after') else None
+    limit = int(params['limit']) if params.get('limit') else MAX_PAGE_SIZE
+    # like the --limit option of the commands
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    return {'order_by': order_by, 'after': after, 'limit': min(limit, MAX_PAGE_SIZE)}
+
+
+def is_set(params, name):
+    """Return True if a boolean query string parameter is set"""
+    return params.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+def validation_error(errors):
+    return HTTPStatus.BAD_REQUEST, {'errors': errors}
+
+
+def not_found():
+    return HTTPStatus.NOT_FOUND, {'error': 'Not found'}
+
+
+# users
+
+@route('GET', r'/users')
+@manage_session
+@login_required
+@permission_required('list_users')
+def list_users(user, session, params, data):
+    users = User.get_users(session, options=USERS_LOAD_PLAN, **list_params(User, params))
+    return HTTPStatus.OK, [target.to_dict() for target in users]
+
+
+@route('GET', r'/users/(?P<key>[^/]+)')
+@manage_session
+@login_required
+@permission_required('read_user')
+def read_user(user, session, params, data, key):
+    target_user = User.get_user(session, key)
+    return (HTTPStatus.OK, target_user.to_dict()) if target_user else not_found()
+
+
+@route('POST', r'/users')
+@manage_session
+@login_required
+@permission_required('create_user')
+@user_entity_required
+def create_user(user, session, params, data):
+    user_data = select_fields(data, USER_FIELDS)
+    errors = check_user_data(session, user_data)
+    if errors:
+        return validation_error(errors)
+    return HTTPStatus.CREATED, User.create(session, user_data).to_dict()
+
+
+@route('PATCH', r'/users/(?P<key>[^/]+)')
+@manage_session
+@login_required
+@permission_required('update_user')
+@user_entity_required
+def update_user(user, session, params, data, key):
+    target_user = User.get_user(session, key)
+    if not target_user:
+        return not_found()
+    user_data = select_fields(data, USER_FIELDS)
+    errors = check_user_data(session, user_data, target_user)
+    if errors:
+        return validation_error(errors)
+    target_user.update(session, user_data)
+    return HTTPStatus.OK, target_user.to_dict()
+
+
+@route('DELETE', r'/users/(?P<key>[^/]+)')
+@manage_session
+@login_required
+@permission_required('delete_user')
+@user_entity_required
+def delete_user(user, session, params, data, key):
+    target_user = User.get_user(session, key)
+    if not target_user:
+        return not_found()
+    target_user.delete(session)
+    return HTTPStatus.NO_CONTENT, None
+
+
+# customers
+
+@route('GET', r'/customers')
+@manage_session
+@login_required
+@permission_required('list_customers')
+def list_customers(user, session, params, data):
+    customers = Customer.get_customers(session, options=CUSTOMERS_LOAD_PLAN, **list_params(Customer, params))
+    return HTTPStatus.OK, [customer.to_dict() for customer in customers]
+
+
+@route('GET', r'/customers/(?P<key>[^/]+)')
+@manage_session
+@login_required
+@permission_required('read_customer')
+def read_customer(user, session, params, data, key):
+    customer = Customer.get_customer(session, email=key)
+    return (HTTPStatus.OK, customer.to_dict()) if customer else not_found()
+
+
+@route('POST', r'/customers')
+@manage_session
+@login_required
+@permission_required('create_customer')
+@user_entity_required
+def create_customer(user, session, params, data):
+    customer_data = select_fields(data, CUSTOMER_FIELDS)
+    errors = check_customer_data(session, customer_data)
+    if errors:
+        return validation_error(errors)
+    customer_data['sales_contact'] = user
+    return HTTPStatus.CREATED, Customer.create(session, customer_data).to_dict()
+
+
+@route('PATCH', r'/customers/(?P<key>[^/]+)')
+@manage_session
+@login_required
+@permission_required('update_customer')
+@user_entity_required
+def update_customer(user, session, params, data, key):
+    customer = Customer.get_customer(session, email=key)
+    if not customer:
+        return not_found()
+    error = check_customer_owner(user, customer)
+    if error:
+        return HTTPStatus.FORBIDDEN, {'error': error}
+    customer_data = select_fields(data, CUSTOMER_FIELDS)
+    errors = check_customer_data(session, customer_data)
+    if errors:
+        return validation_error(errors)
+    customer.update(session, customer_data)
+    return HTTPStatus.OK, customer.to_dict()
+
+
+# contracts
+
+@route('GET', r'/contracts')
+@manage_session
+@login_required
+@permission_required('list_contracts')
+def list_contracts(user, session, params, data):
+    contracts = Contract.get_contracts(session, is_set(params, 'not_signed'), is_set(params, 'unpaid'),
+                                       options=CONTRACTS_LOAD_PLAN, **list_params(Contract, params))
+    return HTTPStatus.OK, [contract.to_dict() for contract in contracts]
+
+
+@route('GET', r'/contracts/(?P<key>\d+)')
+@manage_session
+@login_required
+@permission_required('read_contract')
+def read_contract(user, session, params, data, key):
+    contract = Contract.get_contract(session, id=int(key))
+    return (HTTPStatus.OK, contract.to_dict()) if contract else not_found()
+
+
+@route('POST', r'/contracts')
+@manage_session
+@login_required
+@permission_required('create_contract')
+@user_entity_required
+def create_contract(user, session, params, data):
+    contract_data = select_fields(data, CONTRACT_FIELDS)
+    errors = check_contract_data(session, contract_data)
+    if errors:
+        return validation_error(errors)
+    return HTTPStatus.CREATED, Contract.create(session, contract_data).to_dict()
+
+
+@route('PATCH', r'/contracts/(?P<key>\d+)')
+@manage_session
+@login_required
+@permission_required('update_contract')
+@user_entity_required
+def update_contract(user, session, params, data, key):
+    contract = Contract.get_contract(session, id=int(key))
+    if not contract:
+        return not_found()
+    error = check_contract_owner(user, contract)
+    if error:
+        return HTTPStatus.FORBIDDEN, {'error': error}
+    contract_data = select_fields(data, CONTRACT_FIELDS)
+    errors = check_contract_data(session, contract_data, contract)
+    if errors:
+        return validation_error(errors)
+    contract.update(session, contract_data)
+    return HTTPStatus.OK, contract.to_dict()
+
+
+# events
+
+@route('GET', r'/events')
+@manage_session
+@login_required
+@permission_required('list_events')
+def list_events(user, session, params, data):
+    events = Event.get_events(session, user, is_set(params, 'filter_empty_support'), is_set(params, 'my_events'),
+                              options=EVENTS_LOAD_PLAN, **list_params(Event, params))
+    return HTTPStatus.OK, [event.to_dict() for event in events]
+
+
+@route('GET', r'/events/(?P<key>\d+)')
+@manage_session
+@login_required
+@permission_required('read_event')
+def read_event(user, session, params, data, key):
+    event = Event.get_event(session, id=int(key))
+    return (HTTPStatus.OK, event.to_dict()) if event else not_found()
+
+
+@route('POST', r'/events')
+@manage_session
+@login_required
+@permission_required('create_event')
+@user_entity_required
+def create_event(user, session, params, data):
+    event_data = select_fields(data, EVENT_FIELDS)
+    errors = check_event_data(session, event_data)
+    if errors:
+        return validation_error(errors)
+    error = check_event_contract(user, event_data['contract'])
+    if error:
+        return HTTPStatus.FORBIDDEN, {'error': error}
+    return HTTPStatus.CREATED, Event.create(session, event_data).to_dict()
+
+
+@route('PATCH', r'/events/(?P<key>\d+)')
+@manage_session
+@login_required
+@permission_required('update_event')
+@user_entity_required
+def update_event(user, session, params, data, key):
+    event = Event.get_event(session, id=int(key))
+    if not event:
+        return not_found()
+    error = check_event_owner(user, event)
+    if error:
+        return HTTPStatus.FORBIDDEN, {'error': error}
+    fields = EVENT_FIELDS + (SUPPORT_CONTACT_FIELD,) if user.has_perm('update_event_support') else EVENT_FIELDS
+    event_data = select_fields(data, fields)
+    errors = check_event_data(session, event_data, event)
+    if errors:
+        return validation_error(errors)
+    event.update(session, event_data)
+    return HTTPStatus.OK, event.to_dict()
+
+
+def dispatch(method, target, headers, body):
+    """
+    Run the handler of a request, in a worker thread.
+    Args:
+        method(str): HTTP method
+        target(str): path and query string of the request
+        headers(dict): request headers, with lowercase names
+        body(bytes): request body
+    Returns(tuple): HTTP status and JSON serializable payload
+    """
+    url = urlsplit(target)
+    path = url.path.rstrip('/') or '/'
+    allowed = False
+    for route_method, pattern, handler in ROUTES:
+        match = pattern.fullmatch(path)
+        if match and route_method == method:
+            break
+        allowed = allowed or bool(match)
+    else:
+        if allowed:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'Method not allowed'}
+        return not_found()
+
+    token = headers.get('authorization', '').removeprefix('Bearer ').strip()
+    try:
+        data = json.loads(body) if body else {}
+        if not isinstance(data, dict):
+            raise ValueError('The request body must be a JSON object')
+        result = handler(token=token, params=dict(parse_qsl(url.query)), data=data, **match.groupdict())
+    except ValueError as e:
+        return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+    except IntegrityError:
+        return HTTPStatus.CONFLICT, {'error': 'This record conflicts with an existing one'}
+    except (StatementError, TypeError) as e:
+        # a value of the body the validation let through but the model or the database can't use
+        return HTTPStatus.BAD_REQUEST, {'error': f'Invalid value ({getattr(e, "orig", e)})'}
+    except Exception:
+        logger.exception("Error while handling %s %s", method, target)
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': 'Internal server error'}
+
+    # refusals of the decorators: login_required returns a message, permission_required returns nothing
+    if result is None:
+        return HTTPStatus.FORBIDDEN, {'error': 'You do not have permission to access this feature'}
+    if isinstance(result, str):
+        return HTTPStatus.UNAUTHORIZED, {'error': result}
+    return result
+
+
+def encode_response(status, payload, keep_alive):
+    """Return the bytes of an HTTP/1.1 response with a JSON body"""
+    body = b'' if payload is None else json.dumps(payload, default=str).encode()
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+async def read_request(reader):
+    """
+    Read one request from the connection.
+    Args:
+        reader(StreamReader): connection stream
+    Returns(tuple or None): method, target, version, headers and body, None when the client closed the connection
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, target, version = request_line.decode('latin-1').split()
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY_SIZE:
+        raise ValueError('Request body too large')
+    body = await reader.readexactly(length) if length else b''
+    return method, target, version, headers, body
+
+
+async def handle_connection(executor, reader, writer):
+    """Serve the requests of a connection, kept open between requests unless the client asks otherwise"""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except ValueError:
+                writer.write(encode_response(HTTPStatus.BAD_REQUEST, {'error': 'Malformed request'}, False))
+                break
+            if request is None:
+                break
+            method, target, version, headers, body = request
+            keep_alive = headers.get('connection', '').lower() != 'close' and version != 'HTTP/1.0'
+            status, payload = await loop.run_in_executor(executor, dispatch, method, target, headers, body)
+            writer.write(encode_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run_server(host, port, workers):
+    """
+    Listen on host:port until cancelled.
+    Args:
+        host(str): interface to bind
+        port(int): TCP port
+        workers(int): number of threads running the ORM calls
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api') as executor:
+        server = await asyncio.start_server(partial(handle_connection, executor), host, port)
+        async with server:
+            click.echo(f"Serving on http://{host}:{port} with {workers} workers")
+            await server.serve_forever()
+
+
+@server_cli.command()
+@click.option('--host', default=SERVER_HOST, show_default=True)
+@click.option('--port', type=int, default=SERVER_PORT, show_default=True)
+@click.option('--workers', type=click.IntRange(min=1), default=SERVER_WORKERS, show_default=True,
+              help='Threads running the database calls, keep it below the connection pool size.')
+def serve(host, port, workers):
+    """
+    Serve the JSON API on localhost.
+    Args:
+        host(str): interface to bind
+        port(int): TCP port
+        workers(int): number of threads running the ORM calls
+    """
+    database.get_engine()
+    try:
+        asyncio.run(run_server(host, port, workers))
+    except KeyboardInterrupt:
+        click.echo("Server stopped")
@@ -3,31 +3,66 @@ import os
 import sys
 from pathlib import Path
 
-from dotenv import load_dotenv
-import sentry_sdk
+from dotenv import find_dotenv, load_dotenv
 
-load_dotenv()
+ENV_FILE = find_dotenv() or str(Path(__file__).resolve().parent / '.env')
+load_dotenv(ENV_FILE)
 
 DATABASE_USER = os.getenv("DATABASE_USER")
 DATABASE_PASSWORD = os.getenv("DATABASE_PASSWORD")
 DATABASE_HOST = os.getenv("DATABASE_HOST")
 DATABASE_NAME = os.getenv("DATABASE_NAME")
+# connection pool shared by every session of the process
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", 5))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", 10))
+DATABASE_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", 3600))
+DATABASE_POOL_PRE_PING = os.getenv("DATABASE_POOL_PRE_PING", "True").lower() in ("1", "true", "yes")
 
 SECRET_KEY = os.getenv("SECRET_KEY")
+# tokens carry the user permissions, keep them short-lived
+TOKEN_LIFETIME_MINUTES = int(os.getenv("TOKEN_LIFETIME_MINUTES", 30))
 
-PROJECT_DIR = Path(__file__).resolve().parent.parent
-# create log directory if doesn't exist
+# argon2 cost parameters, set by the calibrate-hashing command (passlib defaults if empty)
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST") or 0) or None
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST") or 0) or None
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM") or 0) or None
+# processes hashing the passwords of the bulk writes of users, one per core by default
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS") or 0) or os.cpu_count()
+
+# local JSON API started by `python main.py serve`
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", 8000))
+# threads running the ORM calls, each one holds a pooled connection during a request
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", DATABASE_POOL_SIZE))
 
+PROJECT_DIR = Path(__file__).resolve().parent.parent
 LOGS_DIR = PROJECT_DIR / 'logs'
-os.makedirs(LOGS_DIR, exist_ok=True)
 
+SENTRY_ENABLED = os.getenv("SENTRY_ENABLED", "True").lower() in ("1", "true", "yes")
+SENTRY_DSN = os.getenv(
+    "SENTRY_DSN",
+    "https://3aab9dd5d84c6762712bd92c4d3afc17@o4508309259747328.ingest.de.sentry.io/4508309281964112"
+)
+SENTRY_SAMPLE_RATE = float(os.getenv("SENTRY_SAMPLE_RATE", 1.0))
+SENTRY_TRACES_SAMPLE_RATE = float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", 1.0))
+# maximum time the background sender waits for Sentry before giving up
+SENTRY_FLUSH_TIMEOUT = float(os.getenv("SENTRY_FLUSH_TIMEOUT", 10))
+# seconds without starting the background sender after a failed delivery
+SENTRY_RETRY_DELAY = float(os.getenv("SENTRY_RETRY_DELAY", 300))
+# events are written there by commands, then sent by a background process
+SENTRY_SPOOL_DIR = LOGS_DIR / 'sentry_spool'
+
+
+def configure():
+    """
+    Side effects needed to run a command, kept out of the import so that --help and --version stay fast:
+    create the log directory and initialize Sentry.
+    """
+    os.makedirs(LOGS_DIR, exist_ok=True)
 
-# Only initialize Sentry if we're not running tests
-is_pytest_running = 'pytest' in sys.modules
+    # Only initialize Sentry if we're not running tests
+    is_pytest_running = 'pytest' in sys.modules
 
-if not is_pytest_running:
-    sentry_sdk.init(
-        dsn="https://3aab9dd5d84c6762712bd92c4d3afc17@o4508309259747328.ingest.de.sentry.io/4508309281964112",
-        traces_sample_rate=1.0,
-        # shutdown_timeout=0,
-    )
+    if SENTRY_ENABLED and not is_pytest_running:
+        from monitoring import init_sentry
+        init_sentry()
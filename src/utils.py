@@ -1,45 +1,269 @@
+import csv
+import json
 import os
+import sys
 from datetime import timedelta, datetime, timezone
 from functools import wraps
 
 import jwt
 from sqlalchemy import select
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.exc import IntegrityError, StatementError
+from sqlalchemy.orm import Session, joinedload, sessionmaker
 
 from models import User
-from settings import SECRET_KEY
+from models.team import TEAM_PERMISSIONS
+from settings import SECRET_KEY, TOKEN_LIFETIME_MINUTES
 
+# rows fetched per query by the list commands streaming to a machine readable format
+STREAM_PAGE_SIZE = 1000
 
-def get_user_from_token(token, session):
+
+class TokenUser:
     """
-    Return the user connected with jwt_token, else return None
+    Connected user as described by the token claims.
+    It allows permission checks without any database round trip.
+    """
+
+    def __init__(self, claims):
+        self.id = claims['user_id']
+        self.username = claims['username']
+        self.team = claims['team']
+        # the sets compiled at startup are shared by every token of a team
+        self.permissions = TEAM_PERMISSIONS.get(claims['team_id'], frozenset())
+        self.token_version = claims['version']
+
+    def __str__(self):
+        return self.username
+
+    def has_perm(self, permission: str) -> bool:
+        """
+        Check if the user has a specific permission.
+        Args:
+            permission (str): The permission to check.
+        Returns:
+            bool: True if the user has the permission, False otherwise.
+        """
+        return permission in self.permissions
+
+    def get_entity(self, session):
+        """
+        Load the User entity, unless the token was revoked since it was issued.
+        Args:
+            session (Session): SQLAlchemy session.
+        Returns:
+            Optional[User]: The user, or None if it no longer exists or its tokens were revoked.
+        """
+        user = session.get(User, self.id, options=[joinedload(User.team)])
+        if not user or user.token_version != self.token_version:
+            return None
+        return user
+
+
+def get_claims_from_token(token):
+    """
+    Return the claims of a valid jwt_token, else return None
     Args:
         token(str):
-        session(Session):
 
-    Returns(User):
+    Returns(dict):
     """
-
     if not token:
         return None
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        claims = jwt.decode(token, SECRET_KEY, algorithms=["HS256"],
+                            options={"require": ["exp", "user_id", "team_id", "version"]})
     except jwt.ExpiredSignatureError:
         print('token is expired')
         return None
     except jwt.InvalidTokenError:
         print('token is invalid')
         return None
+    return claims
+
 
-    username = payload.get("username")
-    user = User.get_user(session, username)
-    return user
+def get_user_from_token(token, session):
+    """
+    Return the user connected with jwt_token, else return None.
+    The token is refused if it was issued before the last revocation of the user's tokens.
+    Args:
+        token(str):
+        session(Session):
+
+    Returns(User):
+    """
+    claims = get_claims_from_token(token)
+    if not claims:
+        return None
+    return TokenUser(claims).get_entity(session)
+
+
+def get_token_claims(user):
+    """
+    Return the claims identifying the user: id, team and token version, the permissions being found by team id.
+    Args:
+        user(User):
+
+    Returns(dict):
+    """
+    return {
+        "user_id": user.id,
+        "username": user.username,
+        "team": user.team.name,
+        "team_id": user.team_id,
+        "version": user.token_version,
+    }
 
 
-def create_token(payload_data):
-    """Create a JWT token with the given payload_data dict"""
-    expiration_date = datetime.now(tz=timezone.utc) + timedelta(hours=4)
+def create_token(user):
+    """Create a short-lived JWT token carrying the user claims"""
+    payload_data = get_token_claims(user)
+    expiration_date = datetime.now(tz=timezone.utc) + timedelta(minutes=TOKEN_LIFETIME_MINUTES)
     payload_data.update({"exp": expiration_date})
     return jwt.encode(payload=payload_data, key=SECRET_KEY)
 
 
+def iter_pages(fetch_page, page_size, after=None, limit=None):
+    """
+    Iterate over a paginated list query, fetching the next page only when the previous one is consumed.
+    Args:
+        fetch_page(callable): function taking `after` and `limit` keyword arguments and returning a list of rows
+        page_size(int): number of rows fetched per query
+        after(int, optional): ID of the row to start after
+        limit(int, optional): maximum number of rows, all the rows if not set
+    Returns(Iterator): rows of every page, in order
+    """
+    remaining = limit
+    while True:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = fetch_page(after=after, limit=size)
+        yield from page
+        if remaining is not None:
+            remaining -= len(page)
+        if len(page) < size or remaining == 0:
+            return
+        after = page[-1].id
+
+
+def read_records(filename):
+    """
+    Read a list of records from a JSON file, or from a CSV file with a header line.
+    Args:
+        filename(str): path of the file, CSV if it ends with .csv, '-' to read a JSON list from stdin
+    Returns(List[dict]):
+    """
+    if filename == '-':
+        return json.load(sys.stdin)
+    with open(filename, newline='') as f:
+        if filename.endswith('.csv'):
+            return list(csv.DictReader(f))
+        return json.load(f)
+
+
+def select_fields(data, fields):
+    """
+    Keep the items of a record that can be written.
+    Args:
+        data(dict): record read from a file or a request
+        fields(Iterable[str]): writable fields
+    Returns(dict):
+    """
+    return {key: value for key, value in data.items() if key in fields}
+
+
+def apply_records(session, records, apply_record):
+    """
+    Apply records in the transaction of the command, each one inside a savepoint.
+    A record refused by the validation or by the database is reported and skipped, the others are committed together
+    by manage_session.
+    Args:
+        session(Session): SQLAlchemy session
+        records(Iterable[dict]): records read from the input file
+        apply_record(callable): function(record) returning the created or updated entity, or a list of errors
+    Returns(List[tuple]): (record number, entity or None, errors) for each record
+    """
+    results = []
+    for number, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            results.append((number, None, ['A record must be a JSON object.']))
+            continue
+        try:
+            with session.begin_nested():
+                outcome = apply_record(record)
+        except IntegrityError as e:
+            outcome = [f'Refused by the database ({e.orig}).']
+        except StatementError as e:
+            # a value the database can't store in its column
+            outcome = [f'Invalid value ({e.orig}).']
+        if isinstance(outcome, list):
+            results.append((number, None, outcome))
+        else:
+            results.append((number, outcome, []))
+    return results
+
+
+def iter_json_table_rows(file, buffer_size=64 * 1024):
+    """
+    Read a {table_name: [row, ...]} json file incrementally.
+    Only the row being decoded is kept in memory, whatever the size of the file.
+    Args:
+        file: text file opened for reading
+        buffer_size(int): number of characters read from the file at a time
+    Returns(Iterator[tuple[str, dict]]): (table name, row) pairs in file order
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+
+    def fill():
+        nonlocal buffer, position
+        chunk = file.read(buffer_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        return bool(chunk)
+
+    def peek():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not fill():
+                raise ValueError('Unexpected end of json file')
+
+    def expect(chars):
+        nonlocal position
+        char = peek()
+        if char not in chars:
+            raise ValueError(f"Invalid json file: expected one of {chars!r}, got {char!r}")
+        position += 1
+        return char
+
+    def decode():
+        nonlocal position
+        peek()
+        while True:
+            try:
+                value, position = decoder.raw_decode(buffer, position)
+                return value
+            except json.JSONDecodeError:
+                # the value may be cut by the end of the buffer
+                if not fill():
+                    raise
+
+    expect('{')
+    if peek() == '}':
+        return
+    while True:
+        table_name = decode()
+        expect(':')
+        expect('[')
+        if peek() == ']':
+            expect(']')
+        else:
+            while True:
+                yield table_name, decode()
+                if expect(',]') == ']':
+                    break
+        if expect(',}') == '}':
+            return
@@ -1,3 +1,4 @@
-from .globals import ask_for, display_table, show_error, console, show_success
+from .globals import ask_for, display_table, show_error, console, show_success, show_next_cursor, \
+    display_batch_report, OUTPUT_FORMATS, set_output_format, machine_output
 from .user import prompt_for_user, display_users
 
@@ -26,23 +26,24 @@ def prompt_for_contract(contract=None, status_choices=None):
     return contract_data
 
 
-def display_contracts(contracts):
+def display_contracts(contracts, page_size=None, title=None):
     """
     Display a list of contracts in a tabular format.
     Args:
-        contracts (list): A list of contract objects to display.
+        contracts (iterable): The contract objects to display, a lazy iterable when paged or streamed.
+        page_size (int, optional): If set, display the contracts one page at a time.
+        title (str, optional): Title of the table, "Contracts" or "Contract" by default.
     """
     headers = ['ID', 'Total Balance', 'Remaining Balance', 'Status', 'Customer Email']
-    title = "Contracts" if len(contracts) > 1 else "Contract"
-    rows = []
-    for contract in contracts:
-        rows.append(
-            (
-                contract.id,
-                contract.total_balance,
-                contract.remaining_balance,
-                contract.status.value,
-                contract.customer.email if contract.customer else None
-            )
+    title = title or ("Contracts" if page_size or not isinstance(contracts, list) or len(contracts) > 1 else "Contract")
+    rows = (
+        (
+            contract.id,
+            contract.total_balance,
+            contract.remaining_balance,
+            contract.status.value,
+            contract.customer.email if contract.customer else None
         )
-    display_table(headers, rows, title)
\ No newline at end of file
+        for contract in contracts
+    )
+    display_table(headers, rows, title, page_size)
\ No newline at end of file
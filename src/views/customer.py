@@ -28,17 +28,17 @@ def prompt_for_customer(actual_customer=None):
     return customer_data
 
 
-def display_customers(customers):
+def display_customers(customers, page_size=None):
     """
     Display a list of customers in a tabular format.
     Args:
-        customers (list): A list of customer objects to display.
+        customers (iterable): The customer objects to display, a lazy iterable when paged or streamed.
+        page_size (int, optional): If set, display the customers one page at a time.
     """
     headers = ['Id', 'Name', 'Email', 'Phone', 'Company', 'Sales contact']
-    title = "Customers" if len(customers) > 1 else "Customer"
-    rows = []
-    for customer in customers:
-        rows.append(
-            (customer.id, customer.name, customer.email, customer.phone, customer.company_name, customer.sales_contact)
-        )
-    display_table(headers, rows, title)
+    title = "Customers" if page_size or not isinstance(customers, list) or len(customers) > 1 else "Customer"
+    rows = (
+        (customer.id, customer.name, customer.email, customer.phone, customer.company_name, customer.sales_contact)
+        for customer in customers
+    )
+    display_table(headers, rows, title, page_size)
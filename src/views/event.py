@@ -32,27 +32,42 @@ def prompt_for_event(user, event=None):
     return event_data
 
 
-def display_events(events):
+def display_events(events, page_size=None, title=None):
     """
     Display a list of events in a tabular format.
     Args:
-        events (list): A list of event objects to display.
+        events (iterable): The event objects to display, a lazy iterable when paged or streamed.
+        page_size (int, optional): If set, display the events one page at a time.
+        title (str, optional): Title of the table, "Events" or "Event" by default.
     """
     headers = ['ID', 'Start Date', 'End Date', 'Location', 'Attendees', 'Notes', 'Contract ID', 'Customer', 'Support Contact']
-    title = "Events" if len(events) > 1 else "Event"
-    rows = []
-    for event in events:
-        rows.append(
-            (
-                event.id,
-                event.event_start_date.strftime('%Y-%m-%d %H:%M'),
-                event.event_end_date.strftime('%Y-%m-%d %H:%M'),
-                event.location,
-                event.attendees,
-                event.notes,
-                event.contract_id,
-                event.contract.customer if event.contract else None,
-                event.support_contact.username if event.support_contact else None
-            )
+    title = title or ("Events" if page_size or not isinstance(events, list) or len(events) > 1 else "Event")
+    rows = (
+        (
+            event.id,
+            event.event_start_date.strftime('%Y-%m-%d %H:%M'),
+            event.event_end_date.strftime('%Y-%m-%d %H:%M'),
+            event.location,
+            event.attendees,
+            event.notes,
+            event.contract_id,
+            event.contract.customer if event.contract else None,
+            event.support_contact.username if event.support_contact else None
         )
-    display_table(headers, rows, title)
\ No newline at end of file
+        for event in events
+    )
+    display_table(headers, rows, title, page_size)
+
+def display_conflicts(conflicts, page_size=None):
+    """
+    Display the overlapping events of the support contacts, rows being rendered as the scan finds them.
+    Args:
+        conflicts (iterable): (support contact username, event ID, later event ID, overlap start, overlap end) tuples.
+        page_size (int, optional): If set, display the conflicts one page at a time.
+    """
+    headers = ['Support Contact', 'Event', 'Overlapping Event', 'Overlap Start', 'Overlap End']
+    rows = (
+        (username, event_id, other_id, start.strftime('%Y-%m-%d %H:%M'), end.strftime('%Y-%m-%d %H:%M'))
+        for username, event_id, other_id, start, end in conflicts
+    )
+    display_table(headers, rows, "Scheduling conflicts", page_size)
@@ -1,17 +1,52 @@
+import csv
+import json
+import sys
+from itertools import islice
+
 from rich.console import Console
 from rich.prompt import Prompt, Confirm, IntPrompt, FloatPrompt
 from rich.table import Table
 
 console = Console()
 
-def display_table(headers, rows, title):
+# formats of the --format option, every format but 'table' is meant to be parsed by other programs
+OUTPUT_FORMATS = ('table', 'csv', 'ndjson', 'json')
+output_format = 'table'
+
+
+def set_output_format(name):
+    """
+    Select how display_table writes rows, for the rest of the command.
+    In the machine readable formats, messages and prompts go to stderr so that stdout only holds the rows.
+    Args:
+        name (str): One of OUTPUT_FORMATS.
+    """
+    global output_format
+    if name not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {name}")
+    output_format = name
+    console.stderr = name != 'table'
+
+
+def machine_output():
+    """Return True if rows are written in a machine readable format, list commands then stream them"""
+    return output_format != 'table'
+
+
+def display_table(headers, rows, title, page_size=None):
     """
     Display a tabular representation of data.
     Args:
         headers (list): A list of column headers for the table.
-        rows (list of tuples): The data to be displayed, where each tuple represents a row.
+        rows (iterable of tuples): The data to be displayed, where each tuple represents a row.
         title (str): The title of the table.
+        page_size (int, optional): If set, rows are pulled and rendered one page at a time,
+            the next page being fetched only when the user asks for it.
     """
+    if machine_output():
+        return write_rows(headers, rows, output_format)
+    if page_size:
+        return display_pages(headers, rows, title, page_size)
     table = Table(title=title)
     for header in headers:
         table.add_column(header)
@@ -20,6 +55,85 @@ def display_table(headers, rows, title):
     console.print(table)
 
 
+def display_pages(headers, rows, title, page_size):
+    """
+    Display rows page by page with a fixed column layout.
+    Column widths only depend on the terminal, so rendering a page never needs the following rows.
+    Args:
+        headers (list): A list of column headers for the table.
+        rows (iterable of tuples): The data to be displayed, consumed lazily.
+        title (str): The title of the table.
+        page_size (int): Number of rows per page.
+    """
+    rows = iter(rows)
+    page_number = 1
+    while page := list(islice(rows, page_size)):
+        table = Table(title=f"{title} (page {page_number})", expand=True)
+        for header in headers:
+            table.add_column(header, ratio=1, no_wrap=True, overflow='ellipsis')
+        for row in page:
+            table.add_row(*[str(e) if e is not None else e for e in row])
+        console.print(table)
+        if len(page) < page_size or not ask_for('Next page ?', output_type=bool):
+            break
+        page_number += 1
+
+
+def write_rows(headers, rows, format_name):
+    """
+    Write rows to stdout in a machine readable format, each row as soon as it is pulled.
+    Nothing is buffered: a JSON array is written element by element.
+    Args:
+        headers (list): Column headers, the CSV header line or the keys of the JSON objects in snake case.
+        rows (iterable of tuples): The data to write, consumed lazily.
+        format_name (str): 'csv', 'ndjson' (one JSON object per line) or 'json' (one array of objects).
+    """
+    stdout = sys.stdout
+    if format_name == 'csv':
+        writer = csv.writer(stdout, lineterminator='\n')
+        writer.writerow(headers)
+        writer.writerows(rows)
+        return
+    keys = [header.lower().replace(' ', '_') for header in headers]
+    if format_name == 'ndjson':
+        for row in rows:
+            stdout.write(json.dumps(dict(zip(keys, row)), default=str) + '\n')
+        return
+    stdout.write('[')
+    for number, row in enumerate(rows):
+        stdout.write((',\n' if number else '\n') + json.dumps(dict(zip(keys, row)), default=str))
+    stdout.write('\n]\n')
+
+
+def show_next_cursor(items, limit):
+    """
+    Display the continuation cursor of a paginated list when more rows may follow.
+    Args:
+        items (list): The rows of the current page.
+        limit (int): The page size requested, None if the list is not paginated.
+    """
+    if limit and len(items) == limit:
+        console.print(f"More results: use --after {items[-1].id}", style="yellow")
+
+
+def display_batch_report(results, action):
+    """
+    Display the outcome of each record of a batch.
+    Args:
+        results (list): (record number, entity or None, errors) tuples, as returned by apply_records.
+        action (str): What was done to the applied records, e.g. 'created'.
+    """
+    rows = ((number, action if entity else 'refused',
+             f"{type(entity).__name__} #{entity.id}" if entity else ' '.join(errors))
+            for number, entity, errors in results)
+    display_table(['Record', 'Result', 'Details'], rows, 'Batch report')
+    applied = sum(1 for _, entity, _ in results if entity)
+    if applied == len(results):
+        show_success(f"{applied}/{len(results)} records {action}.")
+    else:
+        show_error(f"{applied}/{len(results)} records {action}.")
+
+
 def ask_for(message, password=False, output_type=str):
     """
    Prompt the user for input with flexible type and options.
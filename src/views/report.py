@@ -0,0 +1,38 @@
+from views import display_table
+
+
+def group_header(group_by):
+    """Return the column title of a report grouping, e.g. 'Sales Contact' for 'sales_contact'"""
+    return group_by.replace('_', ' ').title()
+
+
+def display_contracts_report(rows, group_by, page_size=None):
+    """
+    Display the contracts report, rows being rendered as the database returns them.
+    Args:
+        rows (iterable): (group, contracts, signed, created, total_balance, remaining_balance) rows.
+        group_by (str): Grouping of the report.
+        page_size (int, optional): If set, display the rows one page at a time.
+    """
+    headers = [group_header(group_by), 'Contracts', 'Signed', 'Created', 'Total Balance', 'Outstanding Balance']
+    rows = (
+        (row.group, row.contracts, row.signed, row.created, f"{row.total_balance:.2f}", f"{row.remaining_balance:.2f}")
+        for row in rows
+    )
+    display_table(headers, rows, f"Contracts by {group_header(group_by).lower()}", page_size)
+
+
+def display_events_report(rows, group_by, page_size=None):
+    """
+    Display the events report, rows being rendered as the database returns them.
+    Args:
+        rows (iterable): (group, events, attendees) rows, or (year, month, events, attendees) rows by month.
+        group_by (str): Grouping of the report.
+        page_size (int, optional): If set, display the rows one page at a time.
+    """
+    headers = [group_header(group_by), 'Events', 'Attendees']
+    if group_by == 'month':
+        rows = ((f"{row.year}-{row.month:02d}", row.events, row.attendees) for row in rows)
+    else:
+        rows = ((row.group or 'No support contact', row.events, row.attendees) for row in rows)
+    display_table(headers, rows, f"Events by {group_header(group_by).lower()}", page_size)
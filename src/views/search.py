@@ -0,0 +1,25 @@
+from views import console, display_table
+
+
+def display_search_hits(hits, offset=0):
+    """
+    Display the hits of a search, best first.
+    Args:
+        hits (list): (kind, id, title, detail, score) rows.
+        offset (int, optional): Number of better hits skipped, to number the rows.
+    """
+    headers = ['Rank', 'Type', 'ID', 'Title', 'Detail']
+    rows = ((offset + rank, hit.kind.title(), hit.id, hit.title, hit.detail) for rank, hit in enumerate(hits, start=1))
+    display_table(headers, rows, "Search results")
+
+
+def show_next_offset(hits, limit, offset):
+    """
+    Display the offset of the next page of hits when more hits may follow.
+    Args:
+        hits (list): The hits of the current page.
+        limit (int): The number of hits requested.
+        offset (int): The offset of the current page.
+    """
+    if len(hits) == limit:
+        console.print(f"More results: use --offset {offset + limit}", style="yellow")
@@ -34,17 +34,19 @@ def prompt_for_user(actual_user=None, team_choice=None):
             user_data['team_name'] = Prompt.ask('Team name', choices=team_choice)
     return user_data
 
-def display_users(users):
+def display_users(users, page_size=None):
     """
     Display a list of users in a tabular format.
     Args:
-        users (list): A list of user objects to display.
+        users (iterable): The user objects to display, a lazy iterable when paged or streamed.
+        page_size (int, optional): If set, display the users one page at a time.
     """
     headers = ['Id', 'Employee ID', 'Username', 'Email', 'First name', 'Last name', 'Phone', 'Team']
-    title = "Users" if len(users) >1 else "User"
-    rows = []
-    for user in users:
-        rows.append((user.id, user.personal_number,user.username, user.email,
-                      user.first_name, user.last_name, user.phone, user.team))
-    display_table(headers, rows, title)
+    title = "Users" if page_size or not isinstance(users, list) or len(users) > 1 else "User"
+    rows = (
+        (user.id, user.personal_number, user.username, user.email,
+         user.first_name, user.last_name, user.phone, user.team)
+        for user in users
+    )
+    display_table(headers, rows, title, page_size)
 
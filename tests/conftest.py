@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session, sessionmaker
 
 from models import User, Customer, Contract, ContractStatus, Event
 from settings import SECRET_KEY
+from utils import get_token_claims
 from models import Base, Team
 
 
@@ -31,7 +32,8 @@ def session(engine):
     connection = engine.connect()
     transaction = connection.begin()
 
-    TestingSession = sessionmaker(bind=connection)
+    # like the sessions of the application, committed at the end of each command
+    TestingSession = sessionmaker(bind=connection, expire_on_commit=False)
     db_session = TestingSession(bind=connection)
 
     try:
@@ -150,7 +152,7 @@ def token_factory():
             exp_time = datetime.now(tz=timezone.utc) + timedelta(hours=hours)
 
         payload = {
-            'username': user.username,
+            **get_token_claims(user),
             'exp': exp_time,
             **extra_payload
         }
@@ -1,3 +1,5 @@
+import json
+
 from main import global_cli
 from models.contract import ContractStatus, Contract
 
@@ -53,3 +55,51 @@ def test_get_contracts_with_filters_command(contract, token_factory, user, monke
 
     assert result.exit_code == 0
     assert str(contract.id) in result.output  # Our test contract has remaining_balance > 0
+
+
+def test_get_contracts_pagination_command(session, contract_data, token_factory, user, cli_runner):
+    """Test the get-contracts command prints a continuation cursor when the page is full"""
+    contracts = [Contract.create(session, dict(contract_data)) for _ in range(3)]
+    token = token_factory(user)
+
+    result = cli_runner.invoke(global_cli, ['get-contracts', token, '--limit', '2'])
+    assert result.exit_code == 0
+    assert f'--after {contracts[1].id}' in result.output
+
+    result = cli_runner.invoke(global_cli, ['get-contracts', token, '--limit', '2', '--after', str(contracts[1].id)])
+    assert result.exit_code == 0
+    assert '--after' not in result.output
+
+
+def test_get_contracts_paged_command(session, contract_data, token_factory, user, monkeypatch, cli_runner):
+    """Test the get-contracts command stops fetching pages when the user declines the next one"""
+    for total_balance in (1111.0, 2222.0, 3333.0):
+        Contract.create(session, dict(contract_data, total_balance=total_balance))
+    input_values = iter([False])
+    monkeypatch.setattr('rich.prompt.PromptBase.ask', lambda *args, **kwargs: next(input_values))
+    token = token_factory(user)
+
+    result = cli_runner.invoke(global_cli, ['get-contracts', token, '--page-size', '2'])
+
+    assert result.exit_code == 0
+    assert '1111.0' in result.output and '2222.0' in result.output
+    assert '3333.0' not in result.output
+
+
+def test_create_contract_batch_malformed_records(session, customer, token_factory, management_user, tmp_path,
+                                                 cli_runner):
+    """Test create-contract --input reports malformed records and creates the valid ones"""
+    filename = tmp_path / 'contracts.json'
+    filename.write_text(json.dumps([
+        {'total_balance': 'abc', 'remaining_balance': 0, 'status': 'Created', 'customer_email': customer.email},
+        {'total_balance': 100, 'remaining_balance': 50, 'status': 'Created', 'customer_email': customer.email},
+    ]))
+    contracts_number = len(Contract.get_contracts(session, False, False))
+    token = token_factory(management_user)
+
+    result = cli_runner.invoke(global_cli, ['create-contract', token, '--input', str(filename)])
+
+    assert result.exit_code == 0
+    assert '1/2 records created' in result.output
+    assert 'The balance must be a number.' in result.output
+    assert len(Contract.get_contracts(session, False, False)) == contracts_number + 1
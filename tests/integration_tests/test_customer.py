@@ -1,3 +1,5 @@
+import json
+
 from sqlalchemy import select
 from sqlalchemy.sql.functions import func
 
@@ -42,3 +44,50 @@ def test_create_customer_command(session, sales_user, token_factory, monkeypatch
 #     assert result.exit_code == 0
 #     assert customer.name in result.output
 #     assert customer.email in result.output
+
+
+def test_create_customer_revoked_token(session, sales_user, token_factory, cli_runner):
+    """Test write commands refuse a token revoked since it was issued"""
+    token = token_factory(sales_user)
+    sales_user.token_version += 1
+    session.flush()
+    result = cli_runner.invoke(global_cli, ['create-customer', token])
+    assert result.exit_code == 0
+    # reported once, by user_entity_required
+    assert result.output.strip() == 'Your session has been revoked, please login again'
+
+
+def test_create_customer_batch(session, sales_user, token_factory, tmp_path, cli_runner):
+    """Test create-customer --input applies the valid records and reports the refused ones"""
+    filename = tmp_path / 'customers.json'
+    filename.write_text(json.dumps([
+        {'name': 'Batch One', 'email': 'batch1@example.com', 'phone': '0123456789', 'company_name': 'Batch'},
+        {'name': 'Batch Two', 'email': 'not an email', 'phone': '0123456789', 'company_name': 'Batch'},
+        {'name': 'Batch Three', 'email': 'batch1@example.com', 'phone': '0123456789', 'company_name': 'Batch'},
+        {'name': 'Batch Four', 'email': 'batch4@example.com', 'phone': '0123456789', 'company_name': 'Batch'},
+    ]))
+    nb_customers_before = session.scalar(select(func.count()).select_from(Customer))
+    token = token_factory(sales_user)
+
+    result = cli_runner.invoke(global_cli, ['create-customer', token, '--input', str(filename)])
+
+    assert result.exit_code == 0
+    assert '2/4 records created' in result.output
+    assert 'Refused by the database' in result.output
+    assert session.scalar(select(func.count()).select_from(Customer)) == nb_customers_before + 2
+
+
+def test_create_customer_batch_unstorable_value(session, sales_user, token_factory, tmp_path, cli_runner):
+    """Test a value the database can't store is reported as the error of its record"""
+    filename = tmp_path / 'customers.json'
+    filename.write_text(json.dumps([
+        {'name': {'first': 'Nested'}, 'email': 'nested@example.com', 'phone': '0123456789', 'company_name': 'Batch'},
+        {'name': 'Batch One', 'email': 'batch1@example.com', 'phone': '0123456789', 'company_name': 'Batch'},
+    ]))
+    token = token_factory(sales_user)
+
+    result = cli_runner.invoke(global_cli, ['create-customer', token, '--input', str(filename)])
+
+    assert result.exit_code == 0
+    assert '1/2 records created' in result.output
+    assert 'Invalid value' in result.output
@@ -0,0 +1,95 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import func, select, update
+
+from database import read_high_water_mark, write_high_water_mark
+from main import global_cli
+from models import Contract, ContractStatus, Customer, Event, Team, User
+
+
+def test_dump_data_command(customer, contract, tmp_path, cli_runner):
+    """Test the dump-data command writes every table, fetching rows by small batches"""
+    filename = tmp_path / 'dump.json'
+    customer_email, contract_id = customer.email, contract.id
+    result = cli_runner.invoke(global_cli, ['dump-data', '--filename', str(filename), '--batch-size', '1'])
+
+    assert result.exit_code == 0
+    with open(filename) as f:
+        data = json.load(f)
+    assert len(data['team_table']) == 3
+    assert [row['email'] for row in data['customer_table']] == [customer_email]
+    assert data['contract_table'][0]['id'] == contract_id
+
+
+def test_load_data_command(session, tmp_path, cli_runner):
+    """Test the load-data command inserts rows by chunks, committing at each checkpoint"""
+    filename = tmp_path / 'data.json'
+    users = [
+        {'id': 10 + i, 'personal_number': f'000000000{i}', 'username': f'loaded{i}', 'password': 'hash',
+         'email': f'loaded{i}@email.com', 'team_id': 1}
+        for i in range(3)
+    ]
+    customers = [
+        {'id': 1, 'name': 'Loaded', 'email': 'loaded@customer.com', 'company_name': 'Loaded sas',
+         'date_created': '2024-11-05 09:00:00', 'date_modified': '2024-11-05 09:00:00', 'sales_contact_id': 10}
+    ]
+    with open(filename, 'w') as f:
+        json.dump({'user_table': users, 'customer_table': customers, 'unknown_table': [{'id': 1}]}, f)
+
+    result = cli_runner.invoke(global_cli, ['load-data', '--filename', str(filename),
+                                            '--chunk-size', '2', '--checkpoint', '2'])
+
+    assert result.exit_code == 0
+    assert 'customer_table: 4 rows loaded' in result.output
+    assert session.scalar(select(func.count()).select_from(User)) == 3
+    assert session.scalar(select(Customer.date_created)) == datetime(2024, 11, 5, 9, 0)
+
+
+def test_create_sample_data_scale_command(session, cli_runner):
+    """Test create-sample-data --scale generates consistent rows, events only belonging to signed contracts"""
+    result = cli_runner.invoke(global_cli, ['create-sample-data', '--scale', '200', '--chunk-size', '50',
+                                            '--checkpoint', '100'])
+
+    assert result.exit_code == 0
+    assert 'event_table: 200 rows inserted' in result.output
+    assert session.scalar(select(func.count()).select_from(User)) == 30
+    assert session.scalar(select(func.count()).select_from(Customer)) == 50
+    assert session.scalar(select(func.count()).select_from(Contract)) == 100
+    assert session.scalars(select(Contract.status).join(Event.contract).distinct()).all() == [ContractStatus.SIGNED]
+    sales_team = session.scalar(select(User.team_id).join(Customer.sales_contact).distinct())
+    assert sales_team == session.scalar(select(Team.id).where(Team.name == 'Sales team'))
+
+
+def test_dump_data_since_last(session, customer, contract, tmp_path, cli_runner):
+    """Test dump-data --since last only exports the rows modified since the last dump, then records a new mark"""
+    for model in (Team, User, Customer, Contract):
+        session.execute(update(model).values(date_modified=datetime(2024, 1, 1)))
+    # the update sets date_modified
+    customer.update(session, {'name': 'Changed'})
+    write_high_water_mark(tmp_path / 'dump_state.json', datetime(2024, 6, 1))
+    filename = tmp_path / 'dump.json'
+
+    result = cli_runner.invoke(global_cli, ['dump-data', '--filename', str(filename), '--since', 'last'])
+
+    assert result.exit_code == 0
+    with open(filename) as f:
+        data = json.load(f)
+    assert [row['name'] for row in data['customer_table']] == ['Changed']
+    assert data['contract_table'] == [] and data['user_table'] == [] and data['team_table'] == []
+    assert read_high_water_mark(tmp_path / 'dump_state.json') > datetime(2024, 6, 1)
+
+
+def test_dump_data_since_without_state(customer, tmp_path, cli_runner):
+    """Test dump-data --since exports every row when no dump was recorded, and refuses invalid dates"""
+    filename = tmp_path / 'dump.json'
+    result = cli_runner.invoke(global_cli, ['dump-data', '--filename', str(filename), '--since', 'yesterday'])
+    assert result.exit_code == 2
+    assert "neither an ISO date nor 'last'" in result.output
+
+    result = cli_runner.invoke(global_cli, ['dump-data', '--filename', str(filename), '--since', 'last'])
+
+    assert result.exit_code == 0
+    assert 'every row is exported' in result.output
+    with open(filename) as f:
+        assert len(json.load(f)['team_table']) == 3
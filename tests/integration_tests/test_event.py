@@ -1,6 +1,10 @@
+import json
 from datetime import datetime, timedelta
 
+from sqlalchemy import select, update
+
 from main import global_cli
+from models import ContractStatus, Event
 
 
 def test_create_event_command(session, contract, token_factory, sales_user, monkeypatch, cli_runner):
@@ -12,7 +16,7 @@ def test_create_event_command(session, contract, token_factory, sales_user, monk
     monkeypatch.setattr('rich.prompt.PromptBase.ask', lambda *args, **kwargs: next(input_values))
 
     # Set contract status to SIGNED for the test
-    contract.status = 'SIGNED'
+    contract.status = ContractStatus.SIGNED
     session.commit()
 
     token = token_factory(sales_user)
@@ -20,3 +24,76 @@ def test_create_event_command(session, contract, token_factory, sales_user, monk
 
     assert result.exit_code == 0
     assert 'Event created successfully' in result.output or 'created successfully' in result.output
+
+
+
+def test_create_event_declined(session, contract, token_factory, sales_user, monkeypatch, cli_runner):
+    """Test declining to try again after an invalid input creates no event"""
+    contract.status = ContractStatus.SIGNED
+    session.commit()
+    input_values = iter(['2024-03-01 12:00', '2024-03-01 10:00', 'Room', '10', '', str(contract.id), False])
+    monkeypatch.setattr('rich.prompt.PromptBase.ask', lambda *args, **kwargs: next(input_values))
+
+    token = token_factory(sales_user)
+    result = cli_runner.invoke(global_cli, ['create-event', token])
+
+    assert result.exit_code == 0
+    assert 'successfully' not in result.output
+    assert session.scalars(select(Event)).all() == []
+
+def test_update_event_batch_from_stdin(session, event, token_factory, management_user, cli_runner):
+    """Test update-event --input - reads the records from stdin"""
+    token = token_factory(management_user)
+    records = [{'target': event.id, 'location': 'Batch Location', 'attendees': 80},
+               {'target': 0, 'location': 'Nowhere'}]
+
+    result = cli_runner.invoke(global_cli, ['update-event', token, '--input', '-'], input=json.dumps(records))
+
+    assert result.exit_code == 0
+    assert '1/2 records updated' in result.output
+    assert 'Wrong ID.' in result.output
+    assert event.location == 'Batch Location'
+
+
+def test_find_conflicts_command(session, contract, support_user, management_user, token_factory, cli_runner):
+    """Test find-conflicts lists the overlapping events of the support contacts"""
+    token = token_factory(management_user)
+    result = cli_runner.invoke(global_cli, ['find-conflicts', token])
+    assert result.exit_code == 0
+    assert 'No scheduling conflict.' in result.output
+
+    rows = [{'event_start_date': start, 'event_end_date': end, 'location': 'Room', 'attendees': 10,
+             'contract_id': contract.id, 'support_contact_id': support_user.id}
+            for start, end in (('2024-03-01 10:00', '2024-03-01 12:00'), ('2024-03-02 10:00', '2024-03-02 12:00'))]
+    Event.bulk_create(session, rows)
+    # moved by a direct update, bypassing the validation
+    session.execute(update(Event).where(Event.event_start_date == datetime(2024, 3, 2, 10))
+                    .values(event_start_date=datetime(2024, 3, 1, 11), event_end_date=datetime(2024, 3, 1, 13)))
+
+    result = cli_runner.invoke(global_cli, ['find-conflicts', token])
+
+    assert result.exit_code == 0
+    assert 'Scheduling conflicts' in result.output
+    assert 'support_user' in result.output
+    assert '11:00' in result.output and '12:00' in result.output
+
+
+def test_update_event_conflict_declined(session, contract, support_user, management_user, token_factory, monkeypatch,
+                                        cli_runner):
+    """Test declining to try again after a scheduling conflict leaves the event unchanged"""
+    rows = [{'event_start_date': start, 'event_end_date': end, 'location': 'Room', 'attendees': 10,
+             'contract_id': contract.id, 'support_contact_id': support_user.id}
+            for start, end in (('2024-03-01 10:00', '2024-03-01 12:00'), ('2024-03-02 10:00', '2024-03-02 12:00'))]
+    Event.bulk_create(session, rows)
+    moved = session.scalars(select(Event).where(Event.event_start_date == datetime(2024, 3, 2, 10))).one()
+    input_values = iter([moved.id, '2024-03-01 11:00', '2024-03-01 13:00', 'Moved', '10', '', str(contract.id),
+                         'support_user', False])
+    monkeypatch.setattr('rich.prompt.PromptBase.ask', lambda *args, **kwargs: next(input_values))
+
+    token = token_factory(management_user)
+    result = cli_runner.invoke(global_cli, ['update-event', token])
+
+    assert result.exit_code == 0
+    assert 'successfully' not in result.output
+    assert moved.event_start_date == datetime(2024, 3, 2, 10)
+    assert moved.location == 'Room'
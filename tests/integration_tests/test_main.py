@@ -0,0 +1,87 @@
+import csv
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import views
+from main import global_cli, LAZY_COMMANDS, OUTPUT_FORMATS
+from models import Customer
+
+SRC_DIR = Path(__file__).resolve().parent.parent.parent / 'src'
+
+
+def test_help_lists_commands(cli_runner):
+    """Test --help lists every command"""
+    result = cli_runner.invoke(global_cli, ['--help'])
+    assert result.exit_code == 0
+    for cmd_name in LAZY_COMMANDS:
+        assert cmd_name in result.output
+
+
+def test_help_and_version_do_not_import_commands():
+    """Test --help and --version do not import controllers, SQLAlchemy, rich, passlib or sentry"""
+    code = (
+        "import sys\n"
+        "from main import global_cli\n"
+        "for args in (['--help'], ['--version']):\n"
+        "    global_cli(args, standalone_mode=False)\n"
+        "heavy = ('controllers', 'sqlalchemy', 'rich', 'passlib', 'sentry_sdk', 'settings')\n"
+        "print([name for name in heavy if name in sys.modules])\n"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=SRC_DIR, capture_output=True, text=True)
+    assert result.returncode == 0
+    assert result.stdout.strip().splitlines()[-1] == '[]'
+
+
+@pytest.fixture
+def table_output():
+    """Restore the default output after a command run with --format"""
+    yield
+    views.set_output_format('table')
+
+
+def test_output_formats_match_views():
+    """Test the --format choices are the formats known by the views"""
+    assert OUTPUT_FORMATS == views.OUTPUT_FORMATS
+
+
+def test_get_events_csv_format(event, token_factory, management_user, cli_runner, table_output):
+    """Test --format csv writes a header line and one line per event"""
+    result = cli_runner.invoke(global_cli, ['--format', 'csv', 'get-events', token_factory(management_user)])
+
+    assert result.exit_code == 0
+    rows = list(csv.reader(result.stdout.splitlines()))
+    assert rows[0][:3] == ['ID', 'Start Date', 'End Date']
+    assert rows[1][0] == str(event.id)
+    assert rows[1][3] == 'Test Location'
+    assert len(rows) == 2
+
+
+def test_get_customers_json_formats(session, sales_user, token_factory, management_user, cli_runner, table_output):
+    """Test --format json writes one array and ndjson one object per line, --limit being applied while streaming"""
+    Customer.bulk_create(session, [{'name': f'Customer {i}', 'email': f'customer{i}@example.com',
+                                    'company_name': 'Json sas', 'sales_contact_id': sales_user.id}
+                                   for i in range(3)])
+    token = token_factory(management_user)
+
+    result = cli_runner.invoke(global_cli, ['--format', 'json', 'get-customers', token])
+    assert result.exit_code == 0
+    customers = json.loads(result.stdout)
+    assert [customer['name'] for customer in customers] == ['Customer 0', 'Customer 1', 'Customer 2']
+    assert customers[0]['sales_contact'] == str(sales_user)
+
+    result = cli_runner.invoke(global_cli, ['--format', 'ndjson', 'get-customers', token, '--limit', '2',
+                                            '--order-by', 'id'])
+    assert result.exit_code == 0
+    assert [json.loads(line)['name'] for line in result.stdout.splitlines()] == ['Customer 0', 'Customer 1']
+
+
+def test_json_format_messages_go_to_stderr(token_factory, management_user, cli_runner, table_output):
+    """Test an empty list is an empty JSON array, stdout only holding the rows"""
+    result = cli_runner.invoke(global_cli, ['--format', 'json', 'get-contracts', token_factory(management_user)])
+
+    assert result.exit_code == 0
+    assert json.loads(result.stdout) == []
@@ -0,0 +1,94 @@
+from datetime import datetime
+from functools import partial
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import database
+from main import global_cli
+from models import Base, Contract, ContractStatus, Customer, Event, Team, User
+
+
+@pytest.fixture(scope='function')
+def async_database(tmp_path, monkeypatch):
+    """
+    SQLite file filled with a synchronous session, and read by the asyncio engine of the database module.
+    Returns the connected support user, with the team loaded for the token.
+    """
+    path = tmp_path / 'async.sqlite3'
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr('database.ASYNC_DATABASE_URL', f'sqlite+aiosqlite:///{path}')
+    monkeypatch.setattr('database._async_engine', None)
+    with Session(engine, expire_on_commit=False) as session:
+        teams = {team.name: team for team in session.scalars(select(Team))}
+        sales = User(username='sales', personal_number='1', email='sales@email.com', password='hash',
+                     team=teams['Sales team'])
+        support = User(username='support', personal_number='2', email='support@email.com', password='hash',
+                       team=teams['Support team'])
+        customer = Customer(name='Async Customer', email='async@customer.com', company_name='Async sas',
+                            sales_contact=sales)
+        to_sign = Contract(total_balance=1000, remaining_balance=1000, status=ContractStatus.CREATED,
+                           customer=customer)
+        unpaid = Contract(total_balance=2000, remaining_balance=500, status=ContractStatus.SIGNED, customer=customer)
+        start, end = datetime(2025, 3, 1, 9, 0), datetime(2025, 3, 1, 18, 0)
+        session.add_all([
+            Event(event_start_date=start, event_end_date=end, location='Lyon', attendees=10, contract=unpaid),
+            Event(event_start_date=start, event_end_date=end, location='Nice', attendees=20, contract=unpaid,
+                  support_contact=support),
+        ])
+        session.commit()
+    engine.dispose()
+    yield support
+
+
+def test_run_concurrently(async_database):
+    """Test the asyncio queries run concurrently, each one returning its results"""
+    customers, unpaid, events, user = database.run_concurrently(
+        Customer.get_customers_async,
+        partial(Contract.get_contracts_async, not_signed=False, unpaid_contracts=True),
+        partial(Event.get_events_async, user=async_database, user_only=True),
+        partial(User.get_user_async, username='support'),
+    )
+
+    assert [customer.email for customer in customers] == ['async@customer.com']
+    assert sorted(contract.remaining_balance for contract in unpaid) == [500, 1000]
+    assert [event.location for event in events] == ['Nice']
+    assert user.team.name == 'Support team'
+
+
+def test_report_contracts_command(contract, sales_user, token_factory, cli_runner):
+    """Test the report-contracts command displays the outstanding balance per customer"""
+    token = token_factory(sales_user)
+
+    result = cli_runner.invoke(global_cli, ['report-contracts', token, '--by', 'customer'])
+
+    assert result.exit_code == 0
+    assert 'Contracts by customer' in result.output
+    assert 'Test Customer' in result.output
+    assert '500.00' in result.output
+
+
+def test_report_events_command(event, support_user, token_factory, cli_runner):
+    """Test the report-events command displays the attendees per support contact"""
+    token = token_factory(support_user)
+
+    result = cli_runner.invoke(global_cli, ['report-events', token, '--by', 'support_contact'])
+
+    assert result.exit_code == 0
+    assert 'No support contact' in result.output
+    assert '50' in result.output
+
+
+def test_dashboard_command(async_database, token_factory, cli_runner):
+    """Test the dashboard command displays the four lists fetched concurrently"""
+    token = token_factory(async_database)
+
+    result = cli_runner.invoke(global_cli, ['dashboard', token, '--limit', '5'])
+
+    assert result.exit_code == 0
+    for title in ('Contracts to sign', 'Unpaid contracts', 'Events without support', 'My events'):
+        assert title in result.output
+    assert 'Lyon' in result.output
+    assert 'Nice' in result.output
@@ -0,0 +1,23 @@
+from main import global_cli
+
+
+def test_search_command(event, customer, sales_user, token_factory, cli_runner):
+    """Test the search command displays the ranked hits and the offset of the next page"""
+    token = token_factory(sales_user)
+
+    result = cli_runner.invoke(global_cli, ['search', token, 'test', '--limit', '1'])
+
+    assert result.exit_code == 0
+    assert 'Search results' in result.output
+    assert 'More results: use --offset 1' in result.output
+
+
+def test_search_command_refuses_users_without_permission(user, sales_user, token_factory, cli_runner):
+    """Test users are only searched by the users allowed to list them"""
+    token = token_factory(sales_user)
+
+    result = cli_runner.invoke(global_cli, ['search', token, 'test_admin', '--type', 'user'])
+
+    assert result.exit_code == 0
+    assert 'You do not have permission to search users' in result.output
+    assert 'test_admin' not in result.output
@@ -0,0 +1,126 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+from sqlalchemy import select
+
+from models import Customer
+from server import MAX_PAGE_SIZE, dispatch, read_request
+
+
+def call(method, target, token=None, data=None):
+    headers = {'authorization': f'Bearer {token}'} if token else {}
+    body = json.dumps(data).encode() if data is not None else b''
+    return dispatch(method, target, headers, body)
+
+
+def test_list_customers(customer, sales_user, token_factory):
+    """Test GET /customers returns the customers as JSON objects"""
+    token = token_factory(sales_user)
+    email = customer.email
+
+    status, payload = call('GET', '/customers?order_by=name&limit=10', token)
+
+    assert status == HTTPStatus.OK
+    assert [item['email'] for item in payload] == [email]
+    json.dumps(payload)
+
+
+def test_read_user_hides_password(management_user, token_factory):
+    """Test the password and the token version are never serialized"""
+    token = token_factory(management_user)
+
+    status, payload = call('GET', '/users/manager_user', token)
+
+    assert status == HTTPStatus.OK
+    assert payload['username'] == 'manager_user'
+    assert 'password' not in payload
+    assert 'token_version' not in payload
+
+
+def test_refusals(sales_user, support_user, token_factory):
+    """Test authentication, permission and routing errors are mapped to HTTP statuses"""
+    assert call('GET', '/customers')[0] == HTTPStatus.UNAUTHORIZED
+    assert call('POST', '/customers', token_factory(support_user), {})[0] == HTTPStatus.FORBIDDEN
+    assert call('GET', '/unknown', token_factory(sales_user))[0] == HTTPStatus.NOT_FOUND
+    assert call('PUT', '/customers', token_factory(sales_user))[0] == HTTPStatus.METHOD_NOT_ALLOWED
+    assert call('GET', '/customers?order_by=phone', token_factory(sales_user))[0] == HTTPStatus.BAD_REQUEST
+
+
+
+def test_permission_refusal_is_not_printed(support_user, token_factory, capsys):
+    """Test a permission refusal is answered with a 403, without printing to the server output"""
+    status, payload = call('POST', '/customers', token_factory(support_user), {})
+
+    assert status == HTTPStatus.FORBIDDEN
+    assert capsys.readouterr().out == ''
+
+
+def test_malformed_payloads(customer, sales_user, management_user, token_factory):
+    """Test values of the wrong type are answered with a 400"""
+    management_token = token_factory(management_user)
+    payloads = [
+        ('/users', management_token, {'username': 'newuser', 'first_name': 'New', 'last_name': 'User',
+                                      'email': 'new@example.com', 'personal_number': 1234567890,
+                                      'password': 'Password1', 'team_id': 1}),
+        ('/contracts', management_token, {'total_balance': 'abc', 'remaining_balance': 0, 'status': 'Created',
+                                          'customer_email': customer.email}),
+        ('/customers', token_factory(sales_user), {'name': {'first': 'Nested'}, 'email': 'nested@example.com',
+                                                   'phone': '0123456789', 'company_name': 'Nested'}),
+    ]
+    for target, token, data in payloads:
+        status, payload = call('POST', target, token, data)
+        assert status == HTTPStatus.BAD_REQUEST, (target, payload)
+
+def test_list_limit_validation(customer, sales_user, token_factory):
+    """Test limit must be a positive integer, and is capped to MAX_PAGE_SIZE"""
+    token = token_factory(sales_user)
+    status, payload = call('GET', f'/customers?limit={MAX_PAGE_SIZE + 1}', token)
+    assert status == HTTPStatus.OK
+    assert len(payload) == 1
+
+    for limit in ('0', '-1', 'ten'):
+        assert call('GET', f'/customers?limit={limit}', token)[0] == HTTPStatus.BAD_REQUEST
+    status, payload = call('GET', '/customers?limit=-1', token)
+    assert payload == {'error': 'limit must be at least 1'}
+
+
+def test_create_customer(session, sales_user, token_factory):
+    """Test POST /customers validates the body and assigns the connected sales contact"""
+    token = token_factory(sales_user)
+    sales_user_id = sales_user.id
+    data = {'name': 'Api Customer', 'email': 'api@example.com', 'phone': '0123456789', 'company_name': 'Api Company'}
+
+    status, payload = call('POST', '/customers', token, {**data, 'email': 'not an email'})
+    assert status == HTTPStatus.BAD_REQUEST
+    assert payload['errors']
+
+    status, payload = call('POST', '/customers', token, {**data, 'id': 999})
+    assert status == HTTPStatus.CREATED
+    assert payload['sales_contact_id'] == sales_user_id
+    assert payload['id'] != 999
+    assert session.scalar(select(Customer).where(Customer.email == 'api@example.com'))
+
+
+def test_delete_user(support_user, management_user, token_factory):
+    """Test DELETE /users removes the user for the management team only"""
+    assert call('DELETE', '/users/support_user', token_factory(support_user))[0] == HTTPStatus.FORBIDDEN
+    token = token_factory(management_user)
+
+    assert call('DELETE', '/users/support_user', token) == (HTTPStatus.NO_CONTENT, None)
+    assert call('GET', '/users/support_user', token)[0] == HTTPStatus.NOT_FOUND
+    assert call('DELETE', '/customers/1', token)[0] == HTTPStatus.METHOD_NOT_ALLOWED
+
+
+def test_read_request():
+    """Test the parsing of a request with a body"""
+    async def parse():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'POST /events?x=1 HTTP/1.1\r\nHost: localhost\r\nContent-Length: 2\r\n\r\n{}')
+        reader.feed_eof()
+        return await read_request(reader), await read_request(reader)
+
+    request, end = asyncio.run(parse())
+
+    assert request == ('POST', '/events?x=1', 'HTTP/1.1', {'host': 'localhost', 'content-length': '2'}, b'{}')
+    assert end is None
@@ -0,0 +1,60 @@
+import csv
+import json
+
+from passlib.hash import argon2
+from sqlalchemy import func, select
+
+from main import global_cli
+from models import User
+
+
+def test_import_users_command(session, management_user, token_factory, tmp_path, monkeypatch, cli_runner):
+    """Test the import-users command inserts valid rows and reports the invalid ones"""
+    filename = tmp_path / 'users.csv'
+    rows = [
+        {'username': 'imported1', 'personal_number': '4000000001', 'email': 'imported1@email.com',
+         'password': 'Password123', 'team_name': 'Sales team'},
+        {'username': 'imported2', 'personal_number': '4000000002', 'email': 'imported2@email.com',
+         'password': 'Password123', 'team_name': 'Support team'},
+        {'username': 'imported3', 'personal_number': '4000000003', 'email': 'imported3@email.com',
+         'password': 'weak', 'team_name': 'Sales team'},
+        {'username': 'imported4', 'personal_number': '4000000004', 'email': 'manager@email.com',
+         'password': 'Password123', 'team_name': 'Sales team'},
+    ]
+    with open(filename, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+    users_before = session.scalar(select(func.count()).select_from(User))
+
+    monkeypatch.setattr('settings.PASSWORD_HASH_WORKERS', 2)
+    token = token_factory(management_user)
+    result = cli_runner.invoke(global_cli, ['import-users', token, str(filename), '--batch-size', '1'])
+
+    assert result.exit_code == 0
+    assert 'Row 3: Password must contain' in result.output
+    assert 'Row 4: manager@email.com already used.' in result.output
+    assert '2 users imported' in result.output
+    assert session.scalar(select(func.count()).select_from(User)) == users_before + 2
+    imported = User.get_user(session, 'imported2')
+    assert imported.team.name == 'Support team'
+    assert argon2.verify('Password123', imported.password)
+
+
+def test_import_users_wrong_types(session, management_user, token_factory, tmp_path, cli_runner):
+    """Test import-users reports the values of a JSON file that aren't strings, and imports the other rows"""
+    filename = tmp_path / 'users.json'
+    filename.write_text(json.dumps([
+        {'username': 'imported1', 'personal_number': 4000000001, 'email': 'imported1@email.com',
+         'password': 'Password123', 'team_name': 'Sales team'},
+        {'username': 'imported2', 'personal_number': '4000000002', 'email': 'imported2@email.com',
+         'password': 'Password123', 'team_name': 'Sales team'},
+    ]))
+    token = token_factory(management_user)
+
+    result = cli_runner.invoke(global_cli, ['import-users', token, str(filename)])
+
+    assert result.exit_code == 0
+    assert 'Row 1: Employee ID must be 10 numbers' in result.output
+    assert '1 users imported' in result.output
+    assert User.get_user(session, 'imported2') is not None
@@ -1,5 +1,6 @@
 import pytest
 from sqlalchemy import select, func
+from sqlalchemy.event import listen, remove
 from datetime import datetime
 
 from models import Contract, ContractStatus, Customer, User
@@ -42,6 +43,20 @@ def test_validate_data_invalid_balance():
     assert "Remaining balance can't be greater than total balance." in errors
 
 
+
+@pytest.mark.parametrize('value', ['abc', None, True])
+def test_validate_data_balance_not_a_number(value):
+    """Test validate_data refuses a balance that isn't a number, without comparing the balances"""
+    errors = Contract.validate_data({'total_balance': value, 'remaining_balance': 100})
+    assert errors == ['The balance must be a number.']
+
+
+def test_validate_data_balance_from_text():
+    """Test validate_data converts the balances read from a CSV file"""
+    contract_data = {'total_balance': '1000', 'remaining_balance': '250.5'}
+    assert Contract.validate_data(contract_data) == []
+    assert contract_data == {'total_balance': 1000.0, 'remaining_balance': 250.5}
+
 def test_get_contracts(session, contract):
     """Test get_contracts method"""
     contracts = Contract.get_contracts(session, not_signed=False, unpaid_contracts=False)
@@ -63,6 +78,28 @@ def test_get_contracts_unpaid(session, contract):
     assert contract in contracts  # Our test contract has remaining_balance > 0
 
 
+@pytest.mark.parametrize('not_signed, unpaid, order_by, index', [
+    (True, False, 'id', 'ix_contract_table_status_id'),
+    (False, True, 'remaining_balance', 'ix_contract_table_remaining_balance_id'),
+])
+def test_get_contracts_uses_composite_index(session, engine, contract, not_signed, unpaid, order_by, index):
+    """Test the filtered contracts sorted for the pagination are read through the composite indexes"""
+    statements = []
+
+    def capture_statement(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    listen(engine, 'before_cursor_execute', capture_statement)
+    Contract.get_contracts(session, not_signed, unpaid, order_by=order_by)
+    remove(engine, 'before_cursor_execute', capture_statement)
+    statement, parameters = statements[-1]
+    plan = session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+
+    details = ' '.join(row[-1] for row in plan)
+    assert index in details
+    assert 'TEMP B-TREE' not in details
+
+
 def test_get_contract(session, contract):
     """Test get_contract method"""
     found_contract = Contract.get_contract(session, contract.id)
@@ -137,3 +174,17 @@ def test_delete_contract(session, contract_data):
 
     # Verify contract no longer exists
     assert Contract.get_contract(session, contract_id) is None
+
+
+def test_get_report(session, contract, sales_user):
+    """Test get_report aggregates the contracts per sales contact"""
+    Contract.create(session, {'total_balance': 300.0, 'remaining_balance': 0.0, 'status': ContractStatus.SIGNED,
+                              'customer': contract.customer})
+
+    rows = Contract.get_report(session, 'sales_contact').all()
+
+    assert len(rows) == 1
+    assert rows[0].group == sales_user.username
+    assert (rows[0].contracts, rows[0].signed, rows[0].created) == (2, 1, 1)
+    assert rows[0].total_balance == 1300.0
+    assert rows[0].remaining_balance == 500.0
@@ -1,5 +1,6 @@
 import pytest
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
+from sqlalchemy.event import listen, remove
 from datetime import datetime
 import re
 
@@ -45,6 +46,20 @@ def test_get_customers(session, customer):
     assert customer in customers
 
 
+def test_get_customers_keyset_pagination(session, sales_user):
+    """Test get_customers pages through customers sorted by name with an ID cursor"""
+    for index, name in enumerate(['Bravo', 'Alpha', 'Bravo', 'Charlie']):
+        Customer.create(session, {'name': name, 'email': f'customer{index}@example.com',
+                                  'company_name': 'Company', 'sales_contact_id': sales_user.id})
+
+    first_page = Customer.get_customers(session, order_by='name', limit=2)
+    second_page = Customer.get_customers(session, order_by='name', after=first_page[-1].id, limit=2)
+
+    assert [customer.name for customer in first_page] == ['Alpha', 'Bravo']
+    assert [customer.name for customer in second_page] == ['Bravo', 'Charlie']
+    assert first_page[-1].id < second_page[0].id
+
+
 def test_get_customer(session, customer):
     """Test get_customer method"""
     found_customer = Customer.get_customer(session, customer.email)
@@ -102,3 +117,55 @@ def test_update_data_internal(customer):
 
     assert customer.name == updated_data["name"]
     assert customer.email == updated_data["email"]
+
+
+def test_bulk_create_customers(session, engine, sales_user):
+    """Test bulk_create inserts validated rows with one statement per batch"""
+    rows = [{'name': f'Bulk {i}', 'email': f'bulk{i}@example.com', 'company_name': 'Bulk sas',
+             'sales_contact_id': sales_user.id} for i in range(5)]
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    listen(engine, 'before_cursor_execute', count_statement)
+    assert Customer.bulk_create(session, rows, batch_size=2) == 5
+    remove(engine, 'before_cursor_execute', count_statement)
+
+    assert len(statements) == 3
+    customers = Customer.get_customers(session, order_by='name')
+    assert [customer.name for customer in customers] == [f'Bulk {i}' for i in range(5)]
+    assert all(customer.date_created for customer in customers)
+
+
+def test_bulk_create_refuses_invalid_rows(session, sales_user):
+    """Test bulk_create reports every invalid row and inserts nothing"""
+    rows = [{'name': 'Valid', 'email': 'valid@example.com', 'company_name': 'Valid sas',
+             'sales_contact_id': sales_user.id},
+            {'name': 'Invalid', 'email': 'not an email', 'company_name': 'Invalid sas',
+             'sales_contact_id': sales_user.id}]
+
+    with pytest.raises(ValueError, match='Row 2: The email is not valid.'):
+        Customer.bulk_create(session, rows)
+    assert session.scalar(select(func.count()).select_from(Customer)) == 0
+
+
+def test_bulk_update_customers(session, customer):
+    """Test bulk_update changes rows by primary key, and requires the ID of every row"""
+    assert Customer.bulk_update(session, [{'id': customer.id, 'phone': '0102030405'}]) == 1
+    session.refresh(customer)
+    assert customer.phone == '0102030405'
+
+    with pytest.raises(ValueError, match='Row 1: id is required.'):
+        Customer.bulk_update(session, [{'phone': '0102030405'}])
+
+
+def test_bulk_writes_set_timestamps(session, customer):
+    """Test bulk_update sets date_modified like the ORM updates, keeping date_created"""
+    session.execute(update(Customer).values(date_created=datetime(2024, 1, 1), date_modified=datetime(2024, 1, 1)))
+
+    Customer.bulk_update(session, [{'id': customer.id, 'phone': '0102030405'}])
+    session.refresh(customer)
+
+    assert customer.date_created == datetime(2024, 1, 1)
+    assert customer.date_modified > datetime(2024, 1, 1)
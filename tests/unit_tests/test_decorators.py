@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.event import listen, remove
+
+from decorators import manage_session
+from models import Customer
+
+
+def test_manage_session_commits_the_command(session, customer_data):
+    """Test the changes flushed by a command are committed when it returns"""
+    @manage_session
+    def command(session):
+        return Customer.create(session, customer_data)
+
+    commits = []
+
+    def count_commit(session):
+        commits.append(session)
+
+    listen(session, 'after_commit', count_commit)
+    customer = command()
+    remove(session, 'after_commit', count_commit)
+
+    assert commits == [session]
+    assert session.scalar(select(Customer.email).where(Customer.id == customer.id)) == customer_data['email']
+
+
+def test_manage_session_rolls_back_a_failed_command(session, customer_data):
+    """Test a command raising after some writes leaves the database unchanged"""
+    @manage_session
+    def command(session):
+        Customer.create(session, customer_data)
+        raise RuntimeError('failure after the write')
+
+    with pytest.raises(RuntimeError):
+        command()
+
+    assert session.scalar(select(func.count()).select_from(Customer)) == 0
@@ -2,7 +2,10 @@ import pytest
 from sqlalchemy import select, func
 from datetime import datetime, timedelta
 
-from models import Event, User
+from sqlalchemy.event import listen, remove
+from sqlalchemy.orm import joinedload
+
+from models import Contract, Event, User
 
 
 def test_validate_event_start_date_valid():
@@ -71,6 +74,123 @@ def test_validate_data_end_before_start(contract):
     assert 'Event end date must be after event start date.' in errors
 
 
+def schedule(session, contract, support_user, start, hours=2):
+    """Create an event of the support contact starting at a 'YYYY-MM-DD HH:MM' date"""
+    start = datetime.strptime(start, '%Y-%m-%d %H:%M')
+    return Event.create(session, {'event_start_date': start, 'event_end_date': start + timedelta(hours=hours),
+                                  'location': 'Room', 'attendees': 10, 'contract_id': contract.id,
+                                  'support_contact_id': support_user.id})
+
+
+
+def test_validate_data_wrong_date_types(contract):
+    """Test the dates aren't compared when one of them is invalid"""
+    errors = Event.validate_data({'event_start_date': 20240301, 'event_end_date': '2024-03-01 12:00',
+                                  'contract_id': contract.id})
+    assert errors == ['The date should respect YYYY-MM-DD HH:MM format.']
+
+
+@pytest.mark.parametrize('value, expected', [('50', 50), (50, 50), ('many', None), (-1, None), (True, None),
+                                             (12.5, None)])
+def test_validate_attendees(value, expected):
+    """Test validate_attendees converts the number of attendees and refuses the other values"""
+    if expected is None:
+        with pytest.raises(ValueError):
+            Event.validate_attendees(value)
+    else:
+        assert Event.validate_attendees(value) == expected
+
+def test_validate_data_conflict(session, contract, support_user):
+    """Test validate_data refuses an event overlapping another event of the support contact"""
+    booked = schedule(session, contract, support_user, '2024-03-01 10:00')
+    event_data = {'event_start_date': '2024-03-01 11:00', 'event_end_date': '2024-03-01 13:00',
+                  'support_contact': support_user}
+
+    errors = Event.validate_data(event_data, session)
+
+    assert errors == [f'The support contact already has an event at that time (event {booked.id}).']
+
+
+def test_validate_data_no_conflict(session, contract, support_user, sales_user):
+    """Test back to back events, another support contact and the updated event itself don't conflict"""
+    booked = schedule(session, contract, support_user, '2024-03-01 10:00')
+
+    assert Event.validate_data({'event_start_date': '2024-03-01 12:00', 'event_end_date': '2024-03-01 13:00',
+                                'support_contact_id': support_user.id}, session) == []
+    assert Event.validate_data({'event_start_date': '2024-03-01 11:00', 'event_end_date': '2024-03-01 13:00',
+                                'support_contact_id': sales_user.id}, session) == []
+    assert Event.validate_data({'event_end_date': '2024-03-01 14:00'}, session, booked) == []
+
+
+def test_get_conflicts_uses_covering_index(session, contract, support_user):
+    """Test the overlap query only reads the (support contact, dates) index"""
+    booked = schedule(session, contract, support_user, '2024-03-01 10:00')
+    statements = []
+
+    def capture_statement(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    listen(session.get_bind(), 'before_cursor_execute', capture_statement)
+    conflicts = Event.get_conflicts(session, support_user.id, datetime(2024, 3, 1, 9), datetime(2024, 3, 1, 11))
+    remove(session.get_bind(), 'before_cursor_execute', capture_statement)
+    statement, parameters = statements[-1]
+    plan = session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+
+    assert conflicts == [booked.id]
+    assert 'COVERING INDEX ix_event_table_support_contact_id_dates' in ' '.join(row[-1] for row in plan)
+
+
+def test_bulk_create_refuses_conflicts(session, contract, support_user):
+    """Test bulk_create reports the rows overlapping a stored event or a previous row"""
+    booked = schedule(session, contract, support_user, '2024-03-01 10:00')
+    row = {'location': 'Room', 'attendees': 10, 'contract_id': contract.id, 'support_contact_id': support_user.id}
+    rows = [
+        dict(row, event_start_date='2024-03-01 09:00', event_end_date='2024-03-01 11:00'),
+        dict(row, event_start_date='2024-03-02 09:00', event_end_date='2024-03-02 11:00'),
+        dict(row, event_start_date='2024-03-02 10:00', event_end_date='2024-03-02 12:00'),
+        dict(row, event_start_date='2024-03-02 12:00', event_end_date='2024-03-02 13:00'),
+    ]
+
+    with pytest.raises(ValueError) as error:
+        Event.bulk_create(session, rows)
+
+    assert str(error.value).split('\n') == [
+        f'Row 1: The support contact already has an event at that time (event {booked.id}).',
+        'Row 3: The support contact already has an event at that time (row 2).',
+    ]
+    assert Event.bulk_create(session, rows[1:2] + rows[3:]) == 2
+
+
+def test_bulk_update_checks_new_dates(session, contract, support_user):
+    """Test bulk_update checks the rows with the stored values of their missing fields"""
+    first = schedule(session, contract, support_user, '2024-03-01 10:00')
+    second = schedule(session, contract, support_user, '2024-03-01 14:00')
+
+    # the second event moves away before the first one takes its place
+    assert Event.bulk_update(session, [{'id': first.id, 'event_start_date': '2024-03-01 15:00',
+                                        'event_end_date': '2024-03-01 16:00'},
+                                       {'id': second.id, 'event_start_date': '2024-03-01 18:00',
+                                        'event_end_date': '2024-03-01 19:00'}]) == 2
+    with pytest.raises(ValueError, match=f'Row 1: .* \\(event {second.id}\\)'):
+        Event.bulk_update(session, [{'id': first.id, 'event_end_date': '2024-03-01 18:30'}])
+
+
+def test_iter_conflicts(session, contract, support_user, sales_user):
+    """Test the calendar scan yields every overlapping pair of events of a support contact"""
+    first = schedule(session, contract, support_user, '2024-03-01 10:00', hours=4)
+    second = schedule(session, contract, support_user, '2024-03-01 11:00')
+    third = schedule(session, contract, support_user, '2024-03-01 13:00')
+    schedule(session, contract, support_user, '2024-03-01 15:00')
+    schedule(session, contract, sales_user, '2024-03-01 11:00')
+
+    conflicts = list(Event.iter_conflicts(session))
+
+    assert conflicts == [
+        ('support_user', first.id, second.id, datetime(2024, 3, 1, 11), datetime(2024, 3, 1, 13)),
+        ('support_user', first.id, third.id, datetime(2024, 3, 1, 13), datetime(2024, 3, 1, 14)),
+    ]
+
+
 def test_get_events(session, event):
     """Test get_events method"""
     events = Event.get_events(session)
@@ -174,3 +294,64 @@ def test_delete_event(session, event_data):
 
     # Verify event no longer exists
     assert Event.get_event(session, event_id) is None
+
+
+def test_get_events_with_load_plan(session, engine, event, support_user):
+    """Test get_events loads the displayed relationships without one query per event"""
+    event.support_contact = support_user
+    session.flush()
+    session.expunge_all()
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    listen(engine, 'before_cursor_execute', count_statement)
+    events = Event.get_events(session, options=(
+        joinedload(Event.contract).joinedload(Contract.customer),
+        joinedload(Event.support_contact),
+    ))
+    customers = [e.contract.customer for e in events]
+    support_contacts = [e.support_contact for e in events]
+    remove(engine, 'before_cursor_execute', count_statement)
+
+    assert len(statements) == 1
+    assert customers[0].name == "Test Customer"
+    assert support_contacts[0].username == support_user.username
+
+
+def test_get_events_user_only_uses_index(session, engine, event, support_user):
+    """Test the events of a support contact sorted by date are read through the composite index"""
+    statements = []
+
+    def capture_statement(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    listen(engine, 'before_cursor_execute', capture_statement)
+    Event.get_events(session, support_user, user_only=True, order_by='event_start_date')
+    remove(engine, 'before_cursor_execute', capture_statement)
+    statement, parameters = statements[-1]
+    plan = session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+
+    details = ' '.join(row[-1] for row in plan)
+    assert 'ix_event_table_support_contact_id_dates' in details
+    assert 'TEMP B-TREE' not in details
+
+
+def test_get_report_by_month(session, event_data):
+    """Test get_report sums the attendees per month"""
+    for start, attendees in (('2024-01-10 10:00', 10), ('2024-01-20 10:00', 15), ('2024-03-01 10:00', 7)):
+        Event.create(session, {**event_data, 'event_start_date': datetime.strptime(start, '%Y-%m-%d %H:%M'),
+                               'event_end_date': datetime.strptime(start, '%Y-%m-%d %H:%M'),
+                               'attendees': attendees})
+
+    rows = Event.get_report(session, 'month').all()
+
+    assert [tuple(row) for row in rows] == [(2024, 1, 2, 25), (2024, 3, 1, 7)]
+
+
+def test_get_report_by_support_contact(session, event):
+    """Test the events without support contact are grouped together"""
+    rows = Event.get_report(session, 'support_contact').all()
+
+    assert [tuple(row) for row in rows] == [(None, 1, 50)]
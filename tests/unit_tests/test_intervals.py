@@ -0,0 +1,33 @@
+import random
+
+from intervals import IntervalTree
+
+
+def test_overlapping_matches_brute_force():
+    """Test the tree finds the same overlaps as comparing every interval"""
+    generator = random.Random(7)
+    intervals = []
+    for item in range(300):
+        start = generator.randrange(1000)
+        intervals.append((start, start + generator.randrange(1, 50), item))
+    tree = IntervalTree(intervals)
+
+    for _ in range(200):
+        start = generator.randrange(1000)
+        end = start + generator.randrange(1, 80)
+        expected = {item for low, high, item in intervals if low < end and high > start}
+        assert {item for _, _, item in tree.overlapping(start, end)} == expected
+
+
+def test_overlapping_is_half_open():
+    """Test intervals touching at one bound don't overlap"""
+    tree = IntervalTree([(10, 20, 'a'), (20, 30, 'b'), (5, 40, 'c')])
+
+    assert tree.overlapping(20, 25) == [(5, 40, 'c'), (20, 30, 'b')]
+    assert tree.overlapping(0, 5) == []
+    assert len(tree) == 3
+
+
+def test_empty_tree():
+    """Test an empty tree finds nothing"""
+    assert IntervalTree([]).overlapping(0, 10) == []
@@ -0,0 +1,178 @@
+import os
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+
+import pytest
+from click.testing import CliRunner
+from sentry_sdk.envelope import Envelope
+
+import monitoring
+from monitoring import (DeliveryCheckTransport, SpoolTransport, get_spooled_files, send_envelope, send_spooled_events,
+                        start_sender)
+
+
+class FakeClient:
+    """Sentry client recording the envelopes instead of sending them"""
+    sent = []
+    # number of envelopes delivered before the network fails, None if it never fails
+    failing_after = None
+
+    def __init__(self, **options):
+        self.transport = self
+        self.lost = False
+
+    def capture_envelope(self, envelope):
+        if self.failing_after is not None and len(self.sent) >= self.failing_after:
+            self.lost = True
+        else:
+            self.sent.append(envelope)
+
+    def flush(self, timeout, callback=None):
+        pass
+
+    def close(self, timeout):
+        pass
+
+
+def test_spool_and_send_events(tmp_path, monkeypatch):
+    """Test envelopes are written to the spool, then sent and removed by the sender"""
+    monkeypatch.setattr(monitoring, 'SENTRY_SPOOL_DIR', tmp_path)
+    monkeypatch.setattr(monitoring.sentry_sdk, 'Client', FakeClient)
+    monkeypatch.setattr(FakeClient, 'sent', [])
+    transport = SpoolTransport()
+    for message in ('first', 'second'):
+        envelope = Envelope()
+        envelope.add_event({'message': message})
+        transport.capture_envelope(envelope)
+    assert len(get_spooled_files()) == 2
+
+    assert send_spooled_events() == 2
+    assert [envelope.get_event()['message'] for envelope in FakeClient.sent] == ['first', 'second']
+    assert get_spooled_files() == []
+
+
+def test_undelivered_events_stay_in_the_spool(tmp_path, monkeypatch):
+    """Test an envelope lost by the transport is put back in the spool, with the following ones"""
+    monkeypatch.setattr(monitoring, 'SENTRY_SPOOL_DIR', tmp_path)
+    monkeypatch.setattr(monitoring.sentry_sdk, 'Client', FakeClient)
+    monkeypatch.setattr(FakeClient, 'sent', [])
+    monkeypatch.setattr(FakeClient, 'failing_after', 1)
+    transport = SpoolTransport()
+    for message in ('first', 'second', 'third'):
+        envelope = Envelope()
+        envelope.add_event({'message': message})
+        transport.capture_envelope(envelope)
+    spooled = get_spooled_files()
+
+    assert send_spooled_events() == 1
+    assert get_spooled_files() == spooled[1:]
+    assert list(tmp_path.glob('*.sending')) == []
+
+    monkeypatch.setattr(FakeClient, 'failing_after', None)
+    assert send_spooled_events() == 2
+    assert [envelope.get_event()['message'] for envelope in FakeClient.sent] == ['first', 'second', 'third']
+    assert get_spooled_files() == []
+
+
+def spool_event(message='event'):
+    envelope = Envelope()
+    envelope.add_event({'message': message})
+    SpoolTransport().capture_envelope(envelope)
+
+
+def test_one_sender_at_a_time(tmp_path, monkeypatch):
+    """Test a sender doesn't run while the lock of another one is fresh, and replaces the lock of a crashed one"""
+    monkeypatch.setattr(monitoring, 'SENTRY_SPOOL_DIR', tmp_path)
+    monkeypatch.setattr(monitoring.sentry_sdk, 'Client', FakeClient)
+    monkeypatch.setattr(FakeClient, 'sent', [])
+    spool_event()
+    lock_path = tmp_path / monitoring.SENDER_LOCK
+    lock_path.touch()
+
+    assert send_spooled_events() is None
+    assert len(get_spooled_files()) == 1
+
+    stale = time.time() - monitoring.SENDER_LOCK_EXPIRY - 1
+    os.utime(lock_path, (stale, stale))
+    assert send_spooled_events() == 1
+    assert not lock_path.exists()
+
+
+def test_start_sender_backoff(tmp_path, monkeypatch):
+    """Test the sender isn't started again right after a failed delivery, nor while another sender runs"""
+    monkeypatch.setattr(monitoring, 'SENTRY_SPOOL_DIR', tmp_path)
+    monkeypatch.setattr(monitoring.sentry_sdk, 'Client', FakeClient)
+    monkeypatch.setattr(FakeClient, 'sent', [])
+    monkeypatch.setattr(FakeClient, 'failing_after', 0)
+    started = []
+    monkeypatch.setattr(monitoring.subprocess, 'Popen', lambda *args, **kwargs: started.append(args))
+    spool_event()
+
+    assert send_spooled_events() == 0
+    start_sender()
+    assert started == []
+
+    past = time.time() - monitoring.SENTRY_RETRY_DELAY - 1
+    os.utime(tmp_path / monitoring.FAILED_DELIVERY_MARKER, (past, past))
+    (tmp_path / monitoring.SENDER_LOCK).touch()
+    start_sender()
+    assert started == []
+
+    (tmp_path / monitoring.SENDER_LOCK).unlink()
+    start_sender()
+    assert len(started) == 1
+
+
+def test_send_events_command_marks_the_sender(tmp_path, monkeypatch):
+    """Test the send-events process is flagged, so that it doesn't start another sender when it exits"""
+    monkeypatch.setattr(monitoring, 'SENTRY_SPOOL_DIR', tmp_path)
+    monkeypatch.setattr(monitoring.sentry_sdk, 'Client', FakeClient)
+    monkeypatch.setattr(FakeClient, 'sent', [])
+    monkeypatch.setattr(monitoring, 'is_sender', False)
+
+    result = CliRunner().invoke(monitoring.send_events)
+
+    assert result.output == '0 events sent\n'
+    assert monitoring.is_sender
+
+
+class SentryHandler(BaseHTTPRequestHandler):
+    """Sentry ingestion endpoint answering every envelope with a fixed status"""
+    status = 200
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(self.status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.mark.parametrize('status, delivered', [(200, True), (500, False)])
+def test_delivery_check_transport(monkeypatch, status, delivered):
+    """Test send_envelope only reports the envelopes accepted by the Sentry server"""
+    monkeypatch.setattr(SentryHandler, 'status', status)
+    monkeypatch.setattr(monitoring, 'SENTRY_FLUSH_TIMEOUT', 5)
+    server = HTTPServer(('127.0.0.1', 0), SentryHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    client = monitoring.sentry_sdk.Client(dsn=f'http://key@127.0.0.1:{server.server_port}/1',
+                                          transport=DeliveryCheckTransport)
+    envelope = Envelope()
+    envelope.add_event({'message': 'event'})
+
+    assert send_envelope(client, envelope) is delivered
+    client.close(timeout=1)
+    server.shutdown()
+
+
+def test_delivery_check_transport_detects_network_errors(monkeypatch):
+    """Test send_envelope reports an envelope the HTTP transport could not send"""
+    monkeypatch.setattr(monitoring, 'SENTRY_FLUSH_TIMEOUT', 5)
+    client = monitoring.sentry_sdk.Client(dsn='http://key@127.0.0.1:9/1', transport=DeliveryCheckTransport)
+    envelope = Envelope()
+    envelope.add_event({'message': 'lost'})
+
+    assert send_envelope(client, envelope) is False
+    client.close(timeout=1)
@@ -0,0 +1,69 @@
+from sqlalchemy.event import listen, remove
+
+from controllers.event import check_event_data
+from repository import get_repository
+
+
+def count_queries(engine, func):
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    listen(engine, 'before_cursor_execute', count_statement)
+    result = func()
+    remove(engine, 'before_cursor_execute', count_statement)
+    return result, len(statements)
+
+
+def test_get_repository_is_shared_by_the_session(session):
+    """Test the repository lives as long as the session"""
+    assert get_repository(session) is get_repository(session)
+
+
+def test_lookup_by_natural_key_is_memoized(session, engine, support_user):
+    """Test a username is queried once, the next lookups using the identity map"""
+    repository = get_repository(session)
+
+    first, first_queries = count_queries(engine, lambda: repository.get_user('support_user'))
+    second, second_queries = count_queries(engine, lambda: repository.get_user('support_user'))
+
+    assert first is second is support_user
+    assert first_queries == 1
+    assert second_queries == 0
+
+
+def test_lookup_after_key_change(session, support_user):
+    """Test a memoized key is forgotten once the entity does not match it anymore"""
+    repository = get_repository(session)
+    repository.get_user('support_user')
+    support_user.username = 'renamed_user'
+    session.flush()
+
+    assert repository.get_user('support_user') is None
+    assert repository.get_user('renamed_user') is support_user
+
+
+def test_get_teams_fills_the_memo(session, engine):
+    """Test the teams listed for the prompt choices are then found by name without query"""
+    repository = get_repository(session)
+    repository.get_teams()
+
+    team, queries = count_queries(engine, lambda: repository.get_team('Support team'))
+
+    assert team.name == 'Support team'
+    assert queries == 0
+
+
+def test_check_event_data_single_lookup_per_key(session, engine, contract, support_user):
+    """Test validating event data costs no query for relations already loaded, only the conflict check"""
+    get_repository(session).get_user('support_user')
+    event_data = {'event_start_date': '2024-01-01 10:00', 'event_end_date': '2024-01-01 12:00',
+                  'contract_id': str(contract.id), 'support_contact_username': 'support_user'}
+
+    errors, queries = count_queries(engine, lambda: check_event_data(session, event_data))
+
+    assert errors == []
+    assert event_data['contract'] is contract
+    assert event_data['support_contact'] is support_user
+    assert queries == 1
@@ -0,0 +1,63 @@
+from models import Customer
+from models.search import full_text_search
+
+
+def test_full_text_search_ranks_hits(session, event, customer):
+    """Test the hits matching more words are ranked first, across the searched tables"""
+    event.update(session, {'location': 'Versailles', 'notes': 'Gala de charité'})
+    customer.update(session, {'company_name': 'Château de Versailles'})
+
+    hits = full_text_search(session, 'versailles gala')
+
+    assert [(hit.kind, hit.id) for hit in hits] == [('event', event.id), ('customer', customer.id)]
+    assert hits[0].title == 'Versailles'
+    # accents are ignored, and characters other than words are not interpreted
+    assert [hit.id for hit in full_text_search(session, '"chateau* OR', kinds=['customer'])] == [customer.id]
+
+
+def test_full_text_search_follows_writes(session, customer, sales_user):
+    """Test the SQLite index is kept up to date by triggers, rows inserted in bulk included"""
+    customer.update(session, {'name': 'Renamed Customer', 'company_name': 'Renamed sas'})
+    Customer.bulk_create(session, [{'name': 'Bulk Customer', 'email': 'bulk@example.com', 'company_name': 'Bulk sas',
+                                    'sales_contact_id': sales_user.id}])
+
+    assert full_text_search(session, 'test') == []
+    assert sorted(hit.title for hit in full_text_search(session, 'customer')) == ['Bulk Customer', 'Renamed Customer']
+    customer.delete(session)
+    assert [hit.title for hit in full_text_search(session, 'customer', kinds=['customer'])] == ['Bulk Customer']
+
+
+def test_full_text_search_pagination(session, sales_user):
+    """Test the offset skips the better hits"""
+    Customer.bulk_create(session, [{'name': f'Gala {i}', 'email': f'gala{i}@example.com', 'company_name': 'Events',
+                                    'sales_contact_id': sales_user.id} for i in range(5)])
+
+    first_page = full_text_search(session, 'gala', limit=3)
+    second_page = full_text_search(session, 'gala', limit=3, offset=3)
+
+    assert len(first_page) == 3
+    assert len(second_page) == 2
+    assert {hit.id for hit in first_page}.isdisjoint(hit.id for hit in second_page)
+
+
+def test_full_text_search_ranks_inside_tables(session, event, customer):
+    """Test the relevances are only compared inside their table, the hits being merged by the words they contain"""
+    event.update(session, {'location': 'Versailles', 'notes': 'Gala de charité, Versailles'})
+    customer.update(session, {'company_name': 'Château de Versailles'})
+
+    hits = full_text_search(session, 'versailles')
+
+    assert sorted((hit.kind, hit.score) for hit in hits) == [('customer', 2.0), ('event', 2.0)]
+
+
+def test_full_text_search_like_fallback(session, event, customer, monkeypatch):
+    """Test the databases without full-text index are searched with LIKE conditions"""
+    event.update(session, {'location': 'Versailles', 'notes': 'Gala 100%'})
+    customer.update(session, {'company_name': 'Château de Versailles'})
+    monkeypatch.setattr(session.get_bind().dialect, 'name', 'postgresql')
+
+    hits = full_text_search(session, 'VERSAILLES gala')
+
+    assert [(hit.kind, hit.id) for hit in hits] == [('event', event.id), ('customer', customer.id)]
+    # the wildcards of LIKE are escaped
+    assert full_text_search(session, 'Gal_') == []
@@ -11,3 +11,20 @@ def test_teams_name(session):
     assert "Management team" in team_names
     assert "Sales team" in team_names
     assert "Support team" in team_names
+
+
+def test_teams_permissions(session):
+    management = Team.get_team(session, "Management team")
+    support = Team.get_team(session, "Support team")
+    assert isinstance(management.permissions(), frozenset)
+    assert 'create_user' in management.permissions()
+    assert 'list_events' in support.permissions()
+    assert 'create_user' not in support.permissions()
+    assert Team(name="Unknown team").permissions() == frozenset()
+
+
+def test_renamed_team_keeps_permissions(session):
+    """Test the permissions are found by team id, not by name"""
+    sales = Team.get_team(session, "Sales team")
+    sales.name = "Sales"
+    assert 'create_customer' in sales.permissions()
@@ -2,11 +2,12 @@ import pytest
 from click.testing import CliRunner
 from passlib.hash import argon2
 from sqlalchemy import select
+from sqlalchemy.event import listen, remove
 
 from controllers import create_user
 from main import global_cli
 from models import User
-from utils import get_user_from_token
+from utils import TokenUser, get_claims_from_token, get_user_from_token
 
 @pytest.fixture
 def user_valid_data():
@@ -55,3 +56,65 @@ def test_get_users(session, user, user_valid_data):
     assert user in retrieved_users
 
 
+
+
+def test_token_claims(session, user, token_factory):
+    """Test the token carries the user id and team, the permissions being those of the team"""
+    token_user = TokenUser(get_claims_from_token(token_factory(user)))
+    assert token_user.id == user.id
+    assert token_user.team == user.team.name
+    assert token_user.has_perm('list_events') is True
+    assert token_user.has_perm('not_a_permission') is False
+
+
+def test_token_revoked_on_password_update(session, user, token_factory):
+    """Test tokens issued before a password change are refused"""
+    token = token_factory(user)
+    user.update(session, {'password': 'NewPassword123'})
+    assert get_user_from_token(token, session) is None
+    assert get_user_from_token(token_factory(user), session).id == user.id
+
+
+def test_bulk_update_users_revokes_tokens(session, user, token_factory):
+    """Test bulk_update hashes the new passwords and revokes the tokens of the users whose password changed"""
+    token = token_factory(user)
+    User.bulk_update(session, [{'id': user.id, 'password': 'NewPassword123'}])
+    session.refresh(user)
+
+    assert argon2.verify('NewPassword123', user.password)
+    assert get_user_from_token(token, session) is None
+
+
+def test_get_user_loads_team(session, engine, user):
+    """Test get_user loads the team with the user, so has_perm needs no extra query"""
+    session.expunge_all()
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    listen(engine, 'before_cursor_execute', count_statement)
+    retrieved_user = User.get_user(session, user.username)
+    retrieved_user.has_perm('list_events')
+    remove(engine, 'before_cursor_execute', count_statement)
+
+    assert len(statements) == 1
+
+
+def test_check_password_rehash(session, user, monkeypatch):
+    """Test a correct password hashed with other cost parameters is rehashed with the configured ones"""
+    hasher = argon2.using(rounds=1, memory_cost=1024, parallelism=1)
+    monkeypatch.setattr('models.user.get_password_hasher', lambda: hasher)
+
+    assert user.check_password(session, 'wrong_password') is False
+    assert user.check_password(session, 'test_password') is True
+    assert '$m=1024,t=1,p=1$' in user.password
+    assert hasher.verify('test_password', user.password)
+
+
+@pytest.mark.parametrize('field, value', [
+    ('username', 12345678), ('email', 42), ('personal_number', 1234567890), ('password', ['Password1']),
+])
+def test_validate_data_wrong_type(field, value):
+    """Test validate_data reports values that aren't strings instead of failing on them"""
+    assert len(User.validate_data({field: value})) == 1